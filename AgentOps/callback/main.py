@@ -1,3 +1,6 @@
+import asyncio
+import sys
+from pathlib import Path
 from typing import TypedDict
 from typing_extensions import TypedDict
 from langgraph.graph import StateGraph, END
@@ -12,6 +15,10 @@ from gohumanloop.adapters.base_adapter import (
 )
 from dotenv import load_dotenv
 
+# 非阻塞的终端输入与 LangGraph 示例共用 async_nodes.ainput
+sys.path.append(str(Path(__file__).resolve().parents[2] / "LangGraph"))
+from async_nodes import ainput  # noqa: E402
+
 # 配置日志
 logging.basicConfig(
     level=logging.INFO, format="%(asctime)s - %(name)s - %(levelname)s - %(message)s"
@@ -37,14 +44,15 @@ manager = DefaultHumanLoopManager(
 )
 adapter = HumanloopAdapter(manager)
 
-
 # 定义工作流节点
+# 节点都是 async 函数：require_approval 装饰 async 函数时直接在事件循环中等待审批，
+# 不会在等待人工处理期间占住线程
 @adapter.require_approval(
     callback=AgentOpsHumanLoopCallback(),
     ret_key="approval_info",
     execute_on_reject=True,
 )
-def review_output(state: WorkflowState, approval_info=None) -> WorkflowState:
+async def review_output(state: WorkflowState, approval_info=None) -> WorkflowState:
     """审查输入的内容"""
     logger.info(f"开始审查输出 - 当前状态: {state}")
 
@@ -59,11 +67,11 @@ def review_output(state: WorkflowState, approval_info=None) -> WorkflowState:
     return state
 
 
-def generate_output(state: WorkflowState) -> WorkflowState:
+async def generate_output(state: WorkflowState) -> WorkflowState:
     """生成输出内容"""
     if state.get("review_feedback"):
         logger.info(f"审批反馈 - {state['review_feedback']}")
-    state["input"] = input("请输入要审批的内容: ")
+    state["input"] = await ainput("请输入要审批的内容: ")
     state["output"] = state["input"]
     logger.info(f"通过审批的内容: {state['output']}")
     return state
@@ -112,6 +120,4 @@ async def run_workflow():
 
 
 if __name__ == "__main__":
-    import asyncio
-
     asyncio.run(run_workflow())
@@ -1,11 +1,17 @@
 import os
+import sys
+from pathlib import Path
 from crewai import Agent, Crew, Task
 from crewai.tools import tool
 
 from gohumanloop.adapters import HumanloopAdapter
-from gohumanloop import DefaultHumanLoopManager, EmailProvider
+from gohumanloop import DefaultHumanLoopManager
 from dotenv import load_dotenv
 
+# IdleEmailProvider 与 LangGraph 示例共用 LangGraph/ghl_email.py
+sys.path.append(str(Path(__file__).resolve().parents[2] / "LangGraph"))
+from ghl_email import IdleEmailProvider  # noqa: E402
+
 load_dotenv()
 # 从环境变量获取邮箱配置
 smtp_server = os.environ.get("SMTP_SERVER", "smtp.example.com")
@@ -13,16 +19,21 @@ smtp_port = int(os.environ.get("SMTP_PORT", "587"))
 imap_server = os.environ.get("IMAP_SERVER", "imap.example.com")
 imap_port = int(os.environ.get("IMAP_PORT", "993"))
 recipient_email = os.environ.get("TEST_RECIPIENT_EMAIL", "your_email@example.com")
+email_security = os.environ.get("EMAIL_SECURITY", "ssl")
+email_digest_window = float(os.environ.get("EMAIL_DIGEST_WINDOW", "0"))
 
-# 创建 EmailProvider 实例
-provider = EmailProvider(
+# 创建 EmailProvider 实例，使用 IMAP IDLE 等待答复，邮件到达即继续执行；
+# 设置 EMAIL_DIGEST_WINDOW（秒）后，窗口内的审批请求合并为一封汇总邮件
+provider = IdleEmailProvider(
     name="EmailHumanLoop",
     smtp_server=smtp_server,
     smtp_port=smtp_port,
     imap_server=imap_server,
     imap_port=imap_port,
-    check_interval=30,  # 每30秒检查一次邮件
+    check_interval=30,  # 服务器不支持 IDLE 时每30秒检查一次邮件
     language="en",  # 支持中文模板切换
+    security=email_security,
+    digest_window=email_digest_window,
 )
 
 # Create HumanLoopManager instance
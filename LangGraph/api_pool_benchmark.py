@@ -0,0 +1,213 @@
+# /// script
+# requires-python = ">=3.10"
+# dependencies = [
+# "gohumanloop>=0.0.12",
+# "aiohttp>=3.9.0",
+# "httpx[http2]>=0.27.0"]
+# ///
+"""
+APIProvider 连接复用对比
+
+在本地 GoHumanLoop API 替身服务（ghl_local_api.py）上同时发起 --requests 个审批请求，
+请求在 --delay 秒后自动批准，Provider 每 --poll-interval 秒轮询一次状态。比较：
+- aiohttp: APIProvider，每次 API 调用新建会话和连接
+- pooled:  PooledAPIProvider，所有调用共用进程内的 keep-alive 连接池
+           （--http2 时改用 httpx 协商 HTTP/2，替身服务只支持 HTTP/1.1）
+
+替身服务在子进程中运行，不与客户端争用 GIL。
+输出全部请求完成的用时、发起请求的平均耗时、API 调用次数和服务端看到的连接数。
+
+--rtt 在客户端和替身服务之间加一个转发代理，每个方向延迟 rtt/2 毫秒，
+模拟到远端网关的网络往返；新建连接的 TCP 和 TLS 握手同样要经过这些往返。
+
+--tls 时替身服务使用自签名证书提供 https，每个新连接都要做 TLS 握手。
+aiohttp 在导入时读取系统证书，需要在启动前通过 SSL_CERT_FILE 信任该证书：
+
+    openssl req -x509 -newkey rsa:2048 -nodes -keyout key.pem -out cert.pem -days 1 \\
+        -subj "/CN=127.0.0.1" -addext "subjectAltName=IP:127.0.0.1"
+    SSL_CERT_FILE=cert.pem uv run api_pool_benchmark.py --tls cert.pem key.pem --rtt 20
+"""
+
+import argparse
+import asyncio
+import json
+import logging
+import multiprocessing
+import ssl
+import time
+from multiprocessing.connection import Connection
+from typing import Any, Dict, List, Optional, Tuple
+
+import aiohttp
+from aiohttp import web
+from pydantic import SecretStr
+
+from gohumanloop import APIProvider
+from gohumanloop.core.interface import HumanLoopStatus, HumanLoopType
+
+from ghl_http import PooledAPIProvider, SharedHttpClient
+from ghl_local_api import LocalHumanLoopAPI
+
+
+async def _pump(
+    reader: asyncio.StreamReader, writer: asyncio.StreamWriter, delay: float
+) -> None:
+    """Forward data one way, each chunk delay seconds after it was read."""
+    queue: "asyncio.Queue[Tuple[float, bytes]]" = asyncio.Queue()
+
+    async def read() -> None:
+        while data := await reader.read(65536):
+            queue.put_nowait((time.monotonic() + delay, data))
+        queue.put_nowait((time.monotonic() + delay, b""))
+
+    reading = asyncio.create_task(read())
+    try:
+        while True:
+            due, data = await queue.get()
+            await asyncio.sleep(max(0.0, due - time.monotonic()))
+            if not data:
+                break
+            writer.write(data)
+            await writer.drain()
+    except ConnectionError:
+        pass
+    finally:
+        reading.cancel()
+        writer.close()
+
+
+async def start_latency_proxy(target_port: int, rtt_ms: float) -> asyncio.AbstractServer:
+    """TCP proxy to 127.0.0.1:target_port adding rtt_ms of round trip time."""
+    delay = rtt_ms / 2000
+
+    async def handle(reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        # 建立连接本身也需要一次往返
+        await asyncio.sleep(2 * delay)
+        upstream_reader, upstream_writer = await asyncio.open_connection(
+            "127.0.0.1", target_port
+        )
+        try:
+            await asyncio.gather(
+                _pump(reader, upstream_writer, delay),
+                _pump(upstream_reader, writer, delay),
+                return_exceptions=True,
+            )
+        except asyncio.CancelledError:
+            # 结束时连接池中仍保持着的连接
+            pass
+
+    return await asyncio.start_server(handle, "127.0.0.1", 0)
+
+
+async def _serve(args: argparse.Namespace, conn: Connection) -> None:
+    api = LocalHumanLoopAPI(delay=args.delay)
+    runner = web.AppRunner(api.app())
+    await runner.setup()
+    ssl_context: Optional[ssl.SSLContext] = None
+    if args.tls:
+        ssl_context = ssl.create_default_context(ssl.Purpose.CLIENT_AUTH)
+        ssl_context.load_cert_chain(*args.tls)
+    site = web.TCPSite(runner, "127.0.0.1", 0, ssl_context=ssl_context)
+    await site.start()
+    port = site._server.sockets[0].getsockname()[1]  # type: ignore[union-attr]
+    if args.rtt:
+        proxy = await start_latency_proxy(port, args.rtt)
+        port = proxy.sockets[0].getsockname()[1]
+    conn.send(port)
+    await asyncio.Event().wait()
+
+
+def serve(args: argparse.Namespace, conn: Connection) -> None:
+    """Run the API stand-in (and latency proxy) in a child process."""
+    logging.basicConfig(level=logging.WARNING)
+    asyncio.run(_serve(args, conn))
+
+
+async def run(mode: str, args: argparse.Namespace) -> Dict[str, Any]:
+    parent, child = multiprocessing.Pipe()
+    server = multiprocessing.Process(target=serve, args=(args, child), daemon=True)
+    server.start()
+    port = parent.recv()
+    scheme = "https" if args.tls else "http"
+
+    options = dict(
+        name="ApiProvider",
+        api_base_url=f"{scheme}://127.0.0.1:{port}/api",
+        api_key=SecretStr("gohumanloop"),
+        default_platform="feishu",
+        poll_interval=args.poll_interval,
+    )
+    client: Optional[SharedHttpClient] = None
+    if mode == "pooled":
+        client = SharedHttpClient(
+            max_connections=args.max_connections, http2=args.http2
+        )
+        provider: APIProvider = PooledAPIProvider(http_client=client, **options)
+    else:
+        provider = APIProvider(**options)
+
+    request_times: List[float] = []
+
+    async def request(index: int) -> None:
+        started = time.perf_counter()
+        result = await provider.async_request_humanloop(
+            task_id=f"task-{index}",
+            conversation_id=f"conversation-{index}",
+            loop_type=HumanLoopType.APPROVAL,
+            context={"message": {"function": "transfer", "amount": 100 + index}},
+            timeout=120,
+        )
+        request_times.append(time.perf_counter() - started)
+        while (
+            await provider.async_check_request_status(
+                result.conversation_id, result.request_id
+            )
+        ).status == HumanLoopStatus.PENDING:
+            await asyncio.sleep(0.1)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(request(i) for i in range(args.requests)))
+    elapsed = time.perf_counter() - start
+
+    if client is not None:
+        client.close()
+    async with aiohttp.ClientSession() as session:
+        async with session.get(f"{scheme}://127.0.0.1:{port}/api/v1/humanloop/stats") as response:
+            stats = await response.json()
+    server.terminate()
+    result = {
+        "mode": mode,
+        "requests": args.requests,
+        "duration_s": round(elapsed, 2),
+        "avg_request_ms": round(1000 * sum(request_times) / len(request_times), 1),
+        "status_calls": stats["status_calls"],
+        # 统计接口本身用了一个连接
+        "connections": stats["client_connections"] - 1,
+    }
+    if client is not None:
+        result["client"] = client.stats()
+    return result
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="APIProvider connection pooling benchmark")
+    parser.add_argument("--requests", type=int, default=50)
+    parser.add_argument("--delay", type=float, default=2.0)
+    parser.add_argument("--poll-interval", type=int, default=1)
+    parser.add_argument("--max-connections", type=int, default=20)
+    parser.add_argument("--http2", action="store_true", help="Pooled client over httpx/h2")
+    parser.add_argument("--rtt", type=float, default=0, help="Simulated round trip (ms)")
+    parser.add_argument("--mode", choices=["aiohttp", "pooled", "all"], default="all")
+    parser.add_argument(
+        "--tls", nargs=2, metavar=("CERT", "KEY"), help="Serve https with this certificate"
+    )
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.WARNING)
+
+    modes = ["aiohttp", "pooled"] if args.mode == "all" else [args.mode]
+    for mode in modes:
+        print(json.dumps(asyncio.run(run(mode, args))))
+
+
+if __name__ == "__main__":
+    main()
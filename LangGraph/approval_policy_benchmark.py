@@ -0,0 +1,102 @@
+# /// script
+# requires-python = ">=3.10"
+# dependencies = [
+# "gohumanloop>=0.0.12"]
+# ///
+"""
+审批策略预筛的耗时
+
+用 transaction_policy.json 中的规则判断 --requests 笔随机交易（金额对数正态分布，
+账户一半来自白名单），输出各结果的数量，以及：
+- single: 逐笔调用 evaluate 的平均耗时
+- batch:  一次 evaluate_batch 判断全部交易的平均耗时（装饰器之外的批量筛查）
+- prescreen: 经过 prescreen 装饰器（绑定参数、注入审批结果）自动决定一次调用的平均耗时，
+  装饰器按当前时间判断，非工作时间只有自动拒绝的调用
+
+--at 指定 single / batch 的判断时刻（ISO 格式），默认为工作日上午，白名单规则的时间窗口生效。
+
+示例：
+    uv run approval_policy_benchmark.py --requests 100000
+    uv run approval_policy_benchmark.py --at 2026-10-17T23:00:00+08:00
+"""
+
+import argparse
+import json
+import logging
+import os
+import random
+import time
+from collections import Counter
+from datetime import datetime
+from typing import Any, Dict, List
+
+from approval_policy import Decision, PolicyEngine
+
+RULES = os.path.join(os.path.dirname(os.path.abspath(__file__)), "transaction_policy.json")
+ALLOWLIST = ["user_12345", "user_23456", "user_34567"]
+
+
+def transactions(count: int, seed: int) -> List[Dict[str, Any]]:
+    rng = random.Random(seed)
+    return [
+        {
+            "amount": round(rng.lognormvariate(6, 3), 2),
+            "account_id": rng.choice(ALLOWLIST)
+            if rng.random() < 0.5
+            else f"user_{rng.randrange(100000)}",
+        }
+        for _ in range(count)
+    ]
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Approval policy pre-screening benchmark")
+    parser.add_argument("--requests", type=int, default=100000)
+    parser.add_argument("--at", default="2026-10-14T10:30:00+08:00")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.WARNING)
+
+    engine = PolicyEngine.from_file(RULES)
+    now = datetime.fromisoformat(args.at)
+    batch = transactions(args.requests, args.seed)
+
+    started = time.perf_counter()
+    single = [engine.evaluate(item, now) for item in batch]
+    single_s = time.perf_counter() - started
+
+    started = time.perf_counter()
+    batched = engine.evaluate_batch(batch, now)
+    batch_s = time.perf_counter() - started
+    assert batched == single
+
+    # 被装饰的函数没有接 require_approval，只计入按当前时间能自动决定的调用
+    @engine.prescreen(execute_on_reject=True)
+    def execute(amount: float, account_id: str, approval_result=None) -> Any:
+        return approval_result["status"]
+
+    auto = [
+        item
+        for item, result in zip(batch, engine.evaluate_batch(batch))
+        if result.decision != Decision.REVIEW
+    ]
+    started = time.perf_counter()
+    for item in auto:
+        execute(**item)
+    prescreen_s = time.perf_counter() - started
+
+    print(
+        json.dumps(
+            {
+                "requests": args.requests,
+                "decisions": dict(Counter(result.decision.value for result in single)),
+                "single_us": round(1e6 * single_s / len(batch), 2),
+                "batch_us": round(1e6 * batch_s / len(batch), 2),
+                "prescreen_us": round(1e6 * prescreen_s / max(len(auto), 1), 2),
+            }
+        )
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,84 @@
+"""
+异步工作流中的阻塞节点
+
+用 app.ainvoke() / app.astream() 运行工作流时，LangGraph 会把同步节点交给事件循环的
+默认线程池执行。这个线程池是进程内共享的，只有 min(32, CPU 数 + 4) 个线程：
+- 同步的 llm.invoke()、input() 在整个调用期间占住一个线程
+- 同步函数上的 require_approval / require_conversation 装饰器会在线程里另起事件循环，
+  等待人工处理的几分钟内一直占住线程
+
+并发的工作流一多，默认线程池被占满，其他工作流、TerminalProvider 的终端输入以及
+所有依赖默认线程池的代码都会排队等待。
+
+推荐把节点写成 async def，LLM 调用使用 ainvoke()，人工等待使用装饰在 async 函数上的
+require_*（直接在事件循环中等待，不占线程）。无法改成异步的节点，交给 AsyncStateGraph
+自动放进独立的有界线程池执行，不影响默认线程池。
+"""
+
+import asyncio
+import contextvars
+import functools
+import inspect
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Optional
+
+from langgraph.graph import StateGraph
+
+# 终端只有一个，读取输入使用单独的单线程线程池，多个工作流的输入请求依次进行
+_stdin_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="stdin")
+
+
+def is_blocking(func: Any) -> bool:
+    """Whether func is a plain synchronous function that would hold a thread."""
+    if not (inspect.isfunction(func) or inspect.ismethod(func)):
+        return False
+    return not (
+        inspect.iscoroutinefunction(func)
+        or inspect.isasyncgenfunction(func)
+        or inspect.isgeneratorfunction(func)
+    )
+
+
+def offload(func: Callable[..., Any], executor: ThreadPoolExecutor) -> Callable[..., Any]:
+    """Wrap a synchronous function into a coroutine function that runs it in executor."""
+
+    @functools.wraps(func)
+    async def wrapper(*args: Any, **kwargs: Any) -> Any:
+        loop = asyncio.get_running_loop()
+        # 复制 contextvars，保证回调、追踪等上下文在线程中仍然可用
+        context = contextvars.copy_context()
+        return await loop.run_in_executor(
+            executor, functools.partial(context.run, func, *args, **kwargs)
+        )
+
+    return wrapper
+
+
+class AsyncStateGraph(StateGraph):
+    """StateGraph that runs synchronous nodes in a bounded thread pool of its own.
+
+    Graphs built with it are meant to be run with the async API (ainvoke, astream).
+
+    Args:
+        blocking_workers: Maximum number of synchronous nodes running at once
+    """
+
+    def __init__(self, *args: Any, blocking_workers: int = 8, **kwargs: Any):
+        super().__init__(*args, **kwargs)
+        self.blocking_workers = blocking_workers
+        self.executor = ThreadPoolExecutor(
+            max_workers=blocking_workers, thread_name_prefix="blocking-node"
+        )
+
+    def add_node(self, node: Any, action: Optional[Any] = None, **kwargs: Any) -> Any:
+        if action is None and is_blocking(node):
+            node = offload(node, self.executor)
+        elif action is not None and is_blocking(action):
+            action = offload(action, self.executor)
+        return super().add_node(node, action, **kwargs)
+
+
+async def ainput(prompt: str = "") -> str:
+    """input() that waits without blocking the event loop or the default thread pool."""
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(_stdin_executor, input, prompt)
@@ -0,0 +1,525 @@
+"""
+面向人工等待场景的持久化 Checkpointer
+
+MemorySaver 把每个暂停线程的完整状态都保存在内存中，进程重启后全部丢失。
+CompactSqliteSaver 把检查点写入本地 SQLite 文件：
+- 紧凑序列化：使用 serde 的二进制（msgpack）格式，超过阈值的数据再用 zlib 压缩
+- 增量存储：每个检查点只写入版本发生变化的通道值，未变化的通道按版本号引用已有数据
+- 冷线程淘汰：内存中只保留最近活跃的 cache_size 个线程的最新检查点（LRU），
+  其余线程只在磁盘上，恢复时按需读取
+
+因此可以有数万个线程同时等待人工处理，内存占用有上限，重启后也能继续恢复。
+异步接口（aget_tuple、aput 等）把 SQLite 调用放到线程池中执行，不阻塞事件循环。
+"""
+
+import asyncio
+import functools
+import os
+import random
+import sqlite3
+import threading
+import zlib
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from typing import Any, AsyncIterator, Dict, Iterator, List, Optional, Sequence, Tuple
+
+from langchain_core.runnables import RunnableConfig
+from langgraph.checkpoint.base import (
+    WRITES_IDX_MAP,
+    BaseCheckpointSaver,
+    ChannelVersions,
+    Checkpoint,
+    CheckpointMetadata,
+    CheckpointTuple,
+    get_checkpoint_id,
+    get_checkpoint_metadata,
+)
+from langgraph.checkpoint.serde.base import SerializerProtocol
+
+from message_log import MessageLogSerializer
+
+Typed = Tuple[str, bytes]
+
+# 默认数据库文件放在本模块所在目录，不随启动时的工作目录变化
+DEFAULT_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "checkpoints.db")
+
+_EMPTY: Typed = ("empty", b"")
+_ZLIB_SUFFIX = "+zlib"
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS checkpoints (
+    thread_id TEXT NOT NULL,
+    checkpoint_ns TEXT NOT NULL DEFAULT '',
+    checkpoint_id TEXT NOT NULL,
+    parent_checkpoint_id TEXT,
+    type TEXT,
+    checkpoint BLOB,
+    metadata_type TEXT,
+    metadata BLOB,
+    PRIMARY KEY (thread_id, checkpoint_ns, checkpoint_id)
+);
+CREATE TABLE IF NOT EXISTS blobs (
+    thread_id TEXT NOT NULL,
+    checkpoint_ns TEXT NOT NULL DEFAULT '',
+    channel TEXT NOT NULL,
+    version TEXT NOT NULL,
+    type TEXT NOT NULL,
+    blob BLOB,
+    PRIMARY KEY (thread_id, checkpoint_ns, channel, version)
+);
+CREATE TABLE IF NOT EXISTS writes (
+    thread_id TEXT NOT NULL,
+    checkpoint_ns TEXT NOT NULL DEFAULT '',
+    checkpoint_id TEXT NOT NULL,
+    task_id TEXT NOT NULL,
+    idx INTEGER NOT NULL,
+    channel TEXT NOT NULL,
+    type TEXT,
+    blob BLOB,
+    task_path TEXT NOT NULL DEFAULT '',
+    PRIMARY KEY (thread_id, checkpoint_ns, checkpoint_id, task_id, idx)
+);
+"""
+
+
+@dataclass
+class _Head:
+    """Serialized latest checkpoint of one thread, kept in the LRU cache."""
+
+    checkpoint_id: str
+    parent_checkpoint_id: Optional[str]
+    checkpoint: Typed
+    metadata: Typed
+    # channel -> (version, 序列化后的值)
+    blobs: Dict[str, Tuple[str, Typed]]
+    # (task_id, idx) -> (task_id, channel, 序列化后的值, task_path)
+    writes: Dict[Tuple[str, int], Tuple[str, str, Typed, str]] = field(
+        default_factory=dict
+    )
+
+
+class CompactSqliteSaver(BaseCheckpointSaver[str]):
+    """SQLite-backed checkpointer for threads that spend most of their life
+    waiting for a human.
+
+    Args:
+        path: SQLite database file, ":memory:" for a throwaway database;
+            defaults to checkpoints.db next to this module
+        serde: Serializer, defaults to MessageLogSerializer (LangGraph's
+            msgpack-based serializer that also stores MessageLog values)
+        compress_threshold: Serialized values of at least this many bytes are zlib-compressed
+        cache_size: Number of threads whose latest checkpoint is kept in memory
+    """
+
+    def __init__(
+        self,
+        path: Optional[str] = None,
+        *,
+        serde: Optional[SerializerProtocol] = None,
+        compress_threshold: int = 256,
+        cache_size: int = 1024,
+    ):
+        super().__init__(serde=serde or MessageLogSerializer())
+        self.compress_threshold = compress_threshold
+        self.cache_size = cache_size
+        self.conn = sqlite3.connect(path or DEFAULT_PATH, check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.executescript(_SCHEMA)
+        self.lock = threading.Lock()
+
+        self._cache: "OrderedDict[Tuple[str, str], _Head]" = OrderedDict()
+        self.cache_hits = 0
+        self.cache_misses = 0
+        self.evictions = 0
+
+    def close(self) -> None:
+        with self.lock:
+            self.conn.close()
+
+    def __enter__(self) -> "CompactSqliteSaver":
+        return self
+
+    def __exit__(self, *exc_info: Any) -> None:
+        self.close()
+
+    # ------------------------------------------------------------------
+    # 序列化
+    # ------------------------------------------------------------------
+
+    def _dump(self, value: Any) -> Typed:
+        type_, data = self.serde.dumps_typed(value)
+        if len(data) >= self.compress_threshold:
+            compressed = zlib.compress(data)
+            if len(compressed) < len(data):
+                return type_ + _ZLIB_SUFFIX, compressed
+        return type_, data
+
+    def _load(self, typed: Typed) -> Any:
+        type_, data = typed
+        if type_.endswith(_ZLIB_SUFFIX):
+            type_, data = type_[: -len(_ZLIB_SUFFIX)], zlib.decompress(data)
+        return self.serde.loads_typed((type_, data))
+
+    # ------------------------------------------------------------------
+    # 内存缓存（LRU），只保存每个线程的最新检查点
+    # ------------------------------------------------------------------
+
+    def _cache_get(self, key: Tuple[str, str]) -> Optional[_Head]:
+        head = self._cache.get(key)
+        if head is not None:
+            self._cache.move_to_end(key)
+            self.cache_hits += 1
+        else:
+            self.cache_misses += 1
+        return head
+
+    def _cache_put(self, key: Tuple[str, str], head: _Head) -> None:
+        self._cache[key] = head
+        self._cache.move_to_end(key)
+        while len(self._cache) > self.cache_size:
+            self._cache.popitem(last=False)
+            self.evictions += 1
+
+    def _load_head(
+        self, thread_id: str, checkpoint_ns: str, checkpoint_id: Optional[str]
+    ) -> Optional[_Head]:
+        """Read one checkpoint from disk; the latest one if checkpoint_id is None."""
+        query = (
+            "SELECT checkpoint_id, parent_checkpoint_id, type, checkpoint, metadata_type, metadata "
+            "FROM checkpoints WHERE thread_id = ? AND checkpoint_ns = ?"
+        )
+        params: List[Any] = [thread_id, checkpoint_ns]
+        if checkpoint_id:
+            query += " AND checkpoint_id = ?"
+            params.append(checkpoint_id)
+        else:
+            query += " ORDER BY checkpoint_id DESC LIMIT 1"
+        row = self.conn.execute(query, params).fetchone()
+        if row is None:
+            return None
+        head = _Head(
+            checkpoint_id=row[0],
+            parent_checkpoint_id=row[1],
+            checkpoint=(row[2], row[3]),
+            metadata=(row[4], row[5]),
+            blobs={},
+        )
+
+        versions: Dict[str, str] = self._load(head.checkpoint)["channel_versions"]
+        for channel, version in versions.items():
+            blob = self.conn.execute(
+                "SELECT type, blob FROM blobs WHERE thread_id = ? AND checkpoint_ns = ? "
+                "AND channel = ? AND version = ?",
+                (thread_id, checkpoint_ns, channel, str(version)),
+            ).fetchone()
+            if blob is not None:
+                head.blobs[channel] = (str(version), (blob[0], blob[1]))
+
+        self._load_writes(thread_id, checkpoint_ns, head)
+        return head
+
+    def _load_writes(self, thread_id: str, checkpoint_ns: str, head: _Head) -> None:
+        for task_id, idx, channel, type_, data, task_path in self.conn.execute(
+            "SELECT task_id, idx, channel, type, blob, task_path FROM writes "
+            "WHERE thread_id = ? AND checkpoint_ns = ? AND checkpoint_id = ?",
+            (thread_id, checkpoint_ns, head.checkpoint_id),
+        ):
+            head.writes[(task_id, idx)] = (task_id, channel, (type_, data), task_path)
+
+    def _to_tuple(self, thread_id: str, checkpoint_ns: str, head: _Head) -> CheckpointTuple:
+        checkpoint: Checkpoint = self._load(head.checkpoint)
+        channel_values = {
+            channel: self._load(typed)
+            for channel, (_, typed) in head.blobs.items()
+            if typed[0] != "empty"
+        }
+        writes = sorted(
+            head.writes.items(), key=lambda item: (item[1][3], item[0][0], item[0][1])
+        )
+        return CheckpointTuple(
+            config={
+                "configurable": {
+                    "thread_id": thread_id,
+                    "checkpoint_ns": checkpoint_ns,
+                    "checkpoint_id": head.checkpoint_id,
+                }
+            },
+            checkpoint={**checkpoint, "channel_values": channel_values},
+            metadata=self._load(head.metadata),
+            parent_config=(
+                {
+                    "configurable": {
+                        "thread_id": thread_id,
+                        "checkpoint_ns": checkpoint_ns,
+                        "checkpoint_id": head.parent_checkpoint_id,
+                    }
+                }
+                if head.parent_checkpoint_id
+                else None
+            ),
+            pending_writes=[
+                (task_id, channel, self._load(typed))
+                for _, (task_id, channel, typed, _) in writes
+            ],
+        )
+
+    # ------------------------------------------------------------------
+    # BaseCheckpointSaver 接口
+    # ------------------------------------------------------------------
+
+    def get_tuple(self, config: RunnableConfig) -> Optional[CheckpointTuple]:
+        thread_id = str(config["configurable"]["thread_id"])
+        checkpoint_ns = config["configurable"].get("checkpoint_ns", "")
+        checkpoint_id = get_checkpoint_id(config)
+        key = (thread_id, checkpoint_ns)
+        with self.lock:
+            head = self._cache_get(key)
+            if head is None or (checkpoint_id and head.checkpoint_id != checkpoint_id):
+                head = self._load_head(thread_id, checkpoint_ns, checkpoint_id)
+                if head is None:
+                    return None
+                if not checkpoint_id:
+                    self._cache_put(key, head)
+            return self._to_tuple(thread_id, checkpoint_ns, head)
+
+    def list(
+        self,
+        config: Optional[RunnableConfig],
+        *,
+        filter: Optional[Dict[str, Any]] = None,
+        before: Optional[RunnableConfig] = None,
+        limit: Optional[int] = None,
+    ) -> Iterator[CheckpointTuple]:
+        query = "SELECT thread_id, checkpoint_ns, checkpoint_id FROM checkpoints"
+        clauses: List[str] = []
+        params: List[Any] = []
+        if config:
+            clauses.append("thread_id = ?")
+            params.append(str(config["configurable"]["thread_id"]))
+            if (checkpoint_ns := config["configurable"].get("checkpoint_ns")) is not None:
+                clauses.append("checkpoint_ns = ?")
+                params.append(checkpoint_ns)
+            if checkpoint_id := get_checkpoint_id(config):
+                clauses.append("checkpoint_id = ?")
+                params.append(checkpoint_id)
+        if before and (before_id := get_checkpoint_id(before)):
+            clauses.append("checkpoint_id < ?")
+            params.append(before_id)
+        if clauses:
+            query += " WHERE " + " AND ".join(clauses)
+        query += " ORDER BY checkpoint_id DESC"
+
+        with self.lock:
+            rows = self.conn.execute(query, params).fetchall()
+        for thread_id, checkpoint_ns, checkpoint_id in rows:
+            if limit is not None and limit <= 0:
+                break
+            with self.lock:
+                head = self._load_head(thread_id, checkpoint_ns, checkpoint_id)
+            if head is None:
+                continue
+            if filter:
+                metadata = self._load(head.metadata)
+                if not all(metadata.get(k) == v for k, v in filter.items()):
+                    continue
+            if limit is not None:
+                limit -= 1
+            yield self._to_tuple(thread_id, checkpoint_ns, head)
+
+    def put(
+        self,
+        config: RunnableConfig,
+        checkpoint: Checkpoint,
+        metadata: CheckpointMetadata,
+        new_versions: ChannelVersions,
+    ) -> RunnableConfig:
+        thread_id = str(config["configurable"]["thread_id"])
+        checkpoint_ns = config["configurable"].get("checkpoint_ns", "")
+        parent_checkpoint_id = config["configurable"].get("checkpoint_id")
+        key = (thread_id, checkpoint_ns)
+
+        c = checkpoint.copy()
+        values: Dict[str, Any] = c.pop("channel_values")  # type: ignore[misc]
+        # 增量：只序列化本次版本发生变化的通道
+        new_blobs = {
+            channel: (
+                str(version),
+                self._dump(values[channel]) if channel in values else _EMPTY,
+            )
+            for channel, version in new_versions.items()
+        }
+        head = _Head(
+            checkpoint_id=checkpoint["id"],
+            parent_checkpoint_id=parent_checkpoint_id,
+            checkpoint=self._dump(c),
+            metadata=self._dump(get_checkpoint_metadata(config, metadata)),
+            blobs={},
+        )
+
+        with self.lock, self.conn:
+            self.conn.executemany(
+                "INSERT OR REPLACE INTO blobs VALUES (?, ?, ?, ?, ?, ?)",
+                [
+                    (thread_id, checkpoint_ns, channel, version, typed[0], typed[1])
+                    for channel, (version, typed) in new_blobs.items()
+                ],
+            )
+            self.conn.execute(
+                "INSERT OR REPLACE INTO checkpoints VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                (
+                    thread_id,
+                    checkpoint_ns,
+                    head.checkpoint_id,
+                    parent_checkpoint_id,
+                    *head.checkpoint,
+                    *head.metadata,
+                ),
+            )
+
+            # 未变化的通道从缓存的父检查点复用；父检查点不在缓存中时，下次读取再从磁盘加载
+            previous = self._cache.get(key)
+            if previous is not None and previous.checkpoint_id != parent_checkpoint_id:
+                previous = None
+            for channel, version in checkpoint["channel_versions"].items():
+                if channel in new_blobs:
+                    head.blobs[channel] = new_blobs[channel]
+                elif previous is not None and channel in previous.blobs:
+                    head.blobs[channel] = previous.blobs[channel]
+                else:
+                    self._cache.pop(key, None)
+                    break
+            else:
+                # put 在加锁前序列化，同一检查点的 put_writes 可能已先写入磁盘；
+                # 此时缓存中还是父检查点，put_writes 没有更新缓存，这里补上
+                self._load_writes(thread_id, checkpoint_ns, head)
+                self._cache_put(key, head)
+
+        return {
+            "configurable": {
+                "thread_id": thread_id,
+                "checkpoint_ns": checkpoint_ns,
+                "checkpoint_id": checkpoint["id"],
+            }
+        }
+
+    def put_writes(
+        self,
+        config: RunnableConfig,
+        writes: Sequence[Tuple[str, Any]],
+        task_id: str,
+        task_path: str = "",
+    ) -> None:
+        thread_id = str(config["configurable"]["thread_id"])
+        checkpoint_ns = config["configurable"].get("checkpoint_ns", "")
+        checkpoint_id = config["configurable"]["checkpoint_id"]
+        rows = []
+        for idx, (channel, value) in enumerate(writes):
+            rows.append(
+                (WRITES_IDX_MAP.get(channel, idx), channel, self._dump(value))
+            )
+
+        with self.lock, self.conn:
+            head = self._cache.get((thread_id, checkpoint_ns))
+            if head is not None and head.checkpoint_id != checkpoint_id:
+                head = None
+            for idx, channel, typed in rows:
+                # 特殊写入（错误、中断等）覆盖旧值，普通写入只保留第一次
+                verb = "REPLACE" if idx < 0 else "IGNORE"
+                self.conn.execute(
+                    f"INSERT OR {verb} INTO writes VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                    (
+                        thread_id,
+                        checkpoint_ns,
+                        checkpoint_id,
+                        task_id,
+                        idx,
+                        channel,
+                        typed[0],
+                        typed[1],
+                        task_path,
+                    ),
+                )
+                if head is not None and (idx < 0 or (task_id, idx) not in head.writes):
+                    head.writes[(task_id, idx)] = (task_id, channel, typed, task_path)
+
+    def delete_thread(self, thread_id: str) -> None:
+        thread_id = str(thread_id)
+        with self.lock, self.conn:
+            for table in ("checkpoints", "blobs", "writes"):
+                self.conn.execute(f"DELETE FROM {table} WHERE thread_id = ?", (thread_id,))
+            for key in [key for key in self._cache if key[0] == thread_id]:
+                del self._cache[key]
+
+    async def _offload(self, fn: Any, *args: Any, **kwargs: Any) -> Any:
+        # SQLite 调用会阻塞，交给默认线程池执行，并发的运行不会被一次慢写入卡住
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(None, functools.partial(fn, *args, **kwargs))
+
+    async def aget_tuple(self, config: RunnableConfig) -> Optional[CheckpointTuple]:
+        return await self._offload(self.get_tuple, config)
+
+    async def alist(
+        self,
+        config: Optional[RunnableConfig],
+        *,
+        filter: Optional[Dict[str, Any]] = None,
+        before: Optional[RunnableConfig] = None,
+        limit: Optional[int] = None,
+    ) -> AsyncIterator[CheckpointTuple]:
+        items = await self._offload(
+            lambda: list(self.list(config, filter=filter, before=before, limit=limit))
+        )
+        for item in items:
+            yield item
+
+    async def aput(
+        self,
+        config: RunnableConfig,
+        checkpoint: Checkpoint,
+        metadata: CheckpointMetadata,
+        new_versions: ChannelVersions,
+    ) -> RunnableConfig:
+        return await self._offload(self.put, config, checkpoint, metadata, new_versions)
+
+    async def aput_writes(
+        self,
+        config: RunnableConfig,
+        writes: Sequence[Tuple[str, Any]],
+        task_id: str,
+        task_path: str = "",
+    ) -> None:
+        await self._offload(self.put_writes, config, writes, task_id, task_path)
+
+    async def adelete_thread(self, thread_id: str) -> None:
+        await self._offload(self.delete_thread, thread_id)
+
+    def get_next_version(self, current: Optional[str], channel: None) -> str:
+        if current is None:
+            current_v = 0
+        elif isinstance(current, int):
+            current_v = current
+        else:
+            current_v = int(current.split(".")[0])
+        return f"{current_v + 1:032}.{random.random():016}"
+
+    def stats(self) -> Dict[str, Any]:
+        with self.lock:
+            counts = {
+                table: self.conn.execute(f"SELECT COUNT(*) FROM {table}").fetchone()[0]
+                for table in ("checkpoints", "blobs", "writes")
+            }
+            page_count = self.conn.execute("PRAGMA page_count").fetchone()[0]
+            page_size = self.conn.execute("PRAGMA page_size").fetchone()[0]
+            threads = self.conn.execute(
+                "SELECT COUNT(DISTINCT thread_id) FROM checkpoints"
+            ).fetchone()[0]
+        return {
+            "threads": threads,
+            **counts,
+            "db_bytes": page_count * page_size,
+            "cached_threads": len(self._cache),
+            "cache_hits": self.cache_hits,
+            "cache_misses": self.cache_misses,
+            "evictions": self.evictions,
+        }
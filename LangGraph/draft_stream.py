@@ -0,0 +1,85 @@
+"""
+草稿流式预览
+
+require_conversation 要等节点拿到完整的回复草稿后才发给审核人，草稿生成需要
+几十秒时，审核人一直在空等。StreamingTerminalProvider 在 TerminalProvider 的基础上
+增加 stream_draft()：生成草稿的节点把 llm.astream() 的 token 转发给它，
+审核人在终端上边生成边阅读，发现草稿方向不对时按回车即可提前中断生成。
+
+中断后节点拿到的是已经生成的部分草稿（interrupted=True），随后照常进入
+require_conversation 审核，审核人直接给出修改意见。
+
+其他 provider（如企业微信、飞书）实现同名的 stream_draft() 即可接入同样的流程。
+"""
+
+import asyncio
+import sys
+from typing import AsyncIterator, Optional, Tuple
+
+from gohumanloop.providers.terminal_provider import TerminalProvider
+
+
+class StreamingTerminalProvider(TerminalProvider):
+    """Terminal provider that can show a draft to the reviewer while it is
+    being generated and let them stop it early."""
+
+    async def stream_draft(
+        self,
+        conversation_id: str,
+        chunks: AsyncIterator[str],
+        title: Optional[str] = None,
+    ) -> Tuple[str, bool]:
+        """Print chunks as they arrive until the stream ends or the reviewer
+        presses Enter.
+
+        Returns:
+            Tuple[str, bool]: The (possibly partial) draft and whether it was interrupted
+        """
+        loop = asyncio.get_running_loop()
+        stopped = asyncio.Event()
+        parts = []
+
+        print(f"\n===== {title or '草稿生成中'} [{conversation_id}] =====")
+        print("（按回车键中断当前草稿）\n", flush=True)
+
+        def on_stdin() -> None:
+            if sys.stdin.readline():
+                stopped.set()
+            else:
+                # stdin 已关闭，不再监听
+                loop.remove_reader(sys.stdin)
+
+        try:
+            loop.add_reader(sys.stdin, on_stdin)
+            watching = True
+        except (NotImplementedError, ValueError, OSError):
+            # Windows 事件循环或 stdin 不是终端时不支持，只流式显示，不能中断
+            watching = False
+
+        async def consume() -> None:
+            async for chunk in chunks:
+                if chunk:
+                    parts.append(chunk)
+                    print(chunk, end="", flush=True)
+
+        consumer = asyncio.ensure_future(consume())
+        waiter = asyncio.ensure_future(stopped.wait())
+        try:
+            await asyncio.wait({consumer, waiter}, return_when=asyncio.FIRST_COMPLETED)
+            interrupted = not consumer.done()
+            if interrupted:
+                # 取消生成，同时关闭底层的 LLM 流式请求
+                consumer.cancel()
+                await asyncio.gather(consumer, return_exceptions=True)
+                aclose = getattr(chunks, "aclose", None)
+                if aclose is not None:
+                    await aclose()
+            else:
+                consumer.result()
+        finally:
+            waiter.cancel()
+            if watching:
+                loop.remove_reader(sys.stdin)
+
+        print("\n\n===== 草稿已中断 =====" if interrupted else "\n\n===== 草稿生成完成 =====")
+        return "".join(parts), interrupted
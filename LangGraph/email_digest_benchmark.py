@@ -0,0 +1,129 @@
+# /// script
+# requires-python = ">=3.10"
+# dependencies = [
+# "gohumanloop>=0.0.10",
+# "imapclient>=3.0.1"]
+# ///
+"""
+汇总邮件对审批处理速度的影响
+
+在本地测试服务器（email_local_server.py）上，--requests 个审批请求在 --arrival 秒内
+陆续到达，由一位审批人逐封处理：每封邮件耗时 --email-time 秒（打开、阅读、回复），
+邮件中每个请求另需 --item-time 秒。比较：
+- single: 每个请求一封邮件（digest_window=0）
+- digest: 同一收件人 --window 秒内的请求合并为一封汇总邮件
+
+输出全部请求得到答复的用时、审批人处理的邮件数和每分钟处理的请求数。
+
+示例：
+    uv run email_digest_benchmark.py --requests 40 --window 5
+"""
+
+import argparse
+import asyncio
+import json
+import logging
+import time
+from typing import Any, Dict, Set
+
+from pydantic import SecretStr
+
+from gohumanloop.core.interface import HumanLoopStatus, HumanLoopType
+
+from email_local_server import LocalMailServer, _text_part
+from ghl_email import IdleEmailProvider
+
+
+async def reviewer(server: LocalMailServer, args: argparse.Namespace, answered: Set[int]) -> None:
+    """Answer request emails one at a time, approving every item."""
+    while True:
+        pending = [
+            message.uid
+            for message in server.mailbox.messages
+            if message.uid not in answered
+            and not str(server.message(message.uid)["Subject"]).startswith("Re:")
+        ]
+        if not pending:
+            await asyncio.sleep(0.05)
+            continue
+        uid = pending[0]
+        items = max(1, _text_part(server.message(uid)).count("[approve|"))
+        await asyncio.sleep(args.email_time + args.item_time * items)
+        server.reply(uid, "approve", "ok")
+        answered.add(uid)
+
+
+async def run(mode: str, args: argparse.Namespace) -> Dict[str, Any]:
+    server = LocalMailServer(smtp_port=0, imap_port=0, verbose=False)
+    await server.start()
+    provider = IdleEmailProvider(
+        name="EmailProvider",
+        smtp_server="127.0.0.1",
+        smtp_port=server.smtp_port,
+        imap_server="127.0.0.1",
+        imap_port=server.imap_port,
+        username="bot@example.com",
+        password=SecretStr("local"),
+        security="none",
+        language="en",
+        digest_window=args.window if mode == "digest" else 0,
+        digest_max_items=args.max_items,
+    )
+    answered: Set[int] = set()
+    review = asyncio.create_task(reviewer(server, args, answered))
+
+    async def request(index: int) -> float:
+        await asyncio.sleep(index * args.arrival / args.requests)
+        created = time.perf_counter()
+        result = await provider.async_request_humanloop(
+            task_id=f"task-{index}",
+            conversation_id=f"conversation-{index}",
+            loop_type=HumanLoopType.APPROVAL,
+            context={"message": {"function": "transfer", "amount": 100 + index}},
+            metadata={"recipient_email": "reviewer@example.com"},
+            timeout=600,
+        )
+        while True:
+            status = await provider.async_check_request_status(
+                result.conversation_id, result.request_id
+            )
+            if status.status != HumanLoopStatus.PENDING:
+                return time.perf_counter() - created
+            await asyncio.sleep(0.2)
+
+    start = time.perf_counter()
+    waits = await asyncio.gather(*(request(i) for i in range(args.requests)))
+    elapsed = time.perf_counter() - start
+    review.cancel()
+    await server.close()
+    return {
+        "mode": mode,
+        "requests": args.requests,
+        "drain_s": round(elapsed, 1),
+        "emails_reviewed": len(answered),
+        "avg_wait_s": round(sum(waits) / len(waits), 1),
+        "max_wait_s": round(max(waits), 1),
+        "requests_per_min": round(60 * args.requests / elapsed, 1),
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Email digest reviewer throughput benchmark")
+    parser.add_argument("--requests", type=int, default=40)
+    parser.add_argument("--arrival", type=float, default=10.0)
+    parser.add_argument("--mode", choices=["single", "digest", "all"], default="all")
+    parser.add_argument("--window", type=float, default=5.0)
+    parser.add_argument("--max-items", type=int, default=20)
+    parser.add_argument("--email-time", type=float, default=1.0)
+    parser.add_argument("--item-time", type=float, default=0.2)
+    args = parser.parse_args()
+    # 扫描线程在测试服务器关闭后的重连告警与本测试无关
+    logging.basicConfig(level=logging.ERROR)
+
+    modes = ["single", "digest"] if args.mode == "all" else [args.mode]
+    for mode in modes:
+        print(json.dumps(asyncio.run(run(mode, args))))
+
+
+if __name__ == "__main__":
+    main()
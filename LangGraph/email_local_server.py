@@ -0,0 +1,668 @@
+# /// script
+# requires-python = ">=3.10"
+# dependencies = []
+# ///
+"""
+本地 IMAP / SMTP 测试服务器
+
+在本机模拟一个邮箱服务器，测试邮件审批流程时不需要真实的邮箱账号：
+- SMTP：接受任意账号密码登录，收到的邮件全部放入同一个收件箱
+- IMAP：实现 EmailProvider / IdleEmailProvider 用到的命令子集
+  （LOGIN、ID、SELECT、SEARCH、FETCH、STORE、IDLE 等），默认支持 IDLE，
+  --no-idle 关闭以测试轮询退回
+- 审核人命令行：收到审批邮件后，在终端输入命令代替审核人回复邮件，
+  回复按原邮件中的回复模板填写，发件人为原邮件的收件人
+
+    approve <编号> [理由]     批准
+    reject <编号> [理由]      拒绝
+    reply <编号> <内容>       提供信息或继续对话
+    list                      列出收件箱
+
+也可以用 --auto-reply approve --reply-delay 2 自动答复每一封审批邮件。
+
+示例：
+    uv run email_local_server.py --smtp-port 2525 --imap-port 1143
+
+    # 另一个终端
+    export SMTP_SERVER=127.0.0.1 SMTP_PORT=2525 IMAP_SERVER=127.0.0.1 IMAP_PORT=1143
+    export EMAIL_SECURITY=none
+    uv run langgraph_adapter_mutilprovider.py
+"""
+
+import argparse
+import asyncio
+import base64
+import re
+import shlex
+import sys
+import threading
+import time
+from dataclasses import dataclass, field
+from email import message_from_bytes, policy
+from email.message import EmailMessage
+from email.utils import formatdate, make_msgid, parseaddr
+from typing import Dict, List, Optional, Set, Tuple
+
+
+@dataclass
+class StoredMessage:
+    uid: int
+    raw: bytes
+    flags: Set[str] = field(default_factory=set)
+    received_at: float = field(default_factory=time.time)
+
+    def header(self) -> bytes:
+        end = self.raw.find(b"\r\n\r\n")
+        return self.raw if end < 0 else self.raw[: end + 4]
+
+    def text(self) -> bytes:
+        end = self.raw.find(b"\r\n\r\n")
+        return b"" if end < 0 else self.raw[end + 4 :]
+
+
+def _crlf(raw: bytes) -> bytes:
+    return re.sub(rb"\r?\n", b"\r\n", raw)
+
+
+def _header_fields(header: bytes, names: List[str], exclude: bool = False) -> bytes:
+    wanted = {name.lower() for name in names}
+    lines: List[bytes] = []
+    keep = False
+    for line in header.split(b"\r\n"):
+        if not line:
+            continue
+        if line[:1] in (b" ", b"\t"):
+            # 折叠的续行跟随上一个字段
+            if keep:
+                lines.append(line)
+            continue
+        name = line.split(b":", 1)[0].decode("ascii", "replace").strip().lower()
+        keep = (name in wanted) != exclude
+        if keep:
+            lines.append(line)
+    return b"\r\n".join(lines) + b"\r\n\r\n"
+
+
+def _text_part(msg: EmailMessage) -> str:
+    part = msg.get_body(preferencelist=("plain",)) if msg.is_multipart() else msg
+    return part.get_content() if part is not None else ""
+
+
+def fill_reply_template(body: str, decision: Optional[str], text: str) -> str:
+    """Fill the reply template between the marker lines of a request email.
+
+    The decision line looks like "Decision: [approve/yes|reject/no]", or in a
+    digest "Decision: 1 [approve|reject], 2 [approve|reject]". Every choice is
+    set to decision; without a decision a digest line is replaced with text.
+    Every other "[...]" placeholder is replaced with text.
+    """
+    lines = body.splitlines()
+    markers = [i for i, line in enumerate(lines) if line.strip().startswith("=====")]
+    if len(markers) < 2:
+        return text
+
+    def choose(match: re.Match) -> str:
+        approve, reject = match.group(1).split("|", 1)
+        choices = (approve if decision == "approve" else reject).split("/")
+        return decision if decision in choices else choices[0]
+
+    filled = []
+    for line in lines[markers[0] : markers[1] + 1]:
+        match = re.search(r"\[([^\]]*)\]", line)
+        choices = re.findall(r"\[[^\]]*\|[^\]]*\]", line)
+        if len(choices) > 1 and decision is None:
+            # 汇总邮件的自由答复，如 "1 approve, 2 reject: reason"
+            line = re.match(r"[^\[\d]*", line).group(0) + text
+        elif choices:
+            line = re.sub(r"\[([^\]]*\|[^\]]*)\]", choose, line)
+        elif match:
+            line = line[: match.start()] + text + line[match.end() :]
+        filled.append(line)
+    return "\n".join(filled)
+
+
+class Mailbox:
+    """Single in-memory INBOX shared by the SMTP and IMAP servers."""
+
+    def __init__(self) -> None:
+        self.messages: List[StoredMessage] = []
+        self._idlers: Set[asyncio.StreamWriter] = set()
+        # 每个 IMAP 连接已被告知的邮件数，新邮件在下一次响应或 IDLE 中报告
+        self.reported: Dict[asyncio.StreamWriter, int] = {}
+
+    def deliver(self, raw: bytes) -> int:
+        message = StoredMessage(uid=len(self.messages) + 1, raw=_crlf(raw))
+        self.messages.append(message)
+        # 通知所有处于 IDLE 的连接
+        for writer in list(self._idlers):
+            self.report(writer)
+        return message.uid
+
+    def report(self, writer: asyncio.StreamWriter) -> None:
+        """Send EXISTS to a connection if mail arrived since it was last told."""
+        if self.reported.get(writer, 0) != len(self.messages):
+            self.reported[writer] = len(self.messages)
+            writer.write(f"* {len(self.messages)} EXISTS\r\n".encode())
+
+    def get(self, uid: int) -> StoredMessage:
+        return self.messages[uid - 1]
+
+
+def _parse_set(spec: str, largest: int) -> Set[int]:
+    numbers: Set[int] = set()
+    for part in spec.split(","):
+        start, _, end = part.partition(":")
+        low = largest if start == "*" else int(start)
+        high = low if not end else (largest if end == "*" else int(end))
+        low, high = min(low, high), max(low, high)
+        numbers.update(n for n in range(low, high + 1) if 1 <= n <= largest)
+    return numbers
+
+
+_FETCH_ITEM = re.compile(
+    r"BODY(?:\.PEEK)?\[[^\]]*\]|RFC822\.HEADER|RFC822\.SIZE|RFC822\.TEXT|RFC822"
+    r"|FLAGS|UID|INTERNALDATE",
+    re.IGNORECASE,
+)
+
+
+class IMAPServer:
+    """Subset of IMAP4rev1 (RFC 3501) with IDLE (RFC 2177)."""
+
+    def __init__(self, mailbox: Mailbox, idle: bool = True):
+        self.mailbox = mailbox
+        self.capabilities = "IMAP4rev1 ID UIDPLUS" + (" IDLE" if idle else "")
+        self.connections = 0
+        self.commands: Dict[str, int] = {}
+        self.writers: Dict[asyncio.StreamWriter, asyncio.Task] = {}
+
+    async def handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        self.connections += 1
+        self.writers[writer] = asyncio.current_task()
+        writer.write(f"* OK [CAPABILITY {self.capabilities}] local IMAP ready\r\n".encode())
+        try:
+            while True:
+                line = await self._read_command(reader, writer)
+                if line is None:
+                    break
+                tag, _, rest = line.partition(" ")
+                command, _, args = rest.partition(" ")
+                command = command.upper()
+                uid = False
+                if command == "UID":
+                    uid = True
+                    command, _, args = args.partition(" ")
+                    command = command.upper()
+                self.commands[command] = self.commands.get(command, 0) + 1
+
+                if command == "LOGOUT":
+                    writer.write(b"* BYE logging out\r\n")
+                    writer.write(f"{tag} OK LOGOUT completed\r\n".encode())
+                    await writer.drain()
+                    break
+                if command == "IDLE":
+                    await self._idle(tag, reader, writer)
+                    continue
+                try:
+                    self._dispatch(tag, command, args, uid, writer)
+                except Exception as e:
+                    writer.write(f"{tag} BAD {e}\r\n".encode())
+                await writer.drain()
+        except (ConnectionError, asyncio.IncompleteReadError, asyncio.CancelledError):
+            # 客户端断开或服务器关闭
+            pass
+        finally:
+            self.mailbox._idlers.discard(writer)
+            self.mailbox.reported.pop(writer, None)
+            self.writers.pop(writer, None)
+            writer.close()
+
+    async def _read_command(
+        self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter
+    ) -> Optional[str]:
+        data = b""
+        while True:
+            line = await reader.readline()
+            if not line:
+                return None
+            data += line.rstrip(b"\r\n")
+            # 处理字面量 {n}
+            match = re.search(rb"\{(\d+)(\+?)\}$", data)
+            if not match:
+                return data.decode("utf-8", "replace")
+            if not match.group(2):
+                writer.write(b"+ Ready for literal\r\n")
+                await writer.drain()
+            literal = await reader.readexactly(int(match.group(1)))
+            data = data[: match.start()] + b'"' + literal.replace(b'"', b'\\"') + b'"'
+
+    async def _idle(
+        self, tag: str, reader: asyncio.StreamReader, writer: asyncio.StreamWriter
+    ) -> None:
+        if "IDLE" not in self.capabilities:
+            writer.write(f"{tag} BAD IDLE not supported\r\n".encode())
+            await writer.drain()
+            return
+        writer.write(b"+ idling\r\n")
+        self.mailbox.report(writer)
+        await writer.drain()
+        self.mailbox._idlers.add(writer)
+        try:
+            line = await reader.readline()
+        finally:
+            self.mailbox._idlers.discard(writer)
+        if line.strip().upper() == b"DONE":
+            writer.write(f"{tag} OK IDLE terminated\r\n".encode())
+        else:
+            writer.write(f"{tag} BAD expected DONE\r\n".encode())
+        await writer.drain()
+
+    def _dispatch(
+        self, tag: str, command: str, args: str, uid: bool, writer: asyncio.StreamWriter
+    ) -> None:
+        messages = self.mailbox.messages
+        if command == "CAPABILITY":
+            writer.write(f"* CAPABILITY {self.capabilities}\r\n".encode())
+        elif command == "ID":
+            writer.write(b'* ID ("name" "email_local_server")\r\n')
+        elif command in ("SELECT", "EXAMINE"):
+            unseen = [m.uid for m in messages if "\\Seen" not in m.flags]
+            writer.write(b"* FLAGS (\\Answered \\Flagged \\Deleted \\Seen \\Draft)\r\n")
+            writer.write(f"* {len(messages)} EXISTS\r\n* 0 RECENT\r\n".encode())
+            self.mailbox.reported[writer] = len(messages)
+            if unseen:
+                writer.write(f"* OK [UNSEEN {unseen[0]}] first unseen\r\n".encode())
+            writer.write(b"* OK [UIDVALIDITY 1] UIDs valid\r\n")
+            writer.write(f"* OK [UIDNEXT {len(messages) + 1}] next UID\r\n".encode())
+            mode = "READ-ONLY" if command == "EXAMINE" else "READ-WRITE"
+            writer.write(f"{tag} OK [{mode}] {command} completed\r\n".encode())
+            return
+        elif command == "NOOP" or command == "CHECK":
+            pass
+        elif command == "STATUS":
+            values = {
+                "MESSAGES": len(messages),
+                "RECENT": 0,
+                "UIDNEXT": len(messages) + 1,
+                "UIDVALIDITY": 1,
+                "UNSEEN": sum("\\Seen" not in m.flags for m in messages),
+            }
+            items = re.findall(r"[A-Z]+", args.split(" ", 1)[1].upper())
+            status = " ".join(f"{item} {values[item]}" for item in items)
+            writer.write(f"* STATUS INBOX ({status})\r\n".encode())
+        elif command == "LIST" or command == "LSUB":
+            writer.write(f'* {command} () "/" INBOX\r\n'.encode())
+        elif command == "SEARCH":
+            found = self._search(args, uid)
+            writer.write(("* SEARCH " + " ".join(map(str, found))).rstrip().encode() + b"\r\n")
+        elif command == "FETCH":
+            spec, _, items = args.partition(" ")
+            for number in sorted(_parse_set(spec, len(messages))):
+                self._fetch(self.mailbox.get(number), items, uid, writer)
+        elif command == "STORE":
+            spec, mode, flags = args.split(" ", 2)
+            flag_set = set(flags.strip("()").split())
+            for number in sorted(_parse_set(spec, len(messages))):
+                message = self.mailbox.get(number)
+                if mode.upper().startswith("+"):
+                    message.flags |= flag_set
+                elif mode.upper().startswith("-"):
+                    message.flags -= flag_set
+                else:
+                    message.flags = flag_set
+                if ".SILENT" not in mode.upper():
+                    uid_item = f"UID {message.uid} " if uid else ""
+                    flags_item = " ".join(sorted(message.flags))
+                    writer.write(
+                        f"* {message.uid} FETCH ({uid_item}FLAGS ({flags_item}))\r\n".encode()
+                    )
+        elif command not in ("LOGIN", "AUTHENTICATE", "ENABLE", "CLOSE", "EXPUNGE"):
+            writer.write(f"{tag} BAD unknown command {command}\r\n".encode())
+            return
+        if writer in self.mailbox.reported:
+            self.mailbox.report(writer)
+        writer.write(f"{tag} OK {command} completed\r\n".encode())
+
+    def _search(self, args: str, uid: bool) -> List[int]:
+        tokens = shlex.split(args)
+        if len(tokens) > 1 and tokens[0].upper() == "CHARSET":
+            tokens = tokens[2:]
+        largest = len(self.mailbox.messages)
+        selected = set(range(1, largest + 1))
+        index = 0
+        while index < len(tokens):
+            key = tokens[index].upper()
+            index += 1
+            if key == "ALL":
+                continue
+            elif key in ("UNSEEN", "SEEN"):
+                seen = {m.uid for m in self.mailbox.messages if "\\Seen" in m.flags}
+                selected &= seen if key == "SEEN" else selected - seen
+            elif key == "UID":
+                selected &= _parse_set(tokens[index], largest)
+                index += 1
+            elif key in ("SUBJECT", "FROM", "TO"):
+                value = tokens[index].lower()
+                index += 1
+                selected = {
+                    n for n in selected if value in self._header(n, key).lower()
+                }
+            elif key == "HEADER":
+                name, value = tokens[index], tokens[index + 1].lower()
+                index += 2
+                selected = {
+                    n for n in selected if value in self._header(n, name).lower()
+                }
+            elif re.fullmatch(r"[\d*:,]+", key):
+                selected &= _parse_set(key, largest)
+            else:
+                raise ValueError(f"unsupported search key {key}")
+        return sorted(selected)
+
+    def _header(self, number: int, name: str) -> str:
+        message = message_from_bytes(self.mailbox.get(number).header(), policy=policy.default)
+        return str(message.get(name, ""))
+
+    def _fetch(
+        self, message: StoredMessage, items: str, uid: bool, writer: asyncio.StreamWriter
+    ) -> None:
+        parts: List[bytes] = []
+        names = [item.upper() for item in _FETCH_ITEM.findall(items)]
+        if uid and "UID" not in names:
+            names.insert(0, "UID")
+        for name in names:
+            if name == "UID":
+                parts.append(f"UID {message.uid}".encode())
+            elif name == "FLAGS":
+                parts.append(f"FLAGS ({' '.join(sorted(message.flags))})".encode())
+            elif name == "INTERNALDATE":
+                date = time.strftime("%d-%b-%Y %H:%M:%S +0000", time.gmtime(message.received_at))
+                parts.append(f'INTERNALDATE "{date}"'.encode())
+            elif name == "RFC822.SIZE":
+                parts.append(f"RFC822.SIZE {len(message.raw)}".encode())
+            else:
+                key, data = self._section(message, name)
+                parts.append(f"{key} {{{len(data)}}}\r\n".encode() + data)
+        writer.write(f"* {message.uid} FETCH (".encode() + b" ".join(parts) + b")\r\n")
+
+    def _section(self, message: StoredMessage, name: str) -> Tuple[str, bytes]:
+        if name == "RFC822":
+            message.flags.add("\\Seen")
+            return name, message.raw
+        if name == "RFC822.HEADER":
+            return name, message.header()
+        if name == "RFC822.TEXT":
+            message.flags.add("\\Seen")
+            return name, message.text()
+
+        section = name[name.index("[") + 1 : -1]
+        if not name.startswith("BODY.PEEK"):
+            message.flags.add("\\Seen")
+        key = f"BODY[{section}]"
+        if section == "":
+            return key, message.raw
+        if section == "HEADER":
+            return key, message.header()
+        if section == "TEXT":
+            return key, message.text()
+        match = re.fullmatch(r"HEADER\.FIELDS(\.NOT)? \((.*)\)", section)
+        if match:
+            fields = _header_fields(message.header(), match.group(2).split(), bool(match.group(1)))
+            return key, fields
+        raise ValueError(f"unsupported section {section}")
+
+
+class SMTPServer:
+    """Minimal SMTP server (RFC 5321) accepting any AUTH PLAIN / LOGIN credentials.
+
+    latency delays every reply to simulate the round trip to a remote server.
+    """
+
+    def __init__(self, mailbox: Mailbox, on_message=None, latency: float = 0.0):
+        self.mailbox = mailbox
+        self.on_message = on_message
+        self.latency = latency
+        self.connections = 0
+        self.messages = 0
+        self.writers: Dict[asyncio.StreamWriter, asyncio.Task] = {}
+
+    async def handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        self.connections += 1
+        self.writers[writer] = asyncio.current_task()
+
+        async def reply(text: str) -> None:
+            if self.latency:
+                await asyncio.sleep(self.latency)
+            writer.write(f"{text}\r\n".encode())
+            await writer.drain()
+
+        await reply("220 localhost local SMTP ready")
+        try:
+            while True:
+                line = await reader.readline()
+                if not line:
+                    break
+                command, _, args = line.decode("utf-8", "replace").strip().partition(" ")
+                command = command.upper()
+                if command == "EHLO":
+                    await reply("250-localhost\r\n250-AUTH PLAIN LOGIN\r\n250 8BITMIME")
+                elif command == "HELO":
+                    await reply("250 localhost")
+                elif command == "AUTH":
+                    mechanism, _, initial = args.partition(" ")
+                    if mechanism.upper() == "LOGIN":
+                        for prompt in (b"Username:", b"Password:"):
+                            await reply("334 " + base64.b64encode(prompt).decode())
+                            await reader.readline()
+                    elif not initial:
+                        await reply("334 ")
+                        await reader.readline()
+                    await reply("235 Authentication successful")
+                elif command in ("MAIL", "RCPT", "RSET", "NOOP"):
+                    await reply("250 OK")
+                elif command == "DATA":
+                    await reply("354 End data with <CR><LF>.<CR><LF>")
+                    lines = []
+                    while True:
+                        data = await reader.readline()
+                        if data in (b".\r\n", b".\n", b""):
+                            break
+                        lines.append(data[1:] if data.startswith(b"..") else data)
+                    uid = self.mailbox.deliver(b"".join(lines))
+                    self.messages += 1
+                    await reply(f"250 OK queued as {uid}")
+                    if self.on_message is not None:
+                        self.on_message(uid)
+                elif command == "QUIT":
+                    await reply("221 Bye")
+                    break
+                else:
+                    await reply("502 Command not implemented")
+        except (ConnectionError, asyncio.CancelledError):
+            pass
+        finally:
+            self.writers.pop(writer, None)
+            writer.close()
+
+
+class LocalMailServer:
+    """SMTP and IMAP servers sharing one mailbox, plus a scripted reviewer.
+
+    Args:
+        host: Address to listen on
+        smtp_port: SMTP port, 0 picks a free port
+        imap_port: IMAP port, 0 picks a free port
+        idle: Whether the IMAP server supports IDLE
+        auto_reply: "approve" or "reject" to answer every request email automatically
+        reply_delay: Seconds before an automatic reply is sent
+        smtp_latency: Seconds added to every SMTP reply
+        verbose: Print every received message
+    """
+
+    def __init__(
+        self,
+        host: str = "127.0.0.1",
+        smtp_port: int = 2525,
+        imap_port: int = 1143,
+        idle: bool = True,
+        auto_reply: Optional[str] = None,
+        reply_delay: float = 2.0,
+        smtp_latency: float = 0.0,
+        verbose: bool = True,
+    ):
+        self.host = host
+        self.smtp_port = smtp_port
+        self.imap_port = imap_port
+        self.auto_reply = auto_reply
+        self.reply_delay = reply_delay
+        self.verbose = verbose
+        self.mailbox = Mailbox()
+        self.imap = IMAPServer(self.mailbox, idle=idle)
+        self.smtp = SMTPServer(self.mailbox, on_message=self._on_message, latency=smtp_latency)
+        # 回复邮件的 uid -> 投递时间，用于统计答复到工作流继续执行的延迟
+        self.replied_at: Dict[int, float] = {}
+        self.loop: Optional[asyncio.AbstractEventLoop] = None
+        self._servers: List[asyncio.base_events.Server] = []
+
+    async def start(self) -> None:
+        self.loop = asyncio.get_running_loop()
+        smtp = await asyncio.start_server(self.smtp.handle, self.host, self.smtp_port)
+        imap = await asyncio.start_server(self.imap.handle, self.host, self.imap_port)
+        self._servers = [smtp, imap]
+        self.smtp_port = smtp.sockets[0].getsockname()[1]
+        self.imap_port = imap.sockets[0].getsockname()[1]
+
+    async def close(self) -> None:
+        # 先结束仍在处理的客户端连接
+        tasks = [*self.smtp.writers.values(), *self.imap.writers.values()]
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        for server in self._servers:
+            server.close()
+            await server.wait_closed()
+
+    def message(self, uid: int) -> EmailMessage:
+        return message_from_bytes(self.mailbox.get(uid).raw, policy=policy.default)
+
+    def reply(self, uid: int, decision: Optional[str] = None, text: str = "") -> int:
+        """Reply to a request email as its recipient. Must run on the server loop."""
+        original = self.message(uid)
+        body = _text_part(original)
+        content = fill_reply_template(body, decision, text)
+
+        msg = EmailMessage()
+        msg["From"] = original["To"]
+        msg["To"] = original["From"]
+        msg["Subject"] = f"Re: {original['Subject']}"
+        msg["Date"] = formatdate(localtime=True)
+        msg["Message-ID"] = make_msgid(domain="localhost")
+        if original["Message-ID"]:
+            msg["In-Reply-To"] = original["Message-ID"]
+            msg["References"] = original["Message-ID"]
+        quoted = "\n".join(f"> {line}" for line in body.splitlines())
+        msg.set_content(
+            f"{content}\n\nOn {original['Date'] or 'earlier'}, {original['From']} wrote:\n{quoted}\n"
+        )
+        reply_uid = self.mailbox.deliver(msg.as_bytes(policy=policy.SMTP))
+        self.replied_at[reply_uid] = time.monotonic()
+        return reply_uid
+
+    def reply_threadsafe(self, uid: int, decision: Optional[str] = None, text: str = "") -> None:
+        assert self.loop is not None
+        self.loop.call_soon_threadsafe(self.reply, uid, decision, text)
+
+    def _on_message(self, uid: int) -> None:
+        msg = self.message(uid)
+        if self.verbose:
+            print(
+                f"[{uid}] {parseaddr(str(msg['From']))[1]} -> "
+                f"{parseaddr(str(msg['To']))[1]}: {msg['Subject']}",
+                flush=True,
+            )
+        # 只自动答复请求邮件，不答复经 SMTP 发来的回复
+        if self.auto_reply and self.loop is not None and not str(msg["Subject"]).startswith("Re:"):
+            self.loop.call_later(self.reply_delay, self.reply, uid, self.auto_reply, "auto reply")
+
+    def stats(self) -> Dict[str, object]:
+        return {
+            "messages": len(self.mailbox.messages),
+            "smtp_connections": self.smtp.connections,
+            "smtp_messages": self.smtp.messages,
+            "imap_connections": self.imap.connections,
+            "imap_commands": dict(self.imap.commands),
+        }
+
+
+def reviewer_console(server: LocalMailServer) -> None:
+    """Read reviewer commands from the terminal (runs in its own thread)."""
+    for line in sys.stdin:
+        try:
+            words = shlex.split(line)
+        except ValueError as e:
+            print(f"无法解析命令：{e}")
+            continue
+        if not words:
+            continue
+        command, args = words[0].lower(), words[1:]
+        if command == "list":
+            for message in server.mailbox.messages:
+                msg = server.message(message.uid)
+                seen = "已读" if "\\Seen" in message.flags else "未读"
+                print(f"[{message.uid}] {seen} {msg['From']}: {msg['Subject']}")
+        elif command in ("approve", "reject", "reply") and args and args[0].isdigit():
+            uid = int(args[0])
+            if not 1 <= uid <= len(server.mailbox.messages):
+                print(f"邮件 {uid} 不存在")
+                continue
+            decision = None if command == "reply" else command
+            server.reply_threadsafe(uid, decision, " ".join(args[1:]))
+            print(f"已回复邮件 {uid}")
+        else:
+            print("命令：approve <编号> [理由] | reject <编号> [理由] | reply <编号> <内容> | list")
+
+
+async def serve(args: argparse.Namespace) -> None:
+    server = LocalMailServer(
+        host=args.host,
+        smtp_port=args.smtp_port,
+        imap_port=args.imap_port,
+        idle=not args.no_idle,
+        auto_reply=args.auto_reply,
+        reply_delay=args.reply_delay,
+        smtp_latency=args.smtp_latency,
+    )
+    await server.start()
+    print(
+        f"SMTP {args.host}:{server.smtp_port}  IMAP {args.host}:{server.imap_port}  "
+        f"IDLE {'关闭' if args.no_idle else '开启'}",
+        flush=True,
+    )
+    threading.Thread(target=reviewer_console, args=(server,), daemon=True).start()
+    try:
+        await asyncio.Event().wait()
+    finally:
+        await server.close()
+        print(server.stats())
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Local IMAP/SMTP stand-in server")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--smtp-port", type=int, default=2525)
+    parser.add_argument("--imap-port", type=int, default=1143)
+    parser.add_argument("--no-idle", action="store_true", help="Do not advertise IDLE")
+    parser.add_argument("--auto-reply", choices=["approve", "reject"])
+    parser.add_argument("--reply-delay", type=float, default=2.0)
+    parser.add_argument(
+        "--smtp-latency", type=float, default=0.0, help="Seconds added to every SMTP reply"
+    )
+    args = parser.parse_args()
+    try:
+        asyncio.run(serve(args))
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,116 @@
+# /// script
+# requires-python = ">=3.10"
+# dependencies = [
+# "gohumanloop>=0.0.10",
+# "imapclient>=3.0.1"]
+# ///
+"""
+批量发送审批邮件的吞吐对比
+
+在本地测试服务器（email_local_server.py）上同时发起大量审批请求，比较：
+- session:  每封邮件单独建立 SMTP 会话并登录（EmailProvider 的做法），
+            在 --connections 个线程中并发发送，两种模式的并发连接数相同
+- pipeline: 通过 SmtpSendPipeline 发送，--connections 个常驻 SMTP 连接，
+            有界队列（--queue-size）满时发送方等待
+
+--smtp-latency 给测试服务器的每个 SMTP 响应加上延迟，模拟远端服务器的往返时间。
+输出总耗时、每秒发送封数、SMTP 连接数和队列统计。
+
+示例：
+    uv run email_send_benchmark.py --emails 500 --smtp-latency 0.02
+"""
+
+import argparse
+import asyncio
+import json
+import logging
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict
+
+from pydantic import SecretStr
+
+from gohumanloop.core.interface import HumanLoopStatus, HumanLoopType
+
+from email_local_server import LocalMailServer
+from ghl_email import IdleEmailProvider
+
+
+async def run(mode: str, args: argparse.Namespace) -> Dict[str, Any]:
+    server = LocalMailServer(
+        smtp_port=0, imap_port=0, smtp_latency=args.smtp_latency, verbose=False
+    )
+    await server.start()
+    # session 模式在默认线程池中发送，限制为同样的并发数
+    asyncio.get_running_loop().set_default_executor(
+        ThreadPoolExecutor(max_workers=args.connections)
+    )
+    provider = IdleEmailProvider(
+        name="EmailProvider",
+        smtp_server="127.0.0.1",
+        smtp_port=server.smtp_port,
+        imap_server="127.0.0.1",
+        imap_port=server.imap_port,
+        username="bot@example.com",
+        password=SecretStr("local"),
+        security="none",
+        language=args.language,
+        smtp_connections=args.connections if mode == "pipeline" else 0,
+        send_queue_size=args.queue_size,
+    )
+
+    async def request(index: int) -> HumanLoopStatus:
+        result = await provider.async_request_humanloop(
+            task_id=f"task-{index}",
+            conversation_id=f"conversation-{index}",
+            loop_type=HumanLoopType.APPROVAL,
+            context={"message": {"function": "multiply", "args": [index, 5]}},
+            metadata={"recipient_email": f"reviewer{index % 10}@example.com"},
+            timeout=60,
+        )
+        return result.status
+
+    start = time.perf_counter()
+    statuses = await asyncio.gather(*(request(i) for i in range(args.emails)))
+    elapsed = time.perf_counter() - start
+
+    for conversation_id in list(provider._conversations):
+        await provider.async_cancel_conversation(conversation_id)
+    result = {
+        "mode": mode,
+        "emails": args.emails,
+        "sent": sum(status == HumanLoopStatus.PENDING for status in statuses),
+        "duration_s": round(elapsed, 2),
+        "emails_per_s": round(args.emails / elapsed, 1),
+        "smtp_connections": server.smtp.connections,
+    }
+    if provider.pipeline is not None:
+        smtp = provider.pipeline.stats()
+        result.update(
+            max_queue_depth=smtp["max_queue_depth"],
+            avg_queue_ms=smtp["avg_queue_ms"],
+            avg_send_ms=smtp["avg_send_ms"],
+        )
+    await server.close()
+    return result
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Bulk approval email send benchmark")
+    parser.add_argument("--emails", type=int, default=500)
+    parser.add_argument("--mode", choices=["session", "pipeline", "all"], default="all")
+    parser.add_argument("--connections", type=int, default=2)
+    parser.add_argument("--queue-size", type=int, default=100)
+    parser.add_argument("--smtp-latency", type=float, default=0.02)
+    parser.add_argument("--language", choices=["en", "zh"], default="en")
+    args = parser.parse_args()
+    # 扫描线程在测试服务器关闭后的重连告警与本测试无关
+    logging.basicConfig(level=logging.ERROR)
+
+    modes = ["session", "pipeline"] if args.mode == "all" else [args.mode]
+    for mode in modes:
+        print(json.dumps(asyncio.run(run(mode, args))))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,1267 @@
+"""
+邮件审批的 IMAP IDLE 推送模式、共享收件箱扫描与批量发送
+
+EmailProvider 为每个待处理请求单独轮询收件箱：每隔 check_interval 秒重新登录 IMAP、
+取回全部未读邮件再比对主题。答复最多要晚 check_interval 秒才能被发现；
+同时等待的审批越多，登录和 FETCH 次数成倍增加，每次取回还会把其他请求的答复
+一起标记为已读。
+
+IdleEmailProvider 在 EmailProvider 的基础上：
+- 同一个邮箱（IMAP 服务器 + 账号）的所有待处理请求共用一个 MailboxScanner：
+  一个后台线程、一个 IMAP 连接，每次只取回上次扫描之后的新 UID 的邮件头，
+  IMAP 开销与等待中的请求数无关
+- 服务器支持 IDLE（RFC 2177）时在 IDLE 中等待，新邮件到达即被唤醒，工作流在答复后
+  约一秒内（管理器的状态检查间隔）继续执行；不支持 IDLE 时每 check_interval 秒轮询一次
+- 发出的邮件带有 Message-ID，答复按 In-Reply-To / References 找到对应的请求，
+  邮件客户端没有保留这些邮件头时再按主题（包含任务 ID）匹配，
+  两种方式都要求发件人是请求的收件人
+- 只有匹配的答复才取回正文并标记为已读，不影响邮箱中的其他邮件
+- 连接断开时自动重连，请求超时与取消由扫描线程统一处理
+- security 支持 ssl（默认，与 EmailProvider 相同）、starttls 和 none，
+  none 用于连接本地测试服务器（email_local_server.py）
+- 发送经过同一 SMTP 账号共用的 SmtpSendPipeline：smtp_connections 个常驻 SMTP 连接
+  依次发送，不再每封邮件重新连接、握手和登录；队列最多 send_queue_size 封，
+  满时发送方等待；邮件模板按语言和请求类型只生成一次
+- digest_window 大于 0 时，同一收件人在窗口内的审批请求合并为一封汇总邮件，
+  审批人用一封答复逐项决定（如 "1 approve, 2 reject: 金额过高" 或 "all approve"），
+  未答复的项保持待处理，可在同一邮件会话中继续答复
+
+配置（环境变量）：
+- EMAIL_SECURITY: ssl、starttls 或 none
+- EMAIL_DIGEST_WINDOW: 汇总窗口（秒），0 为每个请求单独发送
+"""
+
+import asyncio
+import logging
+import queue
+import re
+import smtplib
+import ssl
+import threading
+import time
+import uuid
+from collections import OrderedDict, deque
+from concurrent.futures import Future, InvalidStateError
+from dataclasses import dataclass, field
+from datetime import datetime
+from email import message_from_bytes
+from email.header import decode_header, make_header
+from email.message import Message
+from email.mime.multipart import MIMEMultipart
+from email.mime.text import MIMEText
+from email.parser import BytesHeaderParser
+from email.utils import make_msgid
+from typing import Any, Callable, Dict, List, Optional, Set, Tuple
+
+from imapclient import IMAPClient  # type: ignore
+from imapclient.exceptions import IMAPClientError  # type: ignore
+
+from gohumanloop.core.interface import HumanLoopResult, HumanLoopStatus, HumanLoopType
+from gohumanloop.providers.email_provider import EmailProvider
+
+logger = logging.getLogger(__name__)
+
+SECURITY_MODES = ("ssl", "starttls", "none")
+
+# 答复主题的常见前缀：Re:、RE:、Fwd:、回复：、答复： 等
+_REPLY_PREFIX = re.compile(r"^\s*((re|fw|fwd|aw|sv|回复|答复|转发)\s*[:：]\s*)+", re.I)
+_MESSAGE_ID = re.compile(r"<[^<>\s]+>")
+
+# 同一个邮箱共用一个扫描器：(IMAP 服务器, 端口, 账号) -> MailboxScanner
+_scanners: Dict[Tuple[str, int, str], "MailboxScanner"] = {}
+# 同一个发件账号共用一条发送管道：(SMTP 服务器, 端口, 账号) -> SmtpSendPipeline
+_pipelines: Dict[Tuple[str, int, str], "SmtpSendPipeline"] = {}
+_scanners_lock = threading.Lock()
+# (语言, 请求类型) -> (纯文本正文后缀, HTML 正文中主要内容之后的部分)
+_compiled_templates: Dict[Tuple[str, HumanLoopType], Tuple[str, str]] = {}
+
+# 汇总邮件中代表其他等待答复请求的会话 ID，请求 ID 为汇总编号
+_DIGEST_CONVERSATION = "__digest__"
+_DIGEST_TEMPLATES = {
+    "en": {
+        "subject": "{count} approval requests (Digest {digest_id})",
+        "intro": "{count} requests are waiting for your approval.",
+        "instruction": "Reply with a decision for each item number, separated by commas. "
+        "A reason may follow a colon, for example:",
+        "example": "1 approve, 2 reject: amount too high",
+        "all_hint": '"all approve" or "all reject" answers every item at once. Items you '
+        "leave out stay pending and can be answered in a later reply.",
+        "item_title": "Item {index} of {count}",
+        "approve": "approve",
+        "reject": "reject",
+    },
+    "zh": {
+        "subject": "{count} 个待审批请求（汇总 {digest_id}）",
+        "intro": "有 {count} 个请求等待您的审批。",
+        "instruction": "请按编号逐项回复决定，用逗号分隔，理由写在冒号之后，例如：",
+        "example": "1 批准，2 拒绝：金额过高",
+        "all_hint": "回复“全部 批准”或“全部 拒绝”可一次答复所有请求。"
+        "未答复的请求保持待处理，可在之后的回复中继续答复。",
+        "item_title": "第 {index} 项（共 {count} 项）",
+        "approve": "批准",
+        "reject": "拒绝",
+    },
+}
+# 汇总答复中的一项：编号（或 all / 全部）后跟决定，前面是行首或分隔符
+_DIGEST_ENTRY = re.compile(r"(?:^|[,，;；\n])\s*(all|全部|\d+)\s*[.)、]?\s*([^\W\d_]+)", re.I)
+# 未填写的选项，如 "3 [approve|reject]"
+_DIGEST_PLACEHOLDER = re.compile(r"\d+\s*\[[^\]]*\|[^\]]*\]")
+
+
+@dataclass
+class Waiter:
+    """A pending request waiting for its reply."""
+
+    provider: "IdleEmailProvider"
+    conversation_id: str
+    request_id: str
+    subject: str
+    sender_email: Optional[str]
+    message_ids: List[str] = field(default_factory=list)
+    deadline: Optional[float] = None
+
+    @property
+    def key(self) -> Tuple[str, str]:
+        return (self.conversation_id, self.request_id)
+
+
+@dataclass
+class DigestItem:
+    """An approval request waiting to be listed in a digest email."""
+
+    conversation_id: str
+    request_id: str
+    task_id: str
+    subject: str
+    prompt: str
+    timeout: Optional[int]
+    deadline: Optional[float]
+
+
+@dataclass
+class Digest:
+    """Approval requests for one recipient that are sent and answered in one email."""
+
+    digest_id: str
+    recipient_email: str
+    items: List[DigestItem] = field(default_factory=list)
+    timer: Optional[threading.Timer] = None
+
+
+def parse_digest_reply(
+    text: str,
+    count: int,
+    approve_keywords: Set[str],
+    reject_keywords: Set[str],
+    decision_prefix: str = "",
+) -> Dict[int, Tuple[str, str]]:
+    """Parse a digest reply like "1 approve, 2 reject: too high" into decisions.
+
+    Args:
+        text: The reviewer's reply without quoted content
+        count: Number of items in the digest, other item numbers are ignored
+        approve_keywords: Words that approve an item
+        reject_keywords: Words that reject an item
+        decision_prefix: Optional prefix of the decision line, e.g. "Decision: "
+
+    Returns:
+        Dict: item number (from 1) -> ("approved" | "rejected", reason)
+    """
+    prefix = decision_prefix.strip()
+    lines = []
+    for line in text.split("\n"):
+        line = line.strip()
+        if line.startswith(">"):
+            continue
+        if prefix and line.startswith(prefix):
+            line = line[len(prefix) :]
+        lines.append(_DIGEST_PLACEHOLDER.sub("", line))
+    text = "\n".join(lines)
+
+    # 决定词不是审批关键词的不算一项，例如理由中的 "3 days"
+    entries = []
+    for match in _DIGEST_ENTRY.finditer(text):
+        word = match.group(2).lower()
+        if word in approve_keywords:
+            entries.append((match, "approved"))
+        elif word in reject_keywords:
+            entries.append((match, "rejected"))
+
+    decisions: Dict[int, Tuple[str, str]] = {}
+    answer_all = None
+    for i, (match, decision) in enumerate(entries):
+        end = entries[i + 1][0].start() if i + 1 < len(entries) else len(text)
+        reason = text[match.end() : end].strip(" \t\n:：-,，;；")
+        item = match.group(1).lower()
+        if not item.isdigit():
+            answer_all = answer_all or (decision, reason)
+        elif 1 <= int(item) <= count:
+            decisions.setdefault(int(item), (decision, reason))
+    if answer_all is not None:
+        for index in range(1, count + 1):
+            decisions.setdefault(index, answer_all)
+    return decisions
+
+
+class MailboxScanner:
+    """One IMAP connection and background thread that scans a mailbox for
+    replies to every pending request registered with it.
+
+    Args:
+        connect: Returns a logged-in IMAPClient
+        idle: Whether to use IDLE when the server supports it
+        poll_interval: Seconds between scans without IDLE, also the reconnect delay
+        idle_timeout: Seconds before an IDLE command is renewed
+        wake_interval: Seconds between timeout and cancellation checks while waiting
+        recent_replies: Unmatched replies remembered for requests registered late
+    """
+
+    def __init__(
+        self,
+        connect: Callable[[], IMAPClient],
+        idle: bool = True,
+        poll_interval: float = 60,
+        idle_timeout: float = 600,
+        wake_interval: float = 1.0,
+        recent_replies: int = 200,
+    ):
+        self.connect = connect
+        self.idle = idle
+        self.poll_interval = poll_interval
+        self.idle_timeout = idle_timeout
+        self.wake_interval = wake_interval
+        self.recent_replies = recent_replies
+
+        self._lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._waiters: Dict[Tuple[str, str], Waiter] = {}
+        self._by_subject: Dict[str, Waiter] = {}
+        self._by_message_id: Dict[str, Waiter] = {}
+        # 尚未匹配到请求的新邮件：uid -> 邮件头，请求登记晚于答复到达时使用
+        self._unmatched: "OrderedDict[int, Message]" = OrderedDict()
+        self._retry: List[int] = []
+        # 本进程发出的邮件，扫描时跳过
+        self._own_message_ids: "OrderedDict[str, None]" = OrderedDict()
+        self._uid_validity: Optional[int] = None
+        self._uid_next = 1
+        self._last_uid: Optional[int] = None
+        self.counters = {
+            "connections": 0,
+            "scans": 0,
+            "headers_fetched": 0,
+            "replies_routed": 0,
+            "expired": 0,
+        }
+
+    # ------------------------------------------------------------------
+    # 登记
+    # ------------------------------------------------------------------
+
+    def remember_sent(self, message_id: str) -> None:
+        with self._lock:
+            self._own_message_ids[message_id] = None
+            while len(self._own_message_ids) > 10 * self.recent_replies:
+                self._own_message_ids.popitem(last=False)
+
+    def register(self, waiter: Waiter) -> None:
+        with self._lock:
+            self._waiters[waiter.key] = waiter
+            self._by_subject[_strip_reply_prefix(waiter.subject)] = waiter
+            for message_id in waiter.message_ids:
+                self._by_message_id[message_id] = waiter
+            # 答复可能在登记之前已被扫描到
+            for uid, headers in self._unmatched.items():
+                if self._route(headers) is waiter:
+                    self._retry.append(uid)
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(
+                    target=self._run, name="imap-scanner", daemon=True
+                )
+                self._thread.start()
+        # 唤醒等待新请求的扫描线程，已到达的答复需要尽快补处理
+        self._wakeup.set()
+
+    def _unregister(self, waiter: Waiter) -> None:
+        # 调用方持有 self._lock
+        if self._waiters.get(waiter.key) is not waiter:
+            return
+        del self._waiters[waiter.key]
+        subject = _strip_reply_prefix(waiter.subject)
+        if self._by_subject.get(subject) is waiter:
+            del self._by_subject[subject]
+        for message_id in waiter.message_ids:
+            if self._by_message_id.get(message_id) is waiter:
+                del self._by_message_id[message_id]
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {**self.counters, "waiting": len(self._waiters)}
+
+    # ------------------------------------------------------------------
+    # 扫描线程
+    # ------------------------------------------------------------------
+
+    def _run(self) -> None:
+        client: Optional[IMAPClient] = None
+        use_idle = False
+        while True:
+            self._sweep()
+            with self._lock:
+                waiting = bool(self._waiters)
+            if not waiting:
+                # 没有等待中的请求时断开连接，直到有新的请求登记
+                client = self._close(client)
+                self._wakeup.wait()
+                self._wakeup.clear()
+                continue
+
+            try:
+                if client is None:
+                    client = self._open()
+                    use_idle = self.idle and client.has_capability("IDLE")
+                    if self.idle and not use_idle:
+                        logger.info(
+                            f"IMAP server has no IDLE, polling every {self.poll_interval}s"
+                        )
+                self._scan(client)
+                self._wait(client, use_idle)
+            except (OSError, IMAPClientError) as e:
+                # 连接被服务器断开（常见于长时间 IDLE），稍后重新连接
+                logger.warning(
+                    f"IMAP connection lost, reconnecting in {self.poll_interval}s: {e}"
+                )
+                client = self._close(client)
+                time.sleep(self.poll_interval)
+            except Exception as e:
+                logger.error(f"IMAP scanner error: {e}", exc_info=True)
+                client = self._close(client)
+                time.sleep(self.poll_interval)
+
+    def _open(self) -> IMAPClient:
+        client = self.connect()
+        self.counters["connections"] += 1
+        folder = client.select_folder("INBOX")
+        uid_validity = folder.get(b"UIDVALIDITY")
+        if self._last_uid is None or uid_validity != self._uid_validity:
+            # 首次连接或 UID 失效：先扫描一次未读邮件，之后只取新 UID
+            self._last_uid = None
+            self._uid_validity = uid_validity
+            self._uid_next = folder.get(b"UIDNEXT") or (
+                max(client.search("ALL"), default=0) + 1
+            )
+        return client
+
+    @staticmethod
+    def _close(client: Optional[IMAPClient]) -> None:
+        if client is not None:
+            try:
+                client.logout()
+            except Exception:
+                client.shutdown()
+        return None
+
+    def _scan(self, client: IMAPClient) -> None:
+        """Fetch headers of mail that arrived since the last scan and deliver
+        the replies that belong to pending requests."""
+        self.counters["scans"] += 1
+        matches: List[Tuple[int, Waiter]] = []
+        if self._last_uid is None:
+            uids = sorted(client.search("UNSEEN"))[-self.recent_replies :]
+            self._last_uid = max([self._uid_next - 1, *uids])
+            if uids:
+                matches = self._match(client, uids)
+
+        while True:
+            with self._lock:
+                for uid in self._retry:
+                    headers = self._unmatched.get(uid)
+                    waiter = self._route(headers) if headers is not None else None
+                    if waiter is not None:
+                        matches.append((uid, waiter))
+                self._retry.clear()
+            if matches:
+                self._deliver(client, matches)
+
+            # 扫描期间到达的邮件可能已在 FETCH / STORE 的响应中报告过，进入 IDLE 后
+            # 服务器不会再次通知，因此反复检查 UIDNEXT，直到没有新邮件
+            uid_next = client.folder_status("INBOX", ["UIDNEXT"])[b"UIDNEXT"]
+            if uid_next - 1 <= self._last_uid:
+                return
+            uids = list(range(self._last_uid + 1, uid_next))
+            self._last_uid = uid_next - 1
+            matches = self._match(client, uids)
+
+    def _deliver(self, client: IMAPClient, matches: List[Tuple[int, Waiter]]) -> None:
+        """Download the matched replies in one FETCH, mark them read and hand
+        each one to its request."""
+        with self._lock:
+            routed = {}
+            for uid, waiter in matches:
+                if self._waiters.get(waiter.key) is waiter:
+                    self._unregister(waiter)
+                    self._unmatched.pop(uid, None)
+                    routed[uid] = waiter
+        if not routed:
+            return
+        bodies = client.fetch(list(routed), ["BODY.PEEK[]"])
+        client.add_flags(list(routed), [b"\\Seen"])
+        self.counters["replies_routed"] += len(routed)
+        for uid, waiter in routed.items():
+            waiter.provider._deliver_reply(waiter, message_from_bytes(bodies[uid][b"BODY[]"]))
+
+    def _match(self, client: IMAPClient, uids: List[int]) -> List[Tuple[int, Waiter]]:
+        """Fetch the headers of uids and return the replies with a pending request."""
+        parser = BytesHeaderParser()
+        fetched = client.fetch(uids, ["BODY.PEEK[HEADER]"])
+        self.counters["headers_fetched"] += len(fetched)
+        matches = []
+        with self._lock:
+            for uid in sorted(fetched):
+                headers = parser.parsebytes(fetched[uid][b"BODY[HEADER]"])
+                if headers.get("Message-ID", "").strip() in self._own_message_ids:
+                    continue
+                waiter = self._route(headers)
+                if waiter is not None:
+                    matches.append((uid, waiter))
+                else:
+                    self._unmatched[uid] = headers
+                    while len(self._unmatched) > self.recent_replies:
+                        self._unmatched.popitem(last=False)
+        return matches
+
+    def _route(self, headers: Message) -> Optional[Waiter]:
+        """Find the pending request a reply belongs to. Caller holds self._lock."""
+        waiter = None
+        references = " ".join(
+            str(headers.get(name, "")) for name in ("In-Reply-To", "References")
+        )
+        for message_id in reversed(_MESSAGE_ID.findall(references)):
+            waiter = self._by_message_id.get(message_id)
+            if waiter is not None:
+                break
+
+        if waiter is None:
+            subject = _strip_reply_prefix(_decode_header(headers.get("Subject", "")))
+            waiter = self._by_subject.get(subject)
+            if waiter is None:
+                # 邮件客户端改写了主题时，按包含关系匹配（主题中包含任务 ID）
+                waiter = next(
+                    (w for s, w in self._by_subject.items() if s and s in subject),
+                    None,
+                )
+
+        if waiter is not None and waiter.sender_email:
+            if waiter.sender_email not in _decode_header(headers.get("From", "")):
+                return None
+        return waiter
+
+    def _sweep(self) -> None:
+        """Drop requests that are no longer pending and expire timed out ones."""
+        now = time.monotonic()
+        with self._lock:
+            for waiter in list(self._waiters.values()):
+                if not waiter.provider._is_pending(waiter.key):
+                    self._unregister(waiter)
+                elif waiter.deadline is not None and now >= waiter.deadline:
+                    self._unregister(waiter)
+                    self.counters["expired"] += 1
+                    waiter.provider._expire(waiter)
+
+    def _wait(self, client: IMAPClient, use_idle: bool) -> None:
+        """Wait until new mail arrives (IDLE) or the poll interval has passed,
+        checking timeouts every wake_interval seconds."""
+        deadline = time.monotonic() + (self.idle_timeout if use_idle else self.poll_interval)
+        if use_idle:
+            client.idle()
+        try:
+            while time.monotonic() < deadline and not self._retry:
+                if use_idle:
+                    responses = client.idle_check(timeout=self.wake_interval)
+                    if any(
+                        len(response) > 1 and response[1] in (b"EXISTS", b"RECENT")
+                        for response in responses
+                    ):
+                        return
+                else:
+                    time.sleep(self.wake_interval)
+                self._sweep()
+                with self._lock:
+                    if not self._waiters:
+                        return
+        finally:
+            if use_idle:
+                client.idle_done()
+
+
+def _strip_reply_prefix(subject: str) -> str:
+    return _REPLY_PREFIX.sub("", subject).strip()
+
+
+def _message_text(email_msg: Message) -> Tuple[str, str]:
+    """Return the plain text and HTML bodies of a message, skipping attachments."""
+    body = ""
+    html_body = ""
+    for part in email_msg.walk():
+        if part.is_multipart() or "attachment" in str(part.get("Content-Disposition")):
+            continue
+        payload = part.get_payload(decode=True)
+        if not isinstance(payload, bytes):
+            continue
+        text = payload.decode(part.get_content_charset() or "utf-8", errors="replace")
+        if part.get_content_type() == "text/plain":
+            body = text
+        elif part.get_content_type() == "text/html":
+            html_body = text
+    return body, html_body
+
+
+def _decode_header(value: str) -> str:
+    try:
+        return str(make_header(decode_header(str(value))))
+    except Exception:
+        return str(value)
+
+
+class _Slots:
+    """Counting semaphore whose waiters are concurrent futures, so coroutines
+    on any event loop (and plain threads) can wait for a free slot."""
+
+    def __init__(self, size: int):
+        self._free = size
+        self._waiters: "deque[Future]" = deque()
+        self._lock = threading.Lock()
+
+    def acquire(self) -> Future:
+        future: Future = Future()
+        with self._lock:
+            if self._free > 0:
+                self._free -= 1
+                future.set_result(None)
+            else:
+                self._waiters.append(future)
+        return future
+
+    def release(self) -> None:
+        with self._lock:
+            while self._waiters:
+                try:
+                    # 等待者可能已被取消，跳过
+                    self._waiters.popleft().set_result(None)
+                    return
+                except InvalidStateError:
+                    continue
+            self._free += 1
+
+
+@dataclass
+class _SendJob:
+    msg: MIMEMultipart
+    future: Future
+    queued_at: float = field(default_factory=time.monotonic)
+
+
+class SmtpSendPipeline:
+    """Bounded send queue drained by a few worker threads, each keeping one
+    SMTP connection open across messages.
+
+    Args:
+        connect: Returns a logged-in smtplib.SMTP connection
+        connections: Number of worker threads and SMTP connections
+        queue_size: Messages that may wait in the queue, senders wait beyond that
+        max_messages_per_connection: Messages sent before a connection is renewed,
+            many servers limit messages per session
+        idle_close: Seconds without messages before a connection is closed
+    """
+
+    def __init__(
+        self,
+        connect: Callable[[], smtplib.SMTP],
+        connections: int = 2,
+        queue_size: int = 100,
+        max_messages_per_connection: int = 100,
+        idle_close: float = 60,
+    ):
+        self.connect = connect
+        self.connections = connections
+        self.queue_size = queue_size
+        self.max_messages_per_connection = max_messages_per_connection
+        self.idle_close = idle_close
+        self._queue: "queue.Queue[_SendJob]" = queue.Queue()
+        self._slots = _Slots(queue_size)
+        self._workers: List[threading.Thread] = []
+        self._lock = threading.Lock()
+        self._first_queued: Optional[float] = None
+        self._last_sent: Optional[float] = None
+        self.counters = {
+            "sent": 0,
+            "failed": 0,
+            "connections": 0,
+            "reconnects": 0,
+            "max_queue_depth": 0,
+            "send_time": 0.0,
+            "queue_time": 0.0,
+        }
+
+    async def send(self, msg: MIMEMultipart) -> None:
+        """Queue msg and wait until it has been handed to the SMTP server.
+
+        Waits for a free queue slot first when queue_size messages are already waiting.
+        """
+        await asyncio.wrap_future(self._slots.acquire())
+        job = _SendJob(msg, Future())
+        with self._lock:
+            self._first_queued = self._first_queued or job.queued_at
+            self._queue.put(job)
+            self.counters["max_queue_depth"] = max(
+                self.counters["max_queue_depth"], self._queue.qsize()
+            )
+            self._workers = [worker for worker in self._workers if worker.is_alive()]
+            while len(self._workers) < self.connections:
+                worker = threading.Thread(target=self._run, name="smtp-sender", daemon=True)
+                worker.start()
+                self._workers.append(worker)
+        await asyncio.wrap_future(job.future)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            counters = dict(self.counters)
+            elapsed = (
+                self._last_sent - self._first_queued
+                if self._first_queued is not None and self._last_sent is not None
+                else 0.0
+            )
+        sent = counters.pop("sent")
+        send_time = counters.pop("send_time")
+        queue_time = counters.pop("queue_time")
+        return {
+            "sent": sent,
+            **counters,
+            "queue_depth": self._queue.qsize(),
+            "avg_send_ms": round(1000 * send_time / sent, 2) if sent else 0.0,
+            "avg_queue_ms": round(1000 * queue_time / sent, 2) if sent else 0.0,
+            "throughput_per_s": round(sent / elapsed, 1) if elapsed > 0 else 0.0,
+        }
+
+    def _run(self) -> None:
+        server: Optional[smtplib.SMTP] = None
+        sent_on_connection = 0
+        while True:
+            try:
+                job = self._queue.get(timeout=self.idle_close)
+            except queue.Empty:
+                server = self._close(server)
+                continue
+            self._slots.release()
+            if not job.future.set_running_or_notify_cancel():
+                continue
+
+            started = time.monotonic()
+            for attempt in range(2):
+                try:
+                    if server is None:
+                        server = self.connect()
+                        sent_on_connection = 0
+                        with self._lock:
+                            self.counters["connections"] += 1
+                    server.send_message(job.msg)
+                    sent_on_connection += 1
+                    finished = time.monotonic()
+                    with self._lock:
+                        self.counters["sent"] += 1
+                        self.counters["send_time"] += finished - started
+                        self.counters["queue_time"] += started - job.queued_at
+                        self._last_sent = finished
+                    job.future.set_result(None)
+                    break
+                except (smtplib.SMTPServerDisconnected, OSError) as e:
+                    # 服务器关闭了空闲连接，重新连接后重试一次
+                    server = self._close(server)
+                    if attempt == 0:
+                        with self._lock:
+                            self.counters["reconnects"] += 1
+                        continue
+                    self._fail(job, e)
+                except Exception as e:
+                    # 收件人被拒等错误只影响当前邮件，连接继续使用
+                    self._fail(job, e)
+                    if server is not None:
+                        try:
+                            server.rset()
+                        except Exception:
+                            server = self._close(server)
+                    break
+
+            if server is not None and sent_on_connection >= self.max_messages_per_connection:
+                server = self._close(server)
+
+    def _fail(self, job: _SendJob, error: BaseException) -> None:
+        logger.error(f"Failed to send email: {error}")
+        with self._lock:
+            self.counters["failed"] += 1
+        job.future.set_exception(error)
+
+    @staticmethod
+    def _close(server: Optional[smtplib.SMTP]) -> None:
+        if server is not None:
+            try:
+                server.quit()
+            except Exception:
+                server.close()
+        return None
+
+
+class IdleEmailProvider(EmailProvider):
+    """Email provider whose replies are collected by a MailboxScanner shared
+    by every provider using the same mailbox, and whose emails are sent
+    through a SmtpSendPipeline shared by every provider using the same account.
+
+    Args:
+        security: Connection security for SMTP and IMAP: "ssl", "starttls" or "none"
+        smtp_connections: Persistent SMTP connections used for sending, 0 opens
+            a new session for every email like EmailProvider
+        send_queue_size: Emails that may wait to be sent before senders wait
+        idle: Whether to use IDLE when the server supports it
+        idle_timeout: Seconds before an IDLE command is renewed, servers drop
+            idle connections after 30 minutes at the latest
+        wake_interval: Seconds between timeout and cancellation checks while waiting
+        digest_window: Seconds approval requests for the same recipient are
+            collected and sent as one digest email, 0 sends every request at once
+        digest_max_items: Requests after which a digest is sent before its window ends
+        *args, **kwargs: Passed to EmailProvider, check_interval is the polling
+            interval without IDLE and the reconnect delay
+    """
+
+    def __init__(
+        self,
+        *args: Any,
+        security: str = "ssl",
+        smtp_connections: int = 2,
+        send_queue_size: int = 100,
+        idle: bool = True,
+        idle_timeout: float = 600,
+        wake_interval: float = 1.0,
+        digest_window: float = 0,
+        digest_max_items: int = 20,
+        **kwargs: Any,
+    ):
+        if security not in SECURITY_MODES:
+            raise ValueError(
+                f"Unknown security mode '{security}', expected one of {SECURITY_MODES}"
+            )
+        super().__init__(*args, **kwargs)
+        self.security = security
+        self.smtp_connections = smtp_connections
+        self.send_queue_size = send_queue_size
+        self.idle = idle
+        self.idle_timeout = idle_timeout
+        self.wake_interval = wake_interval
+        self.digest_window = digest_window
+        self.digest_max_items = digest_max_items
+        # 收件人 -> 正在收集请求的汇总
+        self._open_digests: Dict[str, Digest] = {}
+        # (_DIGEST_CONVERSATION, 汇总编号) -> 已发出、等待答复的汇总
+        self._digests: Dict[Tuple[str, str], Digest] = {}
+        self._digest_lock = threading.Lock()
+        self.digest_counters = {"sent": 0, "items": 0, "replies": 0}
+        # 邮件主题（即邮件会话）-> 已发出的 Message-ID
+        self._thread_message_ids: Dict[str, List[str]] = {}
+        self.scanner = self._shared_scanner()
+        self.pipeline = self._shared_pipeline() if smtp_connections > 0 else None
+
+    def _shared_scanner(self) -> MailboxScanner:
+        key = (self.imap_server, self.imap_port, self.username)
+        with _scanners_lock:
+            scanner = _scanners.get(key)
+            if scanner is None:
+                scanner = MailboxScanner(
+                    self._connect_imap,
+                    idle=self.idle,
+                    poll_interval=self.check_interval,
+                    idle_timeout=self.idle_timeout,
+                    wake_interval=self.wake_interval,
+                )
+                _scanners[key] = scanner
+            return scanner
+
+    def _shared_pipeline(self) -> SmtpSendPipeline:
+        key = (self.smtp_server, self.smtp_port, self.username)
+        with _scanners_lock:
+            pipeline = _pipelines.get(key)
+            if pipeline is None:
+                pipeline = SmtpSendPipeline(
+                    self._connect_smtp,
+                    connections=self.smtp_connections,
+                    queue_size=self.send_queue_size,
+                )
+                _pipelines[key] = pipeline
+            return pipeline
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "imap": self.scanner.stats(),
+            "smtp": self.pipeline.stats() if self.pipeline is not None else {},
+            "digest": dict(self.digest_counters),
+        }
+
+    # ------------------------------------------------------------------
+    # 连接
+    # ------------------------------------------------------------------
+
+    def _connect_imap(self) -> IMAPClient:
+        client = IMAPClient(
+            host=self.imap_server, port=self.imap_port, ssl=self.security == "ssl"
+        )
+        try:
+            if self.security == "starttls":
+                client.starttls(ssl.create_default_context())
+            client.login(self.username, self.password.get_secret_value())
+            # 发送 ID 命令，解决某些邮箱服务器的安全限制（如网易邮箱）
+            try:
+                client.id_({"name": "GoHumanLoop", "version": "1.0.0"})
+            except Exception as e:
+                logger.debug(f"IMAP ID command not accepted: {e}")
+        except Exception:
+            client.shutdown()
+            raise
+        return client
+
+    def _connect_smtp(self) -> smtplib.SMTP:
+        if self.security == "ssl":
+            server = smtplib.SMTP_SSL(self.smtp_server, self.smtp_port, timeout=30)
+        else:
+            server = smtplib.SMTP(self.smtp_server, self.smtp_port, timeout=30)
+        try:
+            if self.security == "starttls":
+                server.starttls(context=ssl.create_default_context())
+            server.login(self.username, self.password.get_secret_value())
+        except Exception:
+            server.close()
+            raise
+        return server
+
+    def _send_email_sync(self, msg: MIMEMultipart) -> None:
+        server = self._connect_smtp()
+        try:
+            server.send_message(msg)
+        finally:
+            SmtpSendPipeline._close(server)
+
+    # ------------------------------------------------------------------
+    # 发送
+    # ------------------------------------------------------------------
+
+    async def _async_send_email(
+        self,
+        to_email: str,
+        subject: str,
+        body: str,
+        html_body: Optional[str] = None,
+        reply_to: Optional[str] = None,
+    ) -> bool:
+        try:
+            msg = MIMEMultipart("alternative")
+            msg["From"] = self.sender_email
+            msg["To"] = to_email
+            msg["Subject"] = subject
+            # 答复会在 In-Reply-To / References 中带上这个 Message-ID
+            msg["Message-ID"] = make_msgid(domain="gohumanloop")
+            if reply_to:
+                msg["In-Reply-To"] = reply_to
+                msg["References"] = reply_to
+            msg.attach(MIMEText(body, "plain"))
+            if html_body:
+                msg.attach(MIMEText(html_body, "html"))
+
+            self._thread_message_ids.setdefault(subject, []).append(msg["Message-ID"])
+            self.scanner.remember_sent(msg["Message-ID"])
+
+            if self.pipeline is not None:
+                await self.pipeline.send(msg)
+            else:
+                loop = asyncio.get_running_loop()
+                await loop.run_in_executor(None, self._send_email_sync, msg)
+            return True
+        except Exception as e:
+            logger.error(f"Failed to send email: {str(e)}", exc_info=True)
+            return False
+
+    async def async_request_humanloop(
+        self,
+        task_id: str,
+        conversation_id: str,
+        loop_type: HumanLoopType,
+        context: Dict[str, Any],
+        metadata: Optional[Dict[str, Any]] = None,
+        timeout: Optional[int] = None,
+    ) -> HumanLoopResult:
+        metadata = metadata or {}
+        recipient_email = metadata.get("recipient_email")
+        if (
+            self.digest_window <= 0
+            or loop_type != HumanLoopType.APPROVAL
+            or not recipient_email
+        ):
+            return await super().async_request_humanloop(
+                task_id, conversation_id, loop_type, context, metadata, timeout
+            )
+
+        # 与 EmailProvider 相同地登记请求，邮件在汇总窗口结束时发送
+        request_id = self._generate_request_id()
+        subject_prefix = metadata.get("subject_prefix", f"[{self.name}]")
+        subject = metadata.get("subject", f"{subject_prefix} Task {task_id}")
+        self._store_request(
+            conversation_id=conversation_id,
+            request_id=request_id,
+            task_id=task_id,
+            loop_type=loop_type,
+            context=context,
+            metadata={**metadata, "subject": subject, "recipient_email": recipient_email},
+            timeout=timeout,
+        )
+        prompt = self.build_prompt(
+            task_id=task_id,
+            conversation_id=conversation_id,
+            request_id=request_id,
+            loop_type=loop_type,
+            created_at=datetime.now().isoformat(),
+            context=context,
+            metadata=metadata,
+            color=False,
+        )
+        item = DigestItem(
+            conversation_id=conversation_id,
+            request_id=request_id,
+            task_id=task_id,
+            subject=subject,
+            prompt=prompt,
+            timeout=timeout,
+            deadline=time.monotonic() + timeout if timeout else None,
+        )
+
+        full = None
+        with self._digest_lock:
+            digest = self._open_digests.get(recipient_email)
+            if digest is None:
+                digest = Digest(uuid.uuid4().hex[:8], recipient_email)
+                # 请求可能来自随后就关闭的事件循环，窗口结束时在计时器线程中发送
+                digest.timer = threading.Timer(
+                    self.digest_window, self._flush_digest, args=(digest,)
+                )
+                digest.timer.daemon = True
+                digest.timer.start()
+                self._open_digests[recipient_email] = digest
+            digest.items.append(item)
+            if len(digest.items) >= self.digest_max_items:
+                full = self._open_digests.pop(recipient_email)
+                if full.timer is not None:
+                    full.timer.cancel()
+        if full is not None:
+            await self._send_digest(full)
+
+        request_info = self._requests[(conversation_id, request_id)]
+        return HumanLoopResult(
+            conversation_id=conversation_id,
+            request_id=request_id,
+            loop_type=loop_type,
+            status=request_info["status"],
+            error=request_info.get("error"),
+        )
+
+    def _flush_digest(self, digest: Digest) -> None:
+        """Send a digest when its window ends (runs in the timer thread)."""
+        with self._digest_lock:
+            if self._open_digests.get(digest.recipient_email) is not digest:
+                return
+            del self._open_digests[digest.recipient_email]
+        try:
+            asyncio.run(self._send_digest(digest))
+        except Exception as e:
+            logger.error(f"Failed to send digest email: {str(e)}", exc_info=True)
+
+    async def _send_digest(self, digest: Digest) -> None:
+        # 窗口内已取消的请求不再列出
+        digest.items = [
+            item
+            for item in digest.items
+            if self._is_pending((item.conversation_id, item.request_id))
+        ]
+        if not digest.items:
+            return
+        if len(digest.items) == 1:
+            # 窗口内只有一个请求时按普通审批邮件发送
+            item = digest.items[0]
+            body, html_body = self._format_email_body(
+                item.prompt, HumanLoopType.APPROVAL, item.subject
+            )
+            if not await self._async_send_email(
+                to_email=digest.recipient_email,
+                subject=item.subject,
+                body=body,
+                html_body=html_body,
+            ):
+                self._update_request_status_error(
+                    item.conversation_id, item.request_id, "Failed to send email"
+                )
+                return
+            self._subject_to_request[item.subject] = (item.conversation_id, item.request_id)
+            self._register_waiter(
+                item.conversation_id,
+                item.request_id,
+                digest.recipient_email,
+                item.subject,
+                item.deadline,
+            )
+            return
+
+        template = _DIGEST_TEMPLATES.get(self.language, _DIGEST_TEMPLATES["en"])
+        subject = f"[{self.name}] " + template["subject"].format(
+            count=len(digest.items), digest_id=digest.digest_id
+        )
+        body, html_body = self._format_digest_body(digest, template)
+        if not await self._async_send_email(
+            to_email=digest.recipient_email,
+            subject=subject,
+            body=body,
+            html_body=html_body,
+        ):
+            for item in digest.items:
+                self._update_request_status_error(
+                    item.conversation_id, item.request_id, "Failed to send email"
+                )
+            return
+
+        for index, item in enumerate(digest.items, 1):
+            request_info = self._get_request(item.conversation_id, item.request_id)
+            if request_info is not None:
+                request_info["metadata"].update(
+                    subject=subject, digest_id=digest.digest_id, digest_item=index
+                )
+        key = (_DIGEST_CONVERSATION, digest.digest_id)
+        with self._digest_lock:
+            self._digests[key] = digest
+            self.digest_counters["sent"] += 1
+            self.digest_counters["items"] += len(digest.items)
+        deadlines = [item.deadline for item in digest.items]
+        self._register_waiter(
+            *key,
+            digest.recipient_email,
+            subject,
+            None if None in deadlines else max(deadlines),
+        )
+
+    def _format_digest_body(
+        self, digest: Digest, template: Dict[str, str]
+    ) -> Tuple[str, str]:
+        count = len(digest.items)
+        choices = f"[{template['approve']}|{template['reject']}]"
+        reply_lines = [
+            self.templates["content_start_mark"],
+            self.templates["decision_prefix"]
+            + ", ".join(f"{index} {choices}" for index in range(1, count + 1)),
+            self.templates["content_end_mark"],
+        ]
+        head = [
+            template["intro"].format(count=count),
+            template["instruction"],
+            template["example"],
+            template["all_hint"],
+        ]
+
+        text = "\n".join(head) + "\n\n" + "\n".join(reply_lines) + "\n"
+        html = ["<html><body>", *(f"<p>{line}</p>" for line in head)]
+        html.append(
+            "<pre style='background-color: #ffffff; padding: 10px; border: 1px solid #eee;'>\n"
+            + "\n".join(reply_lines)
+            + "</pre>"
+        )
+        for index, item in enumerate(digest.items, 1):
+            title = template["item_title"].format(index=index, count=count)
+            text += f"\n----- {title} -----\n{item.prompt}\n"
+            html.append(f"<hr><h3>{title}</h3>")
+            html.extend(f"<p>{line}</p>" for line in item.prompt.split("\n") if line.strip())
+        text += f"\n---\n{self.templates['footer']}\n"
+        html.append(
+            "<hr><p style='text-align: center; color: #666; font-size: 12px;'>"
+            f"{self.templates['footer']}</p>"
+        )
+        html.append("</body></html>")
+        return text, "\n".join(html)
+
+    def _format_email_body(
+        self, body: str, loop_type: HumanLoopType, subject: str
+    ) -> Tuple[str, str]:
+        # 回复指导、回复模板和页脚只取决于语言和请求类型，每种组合只渲染一次
+        key = (self.language, loop_type)
+        compiled = _compiled_templates.get(key)
+        if compiled is None:
+            text_suffix, html = super()._format_email_body("", loop_type, "")
+            compiled = (text_suffix, html[len("<html><body>") :])
+            _compiled_templates[key] = compiled
+        text_suffix, html_tail = compiled
+        paragraphs = "".join(
+            f"\n<p>{line}</p>" for line in body.split("\n") if line.strip()
+        )
+        return body + text_suffix, "<html><body>" + paragraphs + html_tail
+
+    # ------------------------------------------------------------------
+    # 等待答复
+    # ------------------------------------------------------------------
+
+    def _run_email_check_task(
+        self,
+        conversation_id: str,
+        request_id: str,
+        recipient_email: str,
+        subject: str,
+        timeout: Optional[int],
+    ) -> None:
+        # 不再为每个请求占用线程轮询，登记到共享的扫描器后立即返回
+        self._register_waiter(
+            conversation_id,
+            request_id,
+            recipient_email,
+            subject,
+            time.monotonic() + timeout if timeout else None,
+        )
+
+    def _register_waiter(
+        self,
+        conversation_id: str,
+        request_id: str,
+        recipient_email: str,
+        subject: str,
+        deadline: Optional[float],
+    ) -> None:
+        self.scanner.register(
+            Waiter(
+                provider=self,
+                conversation_id=conversation_id,
+                request_id=request_id,
+                subject=subject,
+                sender_email=recipient_email,
+                message_ids=list(self._thread_message_ids.get(subject, [])),
+                deadline=deadline,
+            )
+        )
+
+    def _is_pending(self, request_key: Tuple[str, str]) -> bool:
+        digest = self._digests.get(request_key)
+        if digest is not None:
+            return self._digest_pending(digest)
+        request_info = self._requests.get(request_key)
+        return (
+            request_info is not None
+            and request_info.get("status") == HumanLoopStatus.PENDING
+        )
+
+    def _digest_pending(self, digest: Digest) -> bool:
+        """Expire the digest's timed out items and return whether any item is pending."""
+        now = time.monotonic()
+        pending = False
+        for item in digest.items:
+            request_key = (item.conversation_id, item.request_id)
+            if not self._is_pending(request_key):
+                continue
+            if item.deadline is not None and now >= item.deadline:
+                self._expire_request(request_key)
+            else:
+                pending = True
+        if not pending:
+            with self._digest_lock:
+                self._digests.pop((_DIGEST_CONVERSATION, digest.digest_id), None)
+        return pending
+
+    def _deliver_reply(self, waiter: Waiter, email_msg: Message) -> None:
+        """Parse a routed reply into the request (runs in the scanner thread)."""
+        digest = self._digests.get(waiter.key)
+        if digest is not None:
+            try:
+                self._process_digest_reply(digest, email_msg)
+            except Exception as e:
+                logger.error(f"Failed to process digest reply: {str(e)}", exc_info=True)
+            # 未答复的项继续等待同一封汇总邮件的后续答复
+            if self._digest_pending(digest):
+                self.scanner.register(waiter)
+            return
+        try:
+            asyncio.run(
+                self._process_email_response(
+                    waiter.conversation_id, waiter.request_id, email_msg
+                )
+            )
+        except Exception as e:
+            logger.error(f"Failed to process email reply: {str(e)}", exc_info=True)
+            self._update_request_status_error(
+                waiter.conversation_id,
+                waiter.request_id,
+                f"Failed to process email reply: {str(e)}",
+            )
+
+    def _process_digest_reply(self, digest: Digest, email_msg: Message) -> None:
+        """Apply the decisions of a digest reply to its pending items."""
+        body, html_body = _message_text(email_msg)
+        count = len(digest.items)
+        args = (count, self.approve_keywords, self.reject_keywords)
+        decision_prefix = self.templates["decision_prefix"]
+        user_content = self._extract_user_reply_content(body) or body
+        decisions = parse_digest_reply(user_content, *args, decision_prefix)
+        if not decisions:
+            # 没有使用回复模板时，取汇总邮件正文之前的内容
+            template = _DIGEST_TEMPLATES.get(self.language, _DIGEST_TEMPLATES["en"])
+            before = body.split(self.templates["content_start_mark"])[0]
+            before = before.split(template["intro"].format(count=count))[0]
+            decisions = parse_digest_reply(before, *args, decision_prefix)
+
+        responded_by = _decode_header(email_msg.get("From", ""))
+        response = {
+            "text": body,
+            "html": html_body,
+            "subject": _decode_header(email_msg.get("Subject", "")),
+            "from": responded_by,
+            "date": _decode_header(email_msg.get("Date", "")),
+            "message_id": email_msg.get("Message-ID", ""),
+        }
+        answered = 0
+        for index, (decision, reason) in sorted(decisions.items()):
+            item = digest.items[index - 1]
+            request_key = (item.conversation_id, item.request_id)
+            if not self._is_pending(request_key):
+                continue
+            self._requests[request_key].update(
+                {
+                    "status": HumanLoopStatus.APPROVED
+                    if decision == "approved"
+                    else HumanLoopStatus.REJECTED,
+                    "response": {
+                        **response,
+                        "decision": decision,
+                        "reason": reason,
+                        "digest_item": index,
+                    },
+                    "responded_by": responded_by,
+                    "responded_at": datetime.now().isoformat(),
+                }
+            )
+            answered += 1
+        with self._digest_lock:
+            self.digest_counters["replies"] += 1
+        if not answered:
+            logger.warning(f"No decision found in reply to digest {digest.digest_id}")
+
+    def _expire(self, waiter: Waiter) -> None:
+        digest = self._digests.get(waiter.key)
+        if digest is None:
+            self._expire_request(waiter.key)
+            return
+        for item in digest.items:
+            self._expire_request((item.conversation_id, item.request_id))
+        with self._digest_lock:
+            self._digests.pop(waiter.key, None)
+
+    def _expire_request(self, request_key: Tuple[str, str]) -> None:
+        request_info = self._requests.get(request_key)
+        if request_info and request_info.get("status") == HumanLoopStatus.PENDING:
+            request_info["status"] = HumanLoopStatus.EXPIRED
+            request_info["error"] = "Request timed out"
+            logger.info(f"\nRequest {request_key[1]} has timed out")
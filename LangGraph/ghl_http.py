@@ -0,0 +1,345 @@
+"""
+APIProvider 共用的异步 HTTP 客户端（连接池 + keep-alive）
+
+APIProvider 的每次 API 调用（发起请求、轮询状态、取消）都新建一个 aiohttp.ClientSession，
+调用结束即关闭：每次都要重新建立 TCP 连接，https 还要再做一次 TLS 握手。
+状态轮询运行在各自线程的 asyncio.run 事件循环中，即使复用会话也无法跨循环共用连接。
+等待中的请求越多，飞书 / 企业微信网关上的连接建立和关闭就越频繁。
+
+PooledAPIProvider 在 APIProvider 的基础上：
+- 进程内所有 PooledAPIProvider（以及 ghl_push 中的批量轮询 / 推送 Provider）共用一个
+  SharedHttpClient，多个 Provider、多个管理器之间共享连接
+- SharedHttpClient 在一个后台线程的事件循环中持有 aiohttp 会话，
+  任何线程、任何事件循环中的调用都提交到该循环执行，连接按 keep-alive 复用
+- 连接池上限（最大连接数、空闲保持时间）可配置
+- 可选 HTTP/2：aiohttp 不支持 HTTP/2，开启后改用 httpx（需要 httpx[http2]），
+  https 网关通过 ALPN 协商后，同一主机的并发请求在一个连接上多路复用。
+  httpx 每个请求的 CPU 开销明显高于 aiohttp；网关只支持 HTTP/1.1 时，
+  httpcore 还会让并发请求排队等待正在协商的连接，突发时连接数不足，
+  因此默认关闭，确认网关支持 h2 后再开启
+- 重试与错误处理与 APIProvider 相同
+
+配置（环境变量，见 shared_http_client）：
+- GOHUMANLOOP_HTTP_MAX_CONNECTIONS: 连接池最大连接数，默认 20
+- GOHUMANLOOP_HTTP_KEEPALIVE_EXPIRY: 空闲连接保持时间（秒），默认 60
+- GOHUMANLOOP_HTTP2: on 或 off（默认）
+"""
+
+import asyncio
+import logging
+import os
+import ssl
+import threading
+from collections import Counter
+from types import SimpleNamespace
+from typing import Any, Dict, Optional, Tuple, Union
+
+import aiohttp
+
+from gohumanloop.providers.api_provider import APIProvider
+
+logger = logging.getLogger(__name__)
+
+try:
+    import h2  # type: ignore # noqa: F401
+    import httpx
+
+    HTTP2_AVAILABLE = True
+except ImportError:
+    HTTP2_AVAILABLE = False
+
+_shared_client: Optional["SharedHttpClient"] = None
+_shared_lock = threading.Lock()
+
+
+class SharedHttpClient:
+    """A pooled HTTP client running on its own event loop thread, usable from
+    any thread and any event loop.
+
+    Args:
+        max_connections: Maximum number of open connections
+        keepalive_expiry: Seconds an idle connection is kept open
+        http2: Negotiate HTTP/2 through httpx, requires httpx[http2]
+        verify: TLS verification, False or an SSLContext for private gateways
+    """
+
+    def __init__(
+        self,
+        max_connections: int = 20,
+        keepalive_expiry: float = 60,
+        http2: bool = False,
+        verify: Union[bool, ssl.SSLContext] = True,
+    ):
+        if http2 and not HTTP2_AVAILABLE:
+            raise ValueError("HTTP/2 requires httpx and h2: pip install 'httpx[http2]'")
+        self.max_connections = max_connections
+        self.keepalive_expiry = keepalive_expiry
+        self.http2 = http2
+        self.verify = verify
+        self._lock = threading.Lock()
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._client: Any = None
+        self.counters: Counter = Counter()
+
+    def _ensure_loop(self) -> asyncio.AbstractEventLoop:
+        with self._lock:
+            if self._loop is None:
+                loop = asyncio.new_event_loop()
+                threading.Thread(
+                    target=loop.run_forever, name="http-client", daemon=True
+                ).start()
+                self._loop = loop
+            return self._loop
+
+    async def request(
+        self,
+        method: str,
+        url: str,
+        *,
+        json: Optional[Any] = None,
+        params: Optional[Dict[str, Any]] = None,
+        headers: Optional[Dict[str, str]] = None,
+        timeout: float = 30,
+    ) -> Tuple[int, Any]:
+        """Send a request on the shared client.
+
+        Returns:
+            Tuple[int, Any]: (HTTP status, decoded JSON body or None)
+
+        Raises:
+            asyncio.TimeoutError: If the request timed out
+            aiohttp.ClientError: If the request failed
+        """
+        loop = self._ensure_loop()
+        coro = self._request(method, url, json, params, headers, timeout)
+        try:
+            running = asyncio.get_running_loop()
+        except RuntimeError:
+            running = None
+        if running is loop:
+            return await coro
+        return await asyncio.wrap_future(asyncio.run_coroutine_threadsafe(coro, loop))
+
+    async def _request(
+        self,
+        method: str,
+        url: str,
+        json: Optional[Any],
+        params: Optional[Dict[str, Any]],
+        headers: Optional[Dict[str, str]],
+        timeout: float,
+    ) -> Tuple[int, Any]:
+        # 必须在所属事件循环中创建，连接池绑定在该循环上
+        if self._client is None:
+            self._client = self._create_http2() if self.http2 else self._create()
+        self.counters["requests"] += 1
+        try:
+            if self.http2:
+                return await self._send_http2(method, url, json, params, headers, timeout)
+            async with self._client.request(
+                method,
+                url,
+                json=json,
+                params=params,
+                headers=headers,
+                timeout=aiohttp.ClientTimeout(total=timeout),
+            ) as response:
+                self.counters[f"HTTP/{response.version.major}.{response.version.minor}"] += 1
+                body = await response.read()
+                return response.status, await response.json() if body else None
+        except Exception:
+            self.counters["errors"] += 1
+            raise
+
+    def _create(self) -> aiohttp.ClientSession:
+        trace = aiohttp.TraceConfig()
+
+        async def on_request_start(
+            session: Any, context: SimpleNamespace, params: Any
+        ) -> None:
+            context.https = params.url.scheme == "https"
+
+        async def on_connection_create_end(
+            session: Any, context: SimpleNamespace, params: Any
+        ) -> None:
+            self.counters["connections"] += 1
+            if context.https:
+                self.counters["tls_handshakes"] += 1
+
+        trace.on_request_start.append(on_request_start)
+        trace.on_connection_create_end.append(on_connection_create_end)
+        return aiohttp.ClientSession(
+            connector=aiohttp.TCPConnector(
+                limit=self.max_connections,
+                keepalive_timeout=self.keepalive_expiry,
+                ssl=self.verify,
+            ),
+            trace_configs=[trace],
+        )
+
+    def _create_http2(self) -> "httpx.AsyncClient":
+        async def count_response(response: httpx.Response) -> None:
+            self.counters[response.http_version] += 1
+
+        return httpx.AsyncClient(
+            limits=httpx.Limits(
+                max_connections=self.max_connections,
+                max_keepalive_connections=self.max_connections,
+                keepalive_expiry=self.keepalive_expiry,
+            ),
+            http2=True,
+            verify=self.verify,
+            event_hooks={"response": [count_response]},
+        )
+
+    async def _send_http2(
+        self,
+        method: str,
+        url: str,
+        json: Optional[Any],
+        params: Optional[Dict[str, Any]],
+        headers: Optional[Dict[str, str]],
+        timeout: float,
+    ) -> Tuple[int, Any]:
+        # 把 httpx 的异常换成 aiohttp 路径上的同类异常，调用方无需区分
+        try:
+            response = await self._client.request(
+                method,
+                url,
+                json=json,
+                params=params,
+                headers=headers,
+                timeout=timeout,
+                extensions={"trace": self._trace_http2},
+            )
+        except httpx.TimeoutException as e:
+            raise asyncio.TimeoutError(str(e)) from e
+        except httpx.HTTPError as e:
+            raise aiohttp.ClientError(str(e)) from e
+        return response.status_code, response.json() if response.content else None
+
+    async def _trace_http2(self, event: str, info: Dict[str, Any]) -> None:
+        # httpcore 的连接事件：新建 TCP 连接和 TLS 握手
+        if event == "connection.connect_tcp.complete":
+            self.counters["connections"] += 1
+        elif event == "connection.start_tls.complete":
+            self.counters["tls_handshakes"] += 1
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "http2": self.http2,
+            "max_connections": self.max_connections,
+            **self.counters,
+        }
+
+    def close(self) -> None:
+        """Close pooled connections and stop the event loop thread."""
+        with self._lock:
+            loop, self._loop = self._loop, None
+        if loop is None:
+            return
+        if self._client is not None:
+            client, self._client = self._client, None
+            closing = client.aclose() if self.http2 else client.close()
+            asyncio.run_coroutine_threadsafe(closing, loop).result(timeout=5)
+        loop.call_soon_threadsafe(loop.stop)
+
+
+def shared_http_client() -> SharedHttpClient:
+    """Return the process-wide SharedHttpClient, configured from the environment."""
+    global _shared_client
+    with _shared_lock:
+        if _shared_client is None:
+            http2 = os.environ.get("GOHUMANLOOP_HTTP2", "off")
+            if http2 not in ("on", "off"):
+                raise ValueError(f"Unknown GOHUMANLOOP_HTTP2: {http2}")
+            _shared_client = SharedHttpClient(
+                max_connections=int(
+                    os.environ.get("GOHUMANLOOP_HTTP_MAX_CONNECTIONS", "20")
+                ),
+                keepalive_expiry=float(
+                    os.environ.get("GOHUMANLOOP_HTTP_KEEPALIVE_EXPIRY", "60")
+                ),
+                http2=http2 == "on",
+            )
+        return _shared_client
+
+
+class PooledHttpMixin:
+    """Sends APIProvider requests through a SharedHttpClient instead of a new
+    aiohttp session per call. Mix in before APIProvider or a subclass of it.
+
+    Set `http_client` to use a client other than the process-wide one.
+    """
+
+    http_client: Optional[SharedHttpClient] = None
+
+    async def _async_make_api_request(
+        self,
+        endpoint: str,
+        method: str = "POST",
+        data: Optional[Dict[str, Any]] = None,
+        params: Optional[Dict[str, Any]] = None,
+        headers: Optional[Dict[str, Any]] = None,
+    ) -> Optional[Dict[str, Any]]:
+        url = f"{self.api_base_url}/{endpoint.lstrip('/')}"
+        request_headers = {"Content-Type": "application/json"}
+        if self.api_key:
+            request_headers["Authorization"] = f"Bearer {self.api_key.get_secret_value()}"
+        if headers:
+            request_headers.update(headers)
+        client = self.http_client or shared_http_client()
+
+        # 与 APIProvider 相同：失败后按 1s、2s ... 退避重试
+        for attempt in range(self.max_retries):
+            try:
+                status, response_data = await client.request(
+                    method,
+                    url,
+                    json=data or None,
+                    params=params,
+                    headers=request_headers,
+                    timeout=self.request_timeout,
+                )
+                if status >= 400:
+                    error_msg = (response_data or {}).get(
+                        "error", f"API request failed: {status}"
+                    )
+                    logger.error(f"API request failed: {error_msg}")
+                    if attempt < self.max_retries - 1:
+                        await asyncio.sleep(1 * (attempt + 1))
+                        continue
+                    raise Exception(error_msg)
+                return response_data or {}
+            except asyncio.TimeoutError:
+                logger.warning(
+                    f"API request timeout (attempt {attempt+1}/{self.max_retries})"
+                )
+                if attempt < self.max_retries - 1:
+                    await asyncio.sleep(1 * (attempt + 1))
+                    continue
+                raise Exception("API request timeout")
+            except Exception as e:
+                logger.error(f"API request error: {str(e)}")
+                if attempt < self.max_retries - 1:
+                    await asyncio.sleep(1 * (attempt + 1))
+                    continue
+                raise
+
+        return None
+
+
+class PooledAPIProvider(PooledHttpMixin, APIProvider):
+    """APIProvider whose API calls share pooled keep-alive connections with
+    every other pooled provider in the process.
+
+    Args:
+        http_client: Client to use, defaults to shared_http_client()
+        *args, **kwargs: Passed to APIProvider
+    """
+
+    def __init__(
+        self, *args: Any, http_client: Optional[SharedHttpClient] = None, **kwargs: Any
+    ):
+        super().__init__(*args, **kwargs)
+        self.http_client = http_client
@@ -0,0 +1,308 @@
+# /// script
+# requires-python = ">=3.10"
+# dependencies = [
+# "aiohttp>=3.9.0"]
+# ///
+"""
+本地 GoHumanLoop API 替身服务
+
+实现示例用到的 GoHumanLoop 平台接口，用于离线测试轮询模式和推送模式：
+- POST /api/v1/humanloop/request              发起请求
+- GET  /api/v1/humanloop/status               查询状态（轮询模式）
+- POST /api/v1/humanloop/status/batch         批量查询状态（批量轮询 / 兜底轮询）
+- POST /api/v1/humanloop/cancel               取消请求
+- POST /api/v1/humanloop/cancel_conversation  取消对话
+- POST /api/v1/humanloop/continue             继续对话
+- POST /api/v1/humanloop/tasks/sync           任务数据同步
+- POST /api/v1/humanloop/respond              手动给出决定（替代平台上的审批人）
+- GET  /api/v1/humanloop/stats                各接口调用次数和客户端连接数
+
+请求在 --delay 秒后自动批准（--manual 时等待 /respond）。做出决定后，
+若请求的 metadata 带有 callback_url，则立即 POST 回调（--no-push 可关闭，用于测试兜底轮询）。
+--no-bulk 关闭批量状态接口，用于测试客户端退回逐个查询。
+
+示例：
+    uv run ghl_local_api.py --port 8000 --delay 2
+    curl -X POST localhost:8000/api/v1/humanloop/respond \\
+        -d '{"request_id": "...", "status": "rejected", "response": {"reason": "no"}}'
+"""
+
+import argparse
+import asyncio
+import logging
+from datetime import datetime
+from typing import Any, Dict, Optional, Set
+
+import aiohttp
+from aiohttp import web
+
+logger = logging.getLogger("ghl_local_api")
+
+# 无需 API Key 的本地管理接口
+_LOCAL_PATHS = {"/api/v1/humanloop/respond", "/api/v1/humanloop/stats"}
+
+
+class LocalHumanLoopAPI:
+    """In-memory stand-in for the GoHumanLoop platform API.
+
+    Args:
+        api_key: Expected bearer token, None accepts any
+        delay: Seconds before a request is decided automatically, None waits for /respond
+        push: POST decisions to the request's metadata.callback_url
+        bulk: Serve the bulk status endpoint
+        max_page_size: Maximum number of requests per bulk status call
+        info_response: Response used for information and conversation requests
+    """
+
+    def __init__(
+        self,
+        api_key: Optional[str] = "gohumanloop",
+        delay: Optional[float] = 2.0,
+        push: bool = True,
+        bulk: bool = True,
+        max_page_size: int = 500,
+        info_response: Any = "ok",
+    ):
+        self.api_key = api_key
+        self.delay = delay
+        self.push = push
+        self.bulk = bulk
+        self.max_page_size = max_page_size
+        self.info_response = info_response
+        # request_id -> 请求记录
+        self.requests: Dict[str, Dict[str, Any]] = {}
+        self.status_calls = 0
+        self.batch_status_calls = 0
+        self.callbacks_sent = 0
+        # 客户端连接的 (地址, 端口)，用于统计连接复用情况
+        self.peers: Set[Any] = set()
+        self._tasks: Set[asyncio.Task] = set()
+        self._session: Optional[aiohttp.ClientSession] = None
+
+    def app(self) -> web.Application:
+        app = web.Application(middlewares=[self._auth])
+        app.router.add_post("/api/v1/humanloop/request", self.handle_request)
+        app.router.add_get("/api/v1/humanloop/status", self.handle_status)
+        if self.bulk:
+            app.router.add_post(
+                "/api/v1/humanloop/status/batch", self.handle_status_batch
+            )
+        app.router.add_post("/api/v1/humanloop/cancel", self.handle_cancel)
+        app.router.add_post(
+            "/api/v1/humanloop/cancel_conversation", self.handle_cancel_conversation
+        )
+        app.router.add_post("/api/v1/humanloop/continue", self.handle_request)
+        app.router.add_post("/api/v1/humanloop/tasks/sync", self.handle_sync)
+        app.router.add_post("/api/v1/humanloop/respond", self.handle_respond)
+        app.router.add_get("/api/v1/humanloop/stats", self.handle_stats)
+        app.on_cleanup.append(self._cleanup)
+        return app
+
+    @web.middleware
+    async def _auth(self, request: web.Request, handler: Any) -> web.StreamResponse:
+        if request.transport is not None:
+            self.peers.add(request.transport.get_extra_info("peername"))
+        if (
+            self.api_key
+            and request.path not in _LOCAL_PATHS
+            and request.headers.get("Authorization") != f"Bearer {self.api_key}"
+        ):
+            return web.json_response(
+                {"success": False, "error": "Invalid API key"}, status=401
+            )
+        return await handler(request)
+
+    async def _cleanup(self, app: web.Application) -> None:
+        for task in list(self._tasks):
+            task.cancel()
+        if self._session:
+            await self._session.close()
+
+    def _spawn(self, coro: Any) -> None:
+        task = asyncio.create_task(coro)
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def handle_request(self, request: web.Request) -> web.Response:
+        data = await request.json()
+        record = {
+            **data,
+            "loop_type": data.get("loop_type", "conversation"),
+            "status": "pending",
+            "created_at": datetime.now().isoformat(),
+        }
+        self.requests[data["request_id"]] = record
+        logger.info(
+            f"[{record['loop_type']}] {data['task_id']} / {data['request_id']} "
+            f"-> {record['context'].get('question') or record['context'].get('message')}"
+        )
+        if self.delay is not None:
+            self._spawn(self._auto_decide(data["request_id"]))
+        return web.json_response({"success": True})
+
+    async def _auto_decide(self, request_id: str) -> None:
+        await asyncio.sleep(self.delay or 0)
+        record = self.requests.get(request_id)
+        if not record or record["status"] != "pending":
+            return
+        if record["loop_type"] == "approval":
+            await self.decide(request_id, "approved", {"reason": "auto approved"})
+        else:
+            await self.decide(request_id, "completed", self.info_response)
+
+    async def decide(
+        self, request_id: str, status: str, response: Any, responded_by: str = "local"
+    ) -> None:
+        record = self.requests[request_id]
+        record.update(
+            status=status,
+            response=response,
+            responded_by=responded_by,
+            responded_at=datetime.now().isoformat(),
+        )
+        logger.info(f"{request_id} -> {status}")
+        callback_url = record.get("metadata", {}).get("callback_url")
+        if self.push and callback_url:
+            await self._send_callback(callback_url, record)
+
+    async def _send_callback(self, url: str, record: Dict[str, Any]) -> None:
+        if self._session is None:
+            self._session = aiohttp.ClientSession()
+        payload = {
+            field: record.get(field)
+            for field in [
+                "conversation_id",
+                "request_id",
+                "status",
+                "response",
+                "feedback",
+                "responded_by",
+                "responded_at",
+            ]
+        }
+        try:
+            async with self._session.post(url, json=payload, timeout=5) as response:
+                self.callbacks_sent += 1
+                if response.status >= 400:
+                    logger.warning(f"Callback to {url} failed: {response.status}")
+        except Exception as e:
+            # 回调失败时，客户端通过兜底轮询获取结果
+            logger.warning(f"Callback to {url} failed: {e}")
+
+    @staticmethod
+    def _status(record: Dict[str, Any]) -> Dict[str, Any]:
+        return {
+            "status": record["status"],
+            "response": record.get("response"),
+            "feedback": record.get("feedback"),
+            "responded_by": record.get("responded_by"),
+            "responded_at": record.get("responded_at"),
+        }
+
+    async def handle_status(self, request: web.Request) -> web.Response:
+        self.status_calls += 1
+        record = self.requests.get(request.query.get("request_id", ""))
+        if not record:
+            return web.json_response({"success": False, "error": "Request not found"})
+        return web.json_response({"success": True, **self._status(record)})
+
+    async def handle_status_batch(self, request: web.Request) -> web.Response:
+        self.batch_status_calls += 1
+        items = (await request.json()).get("requests", [])
+        if len(items) > self.max_page_size:
+            return web.json_response(
+                {
+                    "success": False,
+                    "error": f"At most {self.max_page_size} requests per call",
+                },
+                status=400,
+            )
+        results = [
+            {
+                "conversation_id": record["conversation_id"],
+                "request_id": record["request_id"],
+                **self._status(record),
+            }
+            for record in (self.requests.get(item.get("request_id")) for item in items)
+            if record
+        ]
+        return web.json_response({"success": True, "results": results})
+
+    async def handle_stats(self, request: web.Request) -> web.Response:
+        return web.json_response(
+            {
+                "requests": len(self.requests),
+                "pending": sum(r["status"] == "pending" for r in self.requests.values()),
+                "status_calls": self.status_calls,
+                "batch_status_calls": self.batch_status_calls,
+                "callbacks_sent": self.callbacks_sent,
+                "client_connections": len(self.peers),
+            }
+        )
+
+    async def handle_cancel(self, request: web.Request) -> web.Response:
+        data = await request.json()
+        record = self.requests.get(data.get("request_id", ""))
+        if record and record["status"] == "pending":
+            record["status"] = "cancelled"
+        return web.json_response({"success": True})
+
+    async def handle_cancel_conversation(self, request: web.Request) -> web.Response:
+        data = await request.json()
+        for record in self.requests.values():
+            if (
+                record["conversation_id"] == data.get("conversation_id")
+                and record["status"] == "pending"
+            ):
+                record["status"] = "cancelled"
+        return web.json_response({"success": True})
+
+    async def handle_sync(self, request: web.Request) -> web.Response:
+        return web.json_response({"success": True})
+
+    async def handle_respond(self, request: web.Request) -> web.Response:
+        data = await request.json()
+        if data.get("request_id") not in self.requests:
+            return web.json_response(
+                {"success": False, "error": "Request not found"}, status=404
+            )
+        await self.decide(
+            data["request_id"],
+            data.get("status", "approved"),
+            data.get("response"),
+            data.get("responded_by", "local"),
+        )
+        return web.json_response({"success": True})
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Local GoHumanLoop API stand-in")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument("--api-key", default="gohumanloop")
+    parser.add_argument(
+        "--delay", type=float, default=2.0, help="Seconds before auto approval"
+    )
+    parser.add_argument(
+        "--manual", action="store_true", help="Wait for /respond instead of auto approval"
+    )
+    parser.add_argument(
+        "--no-push", action="store_true", help="Do not send webhook callbacks"
+    )
+    parser.add_argument(
+        "--no-bulk", action="store_true", help="Do not serve the bulk status endpoint"
+    )
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+    api = LocalHumanLoopAPI(
+        api_key=args.api_key,
+        delay=None if args.manual else args.delay,
+        push=not args.no_push,
+        bulk=not args.no_bulk,
+    )
+    web.run_app(api.app(), host=args.host, port=args.port)
+
+
+if __name__ == "__main__":
+    main()
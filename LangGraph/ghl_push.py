@@ -0,0 +1,654 @@
+"""
+GoHumanLoop 批量轮询与推送模式（Webhook 回调）
+
+默认的 GoHumanLoopManager 为每个待处理请求单独轮询 `v1/humanloop/status`，
+间隔为 poll_interval（默认 5 秒）：
+- 审批结果平均要多等 poll_interval / 2 才能被感知
+- 数百个工作流同时等待审批时，每个周期就有数百次 HTTP 调用
+
+批量轮询模式（bulk）：一个后台轮询器每个周期把所有待处理请求的状态
+通过 `v1/humanloop/status/batch` 一次取回（超过 page_size 时分页），
+API 调用次数不再随并发数线性增长。平台不支持批量接口时自动退回逐个查询。
+
+推送模式（push）：在批量轮询的基础上，管理器在本地启动一个小型 HTTP 接收器，
+发起请求时把回调地址写入 metadata.callback_url，平台在人工做出决定后直接 POST 到该地址，
+等待中的工作流在毫秒级内被唤醒。轮询仍作为兜底，只是间隔放宽（fallback_interval），
+用于弥补丢失的回调。
+
+回调请求体与 `v1/humanloop/status` 的响应格式相同，另加 conversation_id 和 request_id：
+
+    {"conversation_id": "...", "request_id": "...", "status": "approved",
+     "response": {...}, "feedback": {...}, "responded_by": "...", "responded_at": "..."}
+
+批量状态接口：
+
+    POST v1/humanloop/status/batch
+    {"requests": [{"task_id": "...", "conversation_id": "...", "request_id": "...", "platform": "..."}]}
+    -> {"success": true, "results": [<回调请求体格式>, ...]}
+
+配置（环境变量，见 create_manager）：
+- GOHUMANLOOP_DELIVERY: poll（默认）、bulk 或 push
+- GOHUMANLOOP_STATUS_PAGE_SIZE: 批量状态查询每页的请求数，默认 100
+- GOHUMANLOOP_WEBHOOK_HOST / GOHUMANLOOP_WEBHOOK_PORT: 接收器监听地址，端口 0 表示随机
+- GOHUMANLOOP_WEBHOOK_URL: 平台可访问的回调地址（接收器位于 NAT / 反向代理之后时设置）
+- GOHUMANLOOP_WEBHOOK_SECRET: 回调请求需携带的 X-Webhook-Secret，可选
+- GOHUMANLOOP_FALLBACK_INTERVAL: 推送模式下兜底轮询间隔（秒），默认 60
+"""
+
+import asyncio
+import contextlib
+import logging
+import os
+import threading
+import time
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+from aiohttp import web
+from gohumanloop.core.interface import (
+    HumanLoopProvider,
+    HumanLoopResult,
+    HumanLoopStatus,
+    HumanLoopType,
+)
+from gohumanloop.manager.ghl_manager import GoHumanLoopManager
+from gohumanloop.models.api_model import HumanLoopStatusParams, HumanLoopStatusResponse
+from gohumanloop.providers.ghl_provider import GoHumanLoopProvider
+
+from ghl_http import PooledHttpMixin
+
+logger = logging.getLogger(__name__)
+
+_WAITING = (HumanLoopStatus.PENDING, HumanLoopStatus.INPROGRESS)
+
+# 批量接口连续失败多少次后改为逐个查询
+_MAX_BULK_FAILURES = 3
+
+
+class BulkPollGoHumanLoopProvider(PooledHttpMixin, GoHumanLoopProvider):
+    """GoHumanLoop provider that polls all pending requests with one bulk call.
+
+    A background thread runs a sweeper on its own event loop. Every
+    `poll_interval` seconds it fetches the status of every pending request
+    through the bulk status endpoint, `page_size` requests per call, and
+    expires timed-out requests. API calls share the process-wide pooled
+    HTTP client (ghl_http).
+
+    Args:
+        name: Provider name
+        page_size: Maximum number of requests per bulk status call
+        poll_interval: Seconds between status polls of a pending request
+    """
+
+    def __init__(
+        self,
+        name: str,
+        page_size: int = 100,
+        request_timeout: int = 30,
+        poll_interval: float = 5,
+        max_retries: int = 3,
+        config: Optional[Dict[str, Any]] = None,
+    ):
+        super().__init__(
+            name=name,
+            request_timeout=request_timeout,
+            poll_interval=poll_interval,  # type: ignore[arg-type]
+            max_retries=max_retries,
+            config=config,
+        )
+        self.page_size = page_size
+        self.bulk_calls = 0
+        self.single_calls = 0
+        self._bulk_failures = 0
+
+        # (conversation_id, request_id) -> 超时时间点 / 下次轮询时间点
+        self._deadlines: Dict[Tuple[str, str], float] = {}
+        self._next_poll: Dict[Tuple[str, str], float] = {}
+        # (conversation_id, request_id) -> 等待者所在的事件循环和事件
+        self._waiters: Dict[
+            Tuple[str, str], List[Tuple[asyncio.AbstractEventLoop, asyncio.Event]]
+        ] = {}
+        self._lock = threading.Lock()
+
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._thread: Optional[threading.Thread] = None
+        self._stopped: Optional[asyncio.Event] = None
+
+    # ------------------------------------------------------------------
+    # 后台线程：轮询器
+    # ------------------------------------------------------------------
+
+    def start(self) -> None:
+        """Start the background thread; returns once it is ready."""
+        if self._thread and self._thread.is_alive():
+            return
+        ready = threading.Event()
+        errors: List[BaseException] = []
+        self._thread = threading.Thread(
+            target=self._run, args=(ready, errors), name=f"ghl-{self.name}", daemon=True
+        )
+        self._thread.start()
+        ready.wait()
+        if errors:
+            raise errors[0]
+
+    def stop(self) -> None:
+        if self._loop and self._stopped and self._thread and self._thread.is_alive():
+            self._loop.call_soon_threadsafe(self._stopped.set)
+            self._thread.join(timeout=5)
+
+    def _run(self, ready: threading.Event, errors: List[BaseException]) -> None:
+        self._loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(self._loop)
+        try:
+            self._loop.run_until_complete(self._serve(ready))
+        except BaseException as e:
+            errors.append(e)
+        finally:
+            ready.set()
+            self._loop.close()
+
+    async def _serve(self, ready: threading.Event) -> None:
+        self._stopped = asyncio.Event()
+        await self._async_setup()
+        ready.set()
+
+        sweeper = asyncio.create_task(self._sweep())
+        try:
+            await self._stopped.wait()
+        finally:
+            sweeper.cancel()
+            await self._async_teardown()
+
+    async def _async_setup(self) -> None:
+        """Hook run on the background loop before the sweeper starts."""
+
+    async def _async_teardown(self) -> None:
+        """Hook run on the background loop when the thread stops."""
+
+    async def _sweep(self) -> None:
+        while True:
+            await asyncio.sleep(min(1.0, self.poll_interval))
+            now = time.monotonic()
+            due = []
+            for key in list(self._deadlines):
+                if self._expire_if_due(key, now):
+                    continue
+                if self._next_poll.get(key, now) <= now:
+                    self._next_poll[key] = now + self.poll_interval
+                    due.append(key)
+            if due:
+                try:
+                    await self._async_fetch_statuses(due)
+                except Exception as e:
+                    logger.warning(f"Failed to poll request status: {e}")
+
+    def _expire_if_due(self, key: Tuple[str, str], now: float) -> bool:
+        request_info = self._get_request(*key)
+        if not request_info or request_info.get("status") not in _WAITING:
+            self._forget(key)
+            return True
+        deadline = self._deadlines.get(key)
+        if deadline is not None and deadline <= now:
+            request_info["status"] = HumanLoopStatus.EXPIRED
+            request_info["error"] = "Request timed out"
+            logger.info(f"Request {key[1]} has timed out")
+            self._forget(key)
+            self._notify(key)
+            return True
+        return False
+
+    def _forget(self, key: Tuple[str, str]) -> None:
+        self._deadlines.pop(key, None)
+        self._next_poll.pop(key, None)
+        self._poll_tasks.pop(key, None)
+
+    # ------------------------------------------------------------------
+    # 状态查询：批量优先，不支持时逐个查询
+    # ------------------------------------------------------------------
+
+    async def _async_fetch_statuses(self, keys: List[Tuple[str, str]]) -> None:
+        if self._bulk_failures < _MAX_BULK_FAILURES:
+            try:
+                for start in range(0, len(keys), self.page_size):
+                    await self._async_fetch_status_page(
+                        keys[start : start + self.page_size]
+                    )
+                self._bulk_failures = 0
+                return
+            except Exception as e:
+                self._bulk_failures += 1
+                logger.warning(
+                    f"Bulk status request failed ({self._bulk_failures}/"
+                    f"{_MAX_BULK_FAILURES}), polling one by one: {e}"
+                )
+        await asyncio.gather(
+            *(self._async_fetch_status(*key) for key in keys), return_exceptions=True
+        )
+
+    async def _async_fetch_status_page(self, keys: List[Tuple[str, str]]) -> None:
+        requests = []
+        for conversation_id, request_id in keys:
+            request_info = self._get_request(conversation_id, request_id)
+            if request_info and request_info.get("status") in _WAITING:
+                requests.append(
+                    {
+                        "task_id": request_info.get("task_id"),
+                        "conversation_id": conversation_id,
+                        "request_id": request_id,
+                        "platform": request_info.get("metadata", {}).get("platform"),
+                    }
+                )
+        if not requests:
+            return
+
+        self.bulk_calls += 1
+        response = await self._async_make_api_request(
+            endpoint="v1/humanloop/status/batch",
+            method="POST",
+            data={"requests": requests},
+        )
+        response_data = response or {}
+        if not response_data.get("success"):
+            raise Exception(response_data.get("error") or "Bulk status request failed")
+
+        for item in response_data.get("results", []):
+            status_response = HumanLoopStatusResponse(**{"success": True, **item})
+            self._apply_status(
+                item["conversation_id"], item["request_id"], status_response
+            )
+
+    async def _async_fetch_status(self, conversation_id: str, request_id: str) -> None:
+        """Poll the status of one request once."""
+        request_info = self._get_request(conversation_id, request_id)
+        if not request_info:
+            return
+        params = HumanLoopStatusParams(
+            conversation_id=conversation_id,
+            request_id=request_id,
+            platform=request_info.get("metadata", {}).get("platform"),
+        ).model_dump()
+        self.single_calls += 1
+        response = await self._async_make_api_request(
+            endpoint="v1/humanloop/status", method="GET", params=params
+        )
+        status_response = HumanLoopStatusResponse(**(response or {}))
+        if not status_response.success:
+            logger.warning(f"Failed to get status: {status_response.error}")
+            return
+        self._apply_status(conversation_id, request_id, status_response)
+
+    # ------------------------------------------------------------------
+    # 状态更新与等待者唤醒
+    # ------------------------------------------------------------------
+
+    def _apply_status(
+        self,
+        conversation_id: str,
+        request_id: str,
+        status_response: HumanLoopStatusResponse,
+    ) -> None:
+        request_info = self._get_request(conversation_id, request_id)
+        if not request_info or request_info.get("status") not in _WAITING:
+            return
+        try:
+            new_status = HumanLoopStatus(status_response.status)
+        except ValueError:
+            logger.warning(
+                f"Unknown status value: {status_response.status}, using PENDING"
+            )
+            new_status = HumanLoopStatus.PENDING
+
+        request_info["status"] = new_status
+        for field in ["response", "feedback", "responded_by", "responded_at", "error"]:
+            value = getattr(status_response, field, None)
+            if value is not None:
+                request_info[field] = value
+
+        if new_status not in _WAITING:
+            self._forget((conversation_id, request_id))
+        self._notify((conversation_id, request_id))
+
+    def _notify(self, key: Tuple[str, str]) -> None:
+        with self._lock:
+            waiters = self._waiters.pop(key, [])
+        for loop, event in waiters:
+            # 等待者可能在其他线程的事件循环里（如同步 LangGraph 节点）
+            with contextlib.suppress(RuntimeError):
+                loop.call_soon_threadsafe(event.set)
+
+    @contextlib.contextmanager
+    def subscribe(self, conversation_id: str, request_id: str) -> Iterator[asyncio.Event]:
+        """Yield an event that is set when the request's status changes.
+
+        Subscribe before checking the status so that no update is missed.
+        """
+        key = (conversation_id, request_id)
+        waiter = (asyncio.get_running_loop(), asyncio.Event())
+        with self._lock:
+            self._waiters.setdefault(key, []).append(waiter)
+        try:
+            yield waiter[1]
+        finally:
+            with self._lock:
+                waiters = self._waiters.get(key, [])
+                if waiter in waiters:
+                    waiters.remove(waiter)
+                if not waiters:
+                    self._waiters.pop(key, None)
+
+    # ------------------------------------------------------------------
+    # 请求发送：不再为每个请求启动轮询线程
+    # ------------------------------------------------------------------
+
+    async def async_request_humanloop(
+        self,
+        task_id: str,
+        conversation_id: str,
+        loop_type: HumanLoopType,
+        context: Dict[str, Any],
+        metadata: Optional[Dict[str, Any]] = None,
+        timeout: Optional[int] = None,
+    ) -> HumanLoopResult:
+        self.start()
+        return await super().async_request_humanloop(
+            task_id, conversation_id, loop_type, context, metadata, timeout
+        )
+
+    def _run_async_poll_request_status(
+        self,
+        conversation_id: str,
+        request_id: str,
+        platform: str,
+        timeout: Optional[int],
+    ) -> None:
+        # 父类在线程池中为每个请求运行轮询循环；这里只登记超时和下次轮询时间，由轮询器统一查询
+        key = (conversation_id, request_id)
+        now = time.monotonic()
+        if timeout:
+            self._deadlines[key] = now + timeout
+        else:
+            self._deadlines.setdefault(key, float("inf"))
+        self._next_poll[key] = now + self.poll_interval
+
+
+class PushGoHumanLoopProvider(BulkPollGoHumanLoopProvider):
+    """GoHumanLoop provider that receives decisions through a local webhook.
+
+    The webhook receiver runs on the background loop next to the sweeper, which
+    polls pending requests every `fallback_interval` seconds in case a callback
+    was lost.
+
+    Args:
+        name: Provider name
+        webhook_host: Host the receiver listens on
+        webhook_port: Port the receiver listens on, 0 picks a free port
+        webhook_path: Path of the callback endpoint
+        public_url: Callback URL sent to the platform, defaults to the local address
+        webhook_secret: Value expected in the X-Webhook-Secret header, optional
+        fallback_interval: Seconds between fallback polls of pending requests
+    """
+
+    def __init__(
+        self,
+        name: str,
+        webhook_host: str = "127.0.0.1",
+        webhook_port: int = 0,
+        webhook_path: str = "/humanloop/callback",
+        public_url: Optional[str] = None,
+        webhook_secret: Optional[str] = None,
+        fallback_interval: float = 60,
+        page_size: int = 100,
+        request_timeout: int = 30,
+        max_retries: int = 3,
+        config: Optional[Dict[str, Any]] = None,
+    ):
+        super().__init__(
+            name=name,
+            page_size=page_size,
+            request_timeout=request_timeout,
+            poll_interval=fallback_interval,
+            max_retries=max_retries,
+            config=config,
+        )
+        self.webhook_host = webhook_host
+        self.webhook_port = webhook_port
+        self.webhook_path = webhook_path
+        self.public_url = public_url
+        self.webhook_secret = webhook_secret
+        self.fallback_interval = fallback_interval
+        self.callback_url: Optional[str] = None
+        self._runner: Optional[web.AppRunner] = None
+
+    async def _async_setup(self) -> None:
+        app = web.Application()
+        app.router.add_post(self.webhook_path, self._handle_callback)
+        self._runner = web.AppRunner(app, access_log=None)
+        await self._runner.setup()
+        site = web.TCPSite(self._runner, self.webhook_host, self.webhook_port)
+        await site.start()
+        port = self._runner.addresses[0][1]
+        self.callback_url = self.public_url or (
+            f"http://{self.webhook_host}:{port}{self.webhook_path}"
+        )
+        logger.info(f"Webhook receiver listening on {self.callback_url}")
+
+    async def _async_teardown(self) -> None:
+        if self._runner:
+            await self._runner.cleanup()
+
+    async def _handle_callback(self, request: web.Request) -> web.Response:
+        if (
+            self.webhook_secret
+            and request.headers.get("X-Webhook-Secret") != self.webhook_secret
+        ):
+            return web.json_response(
+                {"success": False, "error": "Invalid webhook secret"}, status=401
+            )
+        try:
+            payload = await request.json()
+            key = (payload["conversation_id"], payload["request_id"])
+            status_response = HumanLoopStatusResponse(**{"success": True, **payload})
+        except Exception as e:
+            return web.json_response(
+                {"success": False, "error": f"Invalid callback: {e}"}, status=400
+            )
+
+        if not self._get_request(*key):
+            return web.json_response(
+                {"success": False, "error": f"Request '{key[1]}' not found"},
+                status=404,
+            )
+        self._apply_status(*key, status_response)
+        return web.json_response({"success": True})
+
+    async def async_request_humanloop(
+        self,
+        task_id: str,
+        conversation_id: str,
+        loop_type: HumanLoopType,
+        context: Dict[str, Any],
+        metadata: Optional[Dict[str, Any]] = None,
+        timeout: Optional[int] = None,
+    ) -> HumanLoopResult:
+        self.start()
+        metadata = {**(metadata or {}), "callback_url": self.callback_url}
+        return await super().async_request_humanloop(
+            task_id, conversation_id, loop_type, context, metadata, timeout
+        )
+
+
+class BulkPollGoHumanLoopManager(GoHumanLoopManager):
+    """GoHumanLoopManager whose default provider polls all pending requests in bulk.
+
+    Accepts the same arguments as GoHumanLoopManager, plus `page_size`.
+    Decisions arriving while a platform sync is running are folded into one
+    follow-up sync instead of each starting its own.
+    """
+
+    def __init__(
+        self,
+        request_timeout: int = 60,
+        poll_interval: int = 5,
+        max_retries: int = 3,
+        page_size: int = 100,
+        **kwargs: Any,
+    ):
+        super().__init__(
+            request_timeout=request_timeout,
+            poll_interval=poll_interval,
+            max_retries=max_retries,
+            **kwargs,
+        )
+        # 替换父类创建的逐个轮询版 GoHumanLoopProvider
+        provider = self._create_provider(
+            page_size=page_size,
+            request_timeout=request_timeout,
+            poll_interval=poll_interval,
+            max_retries=max_retries,
+            config=kwargs.get("config"),
+        )
+        self.providers[self.name] = provider
+        provider.start()
+        self._sync_lock = threading.Lock()
+        self._sync_running = False
+        self._sync_dirty = False
+
+    def _create_provider(self, **kwargs: Any) -> BulkPollGoHumanLoopProvider:
+        return BulkPollGoHumanLoopProvider(name=self.name, **kwargs)
+
+    async def async_check_request_status(
+        self, conversation_id: str, request_id: str, provider_id: Optional[str] = None
+    ) -> HumanLoopResult:
+        # 与父类相同，只是把每次决定后的全量同步合并（见 _async_sync_after_decision）
+        if provider_id is None:
+            provider_id = (
+                self._conversation_provider.get(conversation_id)
+                or self.default_provider_id
+            )
+        if not provider_id or provider_id not in self.providers:
+            raise ValueError(f"Provider '{provider_id}' not found")
+
+        provider = self.providers[provider_id]
+        result = await provider.async_check_request_status(conversation_id, request_id)
+        if result.status != HumanLoopStatus.PENDING:
+            await self._async_sync_after_decision()
+            if (conversation_id, request_id) in self._callbacks:
+                await self._async_trigger_update_callback(
+                    conversation_id, request_id, provider, result
+                )
+        return result
+
+    async def _async_sync_after_decision(self) -> None:
+        # 父类在每个决定后都把所有任务、对话、请求全量同步到平台一次，
+        # N 个工作流同时得到答复时总开销为 O(N²)。同步进行中到达的决定
+        # 只做标记，由进行中的同步在结束后再补一次，一批决定合并为一两次同步
+        with self._sync_lock:
+            if self._sync_running:
+                self._sync_dirty = True
+                return
+            self._sync_running = True
+        try:
+            while True:
+                with self._sync_lock:
+                    self._sync_dirty = False
+                await self.async_data_to_platform()
+                with self._sync_lock:
+                    if not self._sync_dirty:
+                        self._sync_running = False
+                        return
+        except BaseException:
+            with self._sync_lock:
+                self._sync_running = False
+            raise
+
+    async def _async_wait_for_result(
+        self,
+        conversation_id: str,
+        request_id: str,
+        provider: HumanLoopProvider,
+        timeout: Optional[int] = None,
+    ) -> HumanLoopResult:
+        if not isinstance(provider, BulkPollGoHumanLoopProvider):
+            return await super()._async_wait_for_result(
+                conversation_id, request_id, provider, timeout
+            )
+        while True:
+            with provider.subscribe(conversation_id, request_id) as updated:
+                result = await self.async_check_request_status(
+                    conversation_id, request_id, provider.name
+                )
+                if result.status != HumanLoopStatus.PENDING:
+                    return result
+                with contextlib.suppress(asyncio.TimeoutError):
+                    await asyncio.wait_for(updated.wait(), provider.poll_interval)
+
+    def _stop_providers(self) -> None:
+        for provider in self.providers.values():
+            if isinstance(provider, BulkPollGoHumanLoopProvider):
+                provider.stop()
+
+    def shutdown(self) -> None:
+        super().shutdown()
+        self._stop_providers()
+
+    async def async_shutdown(self) -> None:
+        await super().async_shutdown()
+        self._stop_providers()
+
+
+class PushGoHumanLoopManager(BulkPollGoHumanLoopManager):
+    """GoHumanLoopManager whose default provider receives decisions by webhook.
+
+    Accepts the same arguments as GoHumanLoopManager, plus the webhook options
+    of PushGoHumanLoopProvider.
+    """
+
+    def __init__(
+        self,
+        webhook_host: str = "127.0.0.1",
+        webhook_port: int = 0,
+        public_url: Optional[str] = None,
+        webhook_secret: Optional[str] = None,
+        fallback_interval: float = 60,
+        **kwargs: Any,
+    ):
+        self._webhook_options = dict(
+            webhook_host=webhook_host,
+            webhook_port=webhook_port,
+            public_url=public_url,
+            webhook_secret=webhook_secret,
+            fallback_interval=fallback_interval,
+        )
+        super().__init__(**kwargs)
+
+    def _create_provider(self, **kwargs: Any) -> BulkPollGoHumanLoopProvider:
+        # 推送模式下轮询只作兜底，间隔由 fallback_interval 决定
+        kwargs.pop("poll_interval", None)
+        return PushGoHumanLoopProvider(
+            name=self.name, **self._webhook_options, **kwargs
+        )
+
+
+def create_manager(**kwargs: Any) -> GoHumanLoopManager:
+    """Create the GoHumanLoopManager selected by GOHUMANLOOP_DELIVERY
+    (poll, bulk or push). Keyword arguments go to the manager."""
+    delivery = os.environ.get("GOHUMANLOOP_DELIVERY", "poll")
+    if delivery == "poll":
+        return GoHumanLoopManager(**kwargs)
+
+    page_size = int(os.environ.get("GOHUMANLOOP_STATUS_PAGE_SIZE", "100"))
+    if delivery == "bulk":
+        return BulkPollGoHumanLoopManager(page_size=page_size, **kwargs)
+    if delivery == "push":
+        return PushGoHumanLoopManager(
+            webhook_host=os.environ.get("GOHUMANLOOP_WEBHOOK_HOST", "127.0.0.1"),
+            webhook_port=int(os.environ.get("GOHUMANLOOP_WEBHOOK_PORT", "0")),
+            public_url=os.environ.get("GOHUMANLOOP_WEBHOOK_URL"),
+            webhook_secret=os.environ.get("GOHUMANLOOP_WEBHOOK_SECRET"),
+            fallback_interval=float(
+                os.environ.get("GOHUMANLOOP_FALLBACK_INTERVAL", "60")
+            ),
+            page_size=page_size,
+            **kwargs,
+        )
+    raise ValueError(f"Unknown GOHUMANLOOP_DELIVERY: {delivery}")
@@ -0,0 +1,457 @@
+"""
+按响应延迟选择人工处理渠道
+
+多渠道示例中每个节点都写死了 provider_id（TerminalProvider 或 EmailProvider）。
+终端前的审核人空闲时，邮件审批依然要等好几分钟。
+
+RoutingHumanLoopManager 在 DefaultHumanLoopManager 的基础上：
+- 记录每个 provider 的响应延迟（指数移动平均）、处理中的请求数和连续失败次数
+- 未指定 provider_id（或指定为 AUTO_PROVIDER）的请求发给预计最快的健康 provider：
+  预计延迟 = 平均延迟 × (1 + 处理中的请求数)
+- 发送失败时依次尝试下一个 provider；连续失败（发送异常、ERROR、EXPIRED）达到
+  max_failures 次的 provider 在 cooldown 秒内不参与路由
+- 可选对冲（hedge_after）：审批 / 信息类请求在 hedge_after 秒内没有答复时，
+  再发给下一个 provider，采用最先得到的答复，取消其余请求
+
+只有显式指定 provider_id 的请求和续接的对话（async_continue_humanloop，或已存在对话中的
+多轮对话类请求）固定在一个 provider 上；多轮对话类请求只路由，不对冲。
+require_approval 等装饰器每次调用使用同一个对话 ID，而一个对话 ID 只能属于一个 provider，
+因此该对话 ID 已存在时，自动路由的审批 / 信息类请求使用独立的对话 ID（<conversation_id>:<n>），
+按原对话 ID 查询、取消请求时自动换成该 ID。这类独立对话（以及对冲请求的对话）只有一个请求，
+请求结束（得到最终状态或被取消）后从管理器的各个映射中删除，常驻进程中不会持续增长。
+"""
+
+import asyncio
+import itertools
+import time
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional, Tuple, Union
+
+from gohumanloop.core.interface import (
+    HumanLoopCallback,
+    HumanLoopProvider,
+    HumanLoopResult,
+    HumanLoopStatus,
+    HumanLoopType,
+)
+from gohumanloop.core.manager import DefaultHumanLoopManager
+
+AUTO_PROVIDER = "auto"
+
+_FAILED = (HumanLoopStatus.ERROR, HumanLoopStatus.EXPIRED)
+_WAITING = (HumanLoopStatus.PENDING, HumanLoopStatus.INPROGRESS)
+
+
+@dataclass
+class ProviderStats:
+    """Observed behaviour of one provider."""
+
+    # 平均响应延迟（秒），初始值为配置的预期延迟
+    latency: float
+    inflight: int = 0
+    requests: int = 0
+    answered: int = 0
+    failures: int = 0
+    consecutive_failures: int = 0
+    hedges: int = 0
+    unhealthy_until: float = 0.0
+
+    def expected_latency(self) -> float:
+        return self.latency * (1 + self.inflight)
+
+    def healthy(self, now: float) -> bool:
+        return now >= self.unhealthy_until
+
+
+class RoutingHumanLoopManager(DefaultHumanLoopManager):
+    """Human loop manager that routes each request to the provider expected
+    to answer first, optionally hedging across providers.
+
+    Args:
+        initial_providers: Providers to register
+        expected_latency: Initial latency estimate in seconds per provider name
+        default_latency: Initial latency estimate for providers not listed
+        hedge_after: Seconds without an answer before the request is also sent
+            to the next provider, None disables hedging
+        poll_interval: Seconds between status checks while waiting
+        alpha: Weight of the newest observation in the latency average
+        max_failures: Consecutive failures that mark a provider unhealthy
+        cooldown: Seconds an unhealthy provider is skipped
+    """
+
+    def __init__(
+        self,
+        initial_providers: Optional[
+            Union[HumanLoopProvider, List[HumanLoopProvider]]
+        ] = None,
+        expected_latency: Optional[Dict[str, float]] = None,
+        default_latency: float = 60.0,
+        hedge_after: Optional[float] = None,
+        poll_interval: float = 1.0,
+        alpha: float = 0.3,
+        max_failures: int = 3,
+        cooldown: float = 60.0,
+    ):
+        self.expected_latency = expected_latency or {}
+        self.default_latency = default_latency
+        self.hedge_after = hedge_after
+        self.poll_interval = poll_interval
+        self.alpha = alpha
+        self.max_failures = max_failures
+        self.cooldown = cooldown
+        self.provider_stats: Dict[str, ProviderStats] = {}
+        # (conversation_id, request_id) -> (provider_id, 发出时间)
+        self._outstanding: Dict[Tuple[str, str], Tuple[str, float]] = {}
+        # (调用方的 conversation_id, request_id) -> 实际使用的对话 ID
+        self._request_conversation: Dict[Tuple[str, str], str] = {}
+        # 本管理器为单个请求创建的对话 ID（独立对话、对冲对话），请求结束后删除
+        # conversation_id -> task_id
+        self._request_owned: Dict[str, str] = {}
+        self._conversation_seq = itertools.count(1)
+        super().__init__(initial_providers)
+
+    # ------------------------------------------------------------------
+    # 统计
+    # ------------------------------------------------------------------
+
+    def _stats(self, provider_id: str) -> ProviderStats:
+        stats = self.provider_stats.get(provider_id)
+        if stats is None:
+            stats = ProviderStats(
+                latency=self.expected_latency.get(provider_id, self.default_latency)
+            )
+            self.provider_stats[provider_id] = stats
+        return stats
+
+    def _record_failure(self, provider_id: str) -> None:
+        stats = self._stats(provider_id)
+        stats.failures += 1
+        stats.consecutive_failures += 1
+        if stats.consecutive_failures >= self.max_failures:
+            stats.unhealthy_until = time.monotonic() + self.cooldown
+
+    def _track(self, conversation_id: str, request_id: str, provider_id: str) -> None:
+        stats = self._stats(provider_id)
+        stats.requests += 1
+        stats.inflight += 1
+        self._outstanding[(conversation_id, request_id)] = (provider_id, time.monotonic())
+
+    def _untrack(
+        self, conversation_id: str, request_id: str, result: Optional[HumanLoopResult]
+    ) -> None:
+        """Stop tracking a request; record its outcome when result is given."""
+        entry = self._outstanding.pop((conversation_id, request_id), None)
+        if entry is None:
+            return
+        provider_id, started = entry
+        stats = self._stats(provider_id)
+        stats.inflight -= 1
+        elapsed = time.monotonic() - started
+        if result is None:
+            # 被取消的请求至少等待了 elapsed 秒还没有答复，只用来调高偏低的估计
+            if elapsed > stats.latency:
+                stats.latency = self.alpha * elapsed + (1 - self.alpha) * stats.latency
+            return
+        if result.status in _FAILED:
+            self._record_failure(provider_id)
+            return
+        stats.latency = self.alpha * elapsed + (1 - self.alpha) * stats.latency
+        stats.answered += 1
+        stats.consecutive_failures = 0
+        stats.unhealthy_until = 0.0
+
+    def rank_providers(self) -> List[str]:
+        """Provider ids ordered by expected latency, healthy ones first."""
+        now = time.monotonic()
+        return sorted(
+            self.providers,
+            key=lambda pid: (
+                not self._stats(pid).healthy(now),
+                self._stats(pid).expected_latency(),
+            ),
+        )
+
+    def stats(self) -> Dict[str, Dict[str, Any]]:
+        now = time.monotonic()
+        return {
+            pid: {
+                "latency_s": round(self._stats(pid).latency, 2),
+                "inflight": self._stats(pid).inflight,
+                "requests": self._stats(pid).requests,
+                "answered": self._stats(pid).answered,
+                "failures": self._stats(pid).failures,
+                "hedges": self._stats(pid).hedges,
+                "healthy": self._stats(pid).healthy(now),
+            }
+            for pid in self.providers
+        }
+
+    # ------------------------------------------------------------------
+    # 请求
+    # ------------------------------------------------------------------
+
+    def _new_conversation(self, conversation_id: str, task_id: str) -> str:
+        """A conversation id not yet bound to any provider, owned by one request."""
+        while True:
+            candidate = f"{conversation_id}:{next(self._conversation_seq)}"
+            if candidate not in self._conversation_provider:
+                self._request_owned[candidate] = task_id
+                return candidate
+
+    def _release(self, requested: str, conversation_id: str, request_id: str) -> None:
+        """Forget a finished request's alias and, if the conversation was
+        created for it alone, drop the conversation from the base maps."""
+        self._request_conversation.pop((requested, request_id), None)
+        task_id = self._request_owned.pop(conversation_id, None)
+        if task_id is None:
+            return
+        self._conversation_provider.pop(conversation_id, None)
+        for rid in self._conversation_requests.pop(conversation_id, []):
+            key = (conversation_id, rid)
+            self._callbacks.pop(key, None)
+            self._request_task.pop(key, None)
+            timeout_task = self._timeout_tasks.pop(key, None)
+            if timeout_task is not None:
+                timeout_task.cancel()
+        conversations = self._task_conversations.get(task_id)
+        if conversations is not None:
+            conversations.discard(conversation_id)
+            if not conversations:
+                del self._task_conversations[task_id]
+
+    async def async_check_request_status(
+        self, conversation_id: str, request_id: str, provider_id: Optional[str] = None
+    ) -> HumanLoopResult:
+        requested = conversation_id
+        conversation_id = self._request_conversation.get(
+            (conversation_id, request_id), conversation_id
+        )
+        result = await super().async_check_request_status(
+            conversation_id, request_id, provider_id
+        )
+        if result.status != HumanLoopStatus.PENDING:
+            self._untrack(conversation_id, request_id, result)
+        if result.status not in _WAITING:
+            self._release(requested, conversation_id, request_id)
+        return result
+
+    async def async_cancel_request(
+        self, conversation_id: str, request_id: str, provider_id: Optional[str] = None
+    ) -> bool:
+        requested = conversation_id
+        conversation_id = self._request_conversation.get(
+            (conversation_id, request_id), conversation_id
+        )
+        self._untrack(conversation_id, request_id, None)
+        try:
+            return await super().async_cancel_request(
+                conversation_id, request_id, provider_id
+            )
+        finally:
+            self._release(requested, conversation_id, request_id)
+
+    async def _send(
+        self,
+        candidates: List[str],
+        task_id: str,
+        conversation_id: str,
+        loop_type: HumanLoopType,
+        context: Dict[str, Any],
+        callback: Optional[HumanLoopCallback],
+        metadata: Optional[Dict[str, Any]],
+        timeout: Optional[int],
+    ) -> Tuple[str, str]:
+        """Send a request to the first candidate that accepts it."""
+        error: Optional[Exception] = None
+        for provider_id in candidates:
+            try:
+                request_id = await super().async_request_humanloop(
+                    task_id=task_id,
+                    conversation_id=conversation_id,
+                    loop_type=loop_type,
+                    context=context,
+                    callback=callback,
+                    metadata=metadata,
+                    provider_id=provider_id,
+                    timeout=timeout,
+                    blocking=False,
+                )
+            except Exception as e:
+                self._record_failure(provider_id)
+                error = e
+                continue
+            self._track(conversation_id, str(request_id), provider_id)
+            return provider_id, str(request_id)
+        raise error or ValueError("No provider available")
+
+    async def async_request_humanloop(
+        self,
+        task_id: str,
+        conversation_id: str,
+        loop_type: HumanLoopType,
+        context: Dict[str, Any],
+        callback: Optional[HumanLoopCallback] = None,
+        metadata: Optional[Dict[str, Any]] = None,
+        provider_id: Optional[str] = None,
+        timeout: Optional[int] = None,
+        blocking: bool = False,
+    ) -> Union[str, HumanLoopResult]:
+        requested_conversation = conversation_id
+        if provider_id not in (None, AUTO_PROVIDER):
+            candidates = [provider_id]
+        else:
+            candidates = self.rank_providers()
+            if conversation_id in self._conversation_provider:
+                if loop_type == HumanLoopType.CONVERSATION:
+                    # 已存在的多轮对话继续使用原来的 provider
+                    candidates = [self._conversation_provider[conversation_id]]
+                else:
+                    # 装饰器复用的对话 ID 已属于某个 provider，本次请求另起对话以便重新路由
+                    conversation_id = self._new_conversation(conversation_id, task_id)
+
+        hedge = (
+            blocking
+            and self.hedge_after is not None
+            and len(candidates) > 1
+            and loop_type != HumanLoopType.CONVERSATION
+        )
+        if hedge:
+            return await self._async_hedged_request(
+                candidates, task_id, conversation_id, loop_type, context,
+                callback, metadata, timeout,
+            )
+
+        try:
+            chosen, request_id = await self._send(
+                candidates, task_id, conversation_id, loop_type, context,
+                callback, metadata, timeout,
+            )
+        except Exception:
+            self._request_owned.pop(conversation_id, None)
+            raise
+        if not blocking:
+            if conversation_id != requested_conversation:
+                self._request_conversation[
+                    (requested_conversation, request_id)
+                ] = conversation_id
+            return request_id
+        return await self._async_wait_for_result(
+            conversation_id, request_id, self.providers[chosen], timeout
+        )
+
+    async def async_continue_humanloop(
+        self,
+        conversation_id: str,
+        context: Dict[str, Any],
+        callback: Optional[HumanLoopCallback] = None,
+        metadata: Optional[Dict[str, Any]] = None,
+        provider_id: Optional[str] = None,
+        timeout: Optional[int] = None,
+        blocking: bool = False,
+    ) -> Union[str, HumanLoopResult]:
+        if conversation_id not in self._conversation_provider and provider_id in (
+            None,
+            AUTO_PROVIDER,
+        ):
+            provider_id = self.rank_providers()[0]
+        request_id = await super().async_continue_humanloop(
+            conversation_id=conversation_id,
+            context=context,
+            callback=callback,
+            metadata=metadata,
+            provider_id=provider_id,
+            timeout=timeout,
+            blocking=False,
+        )
+        provider_id = self._conversation_provider[conversation_id]
+        self._track(conversation_id, str(request_id), provider_id)
+        if not blocking:
+            return request_id
+        return await self._async_wait_for_result(
+            conversation_id, str(request_id), self.providers[provider_id], timeout
+        )
+
+    async def _async_wait_for_result(
+        self,
+        conversation_id: str,
+        request_id: str,
+        provider: HumanLoopProvider,
+        timeout: Optional[int] = None,
+    ) -> HumanLoopResult:
+        while True:
+            result = await self.async_check_request_status(
+                conversation_id, request_id, provider.name
+            )
+            if result.status != HumanLoopStatus.PENDING:
+                return result
+            await asyncio.sleep(self.poll_interval)
+
+    async def _async_hedged_request(
+        self,
+        candidates: List[str],
+        task_id: str,
+        conversation_id: str,
+        loop_type: HumanLoopType,
+        context: Dict[str, Any],
+        callback: Optional[HumanLoopCallback],
+        metadata: Optional[Dict[str, Any]],
+        timeout: Optional[int],
+    ) -> HumanLoopResult:
+        """Send to the best provider, add the next one every hedge_after
+        seconds without an answer, and return the first answer."""
+        assert self.hedge_after is not None
+        remaining = list(candidates)
+        # (conversation_id, request_id, provider_id)
+        attempts: List[Tuple[str, str, str]] = []
+        last_failure: Optional[HumanLoopResult] = None
+        next_hedge = 0.0
+
+        while True:
+            now = time.monotonic()
+            if remaining and (now >= next_hedge or not attempts):
+                # 对冲请求使用独立的对话 ID，每个对话只属于一个 provider
+                attempt_conversation = (
+                    conversation_id
+                    if not attempts
+                    else f"{conversation_id}:hedge:{len(attempts)}"
+                )
+                if attempts:
+                    self._request_owned[attempt_conversation] = task_id
+                try:
+                    chosen, request_id = await self._send(
+                        remaining, task_id, attempt_conversation, loop_type,
+                        context, callback, metadata, timeout,
+                    )
+                except Exception:
+                    self._request_owned.pop(attempt_conversation, None)
+                    if not attempts:
+                        raise
+                    remaining = []
+                else:
+                    remaining = remaining[remaining.index(chosen) + 1 :]
+                    if attempts:
+                        self._stats(chosen).hedges += 1
+                    attempts.append((attempt_conversation, request_id, chosen))
+                next_hedge = now + self.hedge_after
+
+            for attempt in list(attempts):
+                result = await self.async_check_request_status(*attempt)
+                if result.status == HumanLoopStatus.PENDING:
+                    continue
+                attempts.remove(attempt)
+                if result.status in _FAILED:
+                    # 该渠道失败，立即尝试下一个
+                    last_failure = result
+                    next_hedge = 0.0
+                    continue
+                # 采用最先得到的答复，取消其余请求
+                await asyncio.gather(
+                    *(self.async_cancel_request(*other) for other in attempts),
+                    return_exceptions=True,
+                )
+                return result
+
+            if not attempts and not remaining:
+                assert last_failure is not None
+                return last_failure
+            await asyncio.sleep(self.poll_interval)
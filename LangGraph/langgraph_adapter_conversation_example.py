@@ -10,26 +10,33 @@ LangGraph框架中使用require_conversation装饰器的简化示例
 
 本示例展示了如何在LangGraph工作流中集成人机交互，
 实现一个简单的问答助手，能够在关键决策点引入人类反馈。
+
+草稿默认以流式方式边生成边展示给审核人，审核人按回车可以提前中断生成，
+直接对已生成的部分给出修改意见（DRAFT_STREAMING=off 关闭）。
 """
 import os
 from dotenv import load_dotenv
-from typing import TypedDict, Annotated, Sequence, Dict, Any
+from typing import TypedDict, Annotated, Dict, Any
 import asyncio
 
 from langchain_core.messages import HumanMessage, AIMessage, SystemMessage, human
 from langchain_openai import ChatOpenAI
-from langgraph.graph import StateGraph, END
+from langgraph.graph import END
 
 # 导入gohumanloop相关模块
 from gohumanloop.core.interface import HumanLoopStatus
 from gohumanloop.core.manager import DefaultHumanLoopManager
-from gohumanloop.providers.terminal_provider import TerminalProvider
 from gohumanloop.adapters.langgraph_adapter import HumanloopAdapter
 
+from async_nodes import AsyncStateGraph
+from draft_stream import StreamingTerminalProvider
+from llm_cache import astream_cached, create_llm_cache
+from message_log import MessageLog, append_messages
+
 
 # 定义工作流状态类型
 class AgentState(TypedDict):
-    messages: Annotated[Sequence[Any], "对话历史"]
+    messages: Annotated[MessageLog, "对话历史（只追加）", append_messages]
     draft_response: Annotated[Dict[str, Any], "AI草拟的回复"]
     next_step: Annotated[str, "下一步操作"]
     feedback_history: Annotated[list, "人类反馈历史"]
@@ -37,7 +44,8 @@ class AgentState(TypedDict):
 
 
 # 初始化人机循环管理器和适配器
-cli_provider = TerminalProvider(name="cli_provider")
+# StreamingTerminalProvider 可以在草稿生成过程中就展示给审核人
+cli_provider = StreamingTerminalProvider(name="cli_provider")
 manager = DefaultHumanLoopManager(cli_provider)
 adapter = HumanloopAdapter(manager, default_timeout=300)
 
@@ -49,15 +57,21 @@ api_key = os.getenv("OPENAI_API_KEY")
 api_base = os.getenv("OPENAI_API_BASE")
 
 # 创建 LLM
-llm = ChatOpenAI(model="deepseek-chat", base_url=api_base)
+# 相同的模型参数和消息直接复用缓存的响应（LLM_CACHE=off 关闭）
+llm_cache = create_llm_cache()
+llm = ChatOpenAI(model="deepseek-chat", base_url=api_base, cache=llm_cache)
+
+# 流式展示草稿（DRAFT_STREAMING=off 时等完整回复生成后再审核）
+draft_streaming = os.getenv("DRAFT_STREAMING", "on").lower() not in ("off", "false", "0")
 
 
 # 定义工作流节点
-def initialize_state() -> AgentState:
+def initialize_state(question: str) -> AgentState:
     """初始化工作流状态"""
     return {
         "messages": [
             SystemMessage(content="你是一个专业的问答助手，负责提供准确、有用的信息。"),
+            HumanMessage(content=question),
         ],
         "draft_response": {},
         "next_step": "generate_response",
@@ -66,32 +80,46 @@ def initialize_state() -> AgentState:
     }
 
 
-def generate_response(state: AgentState) -> AgentState:
+async def generate_response(state: AgentState) -> AgentState:
     """生成回复草稿"""
     messages = state["messages"]
     feedback_history = state["feedback_history"]
 
     # 如果有反馈历史，将其添加到消息中以改进回复
     if feedback_history:
-        # 创建一个临时消息列表，包含原始消息和最新的反馈
-        temp_messages = list(messages)
+        # 创建一个临时消息列表，包含原始消息和最新的反馈（不写入对话历史）
         last_feedback = feedback_history[-1]
-        temp_messages.append(
-            HumanMessage(content=f"请根据以下反馈调整你的回复: {last_feedback}")
-        )
+        temp_messages = [
+            *messages,
+            HumanMessage(content=f"请根据以下反馈调整你的回复: {last_feedback}"),
+        ]
     else:
         temp_messages = messages
 
-    # 使用LLM生成回复
-    response = llm.invoke(temp_messages)
+    iteration = len(feedback_history) + 1
+    if draft_streaming:
+        # 边生成边展示给审核人，审核人可以提前中断
+        content, interrupted = await cli_provider.stream_draft(
+            "response_review",
+            # astream_cached 先查 LLM 缓存，命中时一次展示完整草稿
+            astream_cached(llm, temp_messages),
+            title=f"第 {iteration} 版草稿",
+        )
+    else:
+        # 使用LLM生成回复
+        response = await llm.ainvoke(temp_messages)
+        content, interrupted = response.content, False
 
     # 更新状态
     draft_response = {
-        "content": response.content,
-        "iteration": len(feedback_history) + 1,
+        "content": content,
+        "iteration": iteration,
+        # 被审核人中断的草稿只包含已生成的部分
+        "interrupted": interrupted,
     }
 
-    return {**state, "draft_response": draft_response, "next_step": "review_response"}
+    # 只返回变化的字段，未返回的字段由 LangGraph 保留
+    return {"draft_response": draft_response, "next_step": "review_response"}
 
 
 @adapter.require_conversation(
@@ -101,19 +129,19 @@ def generate_response(state: AgentState) -> AgentState:
     ret_key="human_feedback",
     additional="请审核AI生成的回复，并提供反馈或修改建议。",
 )
-def review_response(
+async def review_response(
     state: AgentState, human_feedback: Dict[str, Any] = {}
 ) -> AgentState:
     """审核回复，需要人类反馈"""
-    messages = state["messages"]
     draft = state["draft_response"]
     feedback_history = state["feedback_history"].copy()
     is_final = False
+    new_messages = []
 
     # 检查是否有人类反馈
     if human_feedback and human_feedback.get("status") == HumanLoopStatus.COMPLETED:
         # 人类满意，将草稿添加到消息历史并标记为最终版本
-        messages.append(AIMessage(content=draft["content"]))
+        new_messages.append(AIMessage(content=draft["content"]))
         is_final = True
     elif human_feedback and human_feedback.get("response"):
         feedback = human_feedback["response"]
@@ -121,15 +149,14 @@ def review_response(
         feedback_history.append(feedback)
     else:
         # 无人类反馈，默认通过
-        messages.append(AIMessage(content=draft["content"]))
+        new_messages.append(AIMessage(content=draft["content"]))
         is_final = True
 
     # 确定下一步
     next_step = END if is_final else "generate_response"
 
     return {
-        **state,
-        "messages": messages,
+        "messages": new_messages,
         "feedback_history": feedback_history,
         "is_final": is_final,
         "next_step": next_step,
@@ -145,7 +172,8 @@ def decide_next_step(state: AgentState) -> str:
 
 
 # 构建工作流图
-workflow = StateGraph(AgentState)
+# 节点都是 async 函数；之后新增的同步节点会自动放进有界线程池执行，不阻塞事件循环
+workflow = AsyncStateGraph(AgentState, blocking_workers=4)
 
 # 添加节点
 workflow.add_node("generate_response", generate_response)
@@ -177,13 +205,8 @@ async def run_example():
         "提示: 如果对AI回复满意，请回复'满意'或'通过'结束流程。否则提供具体反馈以改进回复。\n"
     )
 
-    # 初始化状态
-    state = initialize_state()
-
-    # 添加用户问题
-    state["messages"].append(
-        HumanMessage(content="请解释量子计算的基本原理和潜在应用。")
-    )
+    # 初始化状态，包含用户问题
+    state = initialize_state("请解释量子计算的基本原理和潜在应用。")
 
     # 运行工作流
     result = await app.ainvoke(state)
@@ -203,6 +226,9 @@ async def run_example():
     else:
         print("无反馈记录")
 
+    if llm_cache is not None:
+        print(f"\n=== LLM 缓存 ===\n{llm_cache.stats()}")
+
 
 if __name__ == "__main__":
     asyncio.run(run_example())
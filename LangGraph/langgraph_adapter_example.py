@@ -6,7 +6,7 @@
 # "langchain-openai>=0.3.12"]
 # ///
 
-from typing import Dict, Any, List, Annotated, TypedDict
+from typing import Dict, Any, Annotated, TypedDict
 import operator
 import os
 from dotenv import load_dotenv
@@ -22,6 +22,10 @@ from gohumanloop.core.interface import HumanLoopStatus
 import logging
 from typing_extensions import TypedDict
 
+from approval_policy import create_policy
+from llm_cache import create_llm_cache
+from message_log import MessageLog, append_messages
+
 # 设置日志配置
 logging.basicConfig(
     level=logging.INFO, format="%(asctime)s - %(name)s - %(levelname)s - %(message)s"
@@ -34,7 +38,8 @@ load_dotenv()
 
 # 定义状态类型
 class AgentState(TypedDict):
-    messages: List[Any]
+    # 只追加的消息历史，节点只返回新增的消息
+    messages: Annotated[MessageLog, append_messages]
     next: str
 
 
@@ -43,7 +48,9 @@ api_key = os.getenv("OPENAI_API_KEY")
 api_base = os.getenv("OPENAI_API_BASE")
 
 # 创建 LLM
-llm = ChatOpenAI(model="deepseek-chat", base_url=api_base)
+# 相同的模型参数和消息直接复用缓存的响应（LLM_CACHE=off 关闭）
+llm_cache = create_llm_cache()
+llm = ChatOpenAI(model="deepseek-chat", base_url=api_base, cache=llm_cache)
 
 # 创建 HumanLoopManager 实例
 manager = DefaultHumanLoopManager(
@@ -54,7 +61,15 @@ manager = DefaultHumanLoopManager(
 adapter = HumanloopAdapter(manager, default_timeout=60)
 
 
+# 审批前的策略预筛：白名单账户工作时间内的小额转账自动批准，金额非法或超限自动拒绝，
+# 其余交给人工（规则见 transaction_policy.json，APPROVAL_POLICY=off 关闭）
+policy = create_policy(
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), "transaction_policy.json")
+)
+
+
 # 使用审批装饰器的敏感操作
+@policy.prescreen(execute_on_reject=True)
 @adapter.require_approval(execute_on_reject=True)
 def execute_financial_transaction(
     amount: float, account_id: str, approval_result=None
@@ -91,10 +106,9 @@ def agent(state: AgentState) -> AgentState:
     """AI 代理处理节点"""
     messages = state["messages"]
 
-    # 添加系统提示，定义LLM的角色和任务
-    if not any(msg.type == "system" for msg in messages):
-        system_message = SystemMessage(
-            content="""
+    # 添加系统提示，定义LLM的角色和任务（只用于本次调用，不写入对话历史）
+    system_message = SystemMessage(
+        content="""
 你是一位专业的金融顾问助手，负责帮助用户处理金融交易请求。
 你的职责包括：
 1. 理解用户的金融交易需求
@@ -104,8 +118,7 @@ def agent(state: AgentState) -> AgentState:
 
 请根据用户的请求，提供清晰的交易建议和操作方案。你的回复将由人工审核后再执行。
 """
-        )
-        messages = [system_message] + messages
+    )
 
     # 为用户消息添加更明确的指令
     last_message = messages[-1]
@@ -125,18 +138,15 @@ def agent(state: AgentState) -> AgentState:
 
 请以专业金融顾问的身份回复，你的建议将被用于决定是否执行此交易。
 """
-        # 替换最后一条消息
-        messages = messages[:-1] + [HumanMessage(content=enhanced_prompt)]
+        # 只在发给LLM的消息中替换最后一条，对话历史保留原始用户消息
+        llm_messages = [system_message, *messages[:-1], HumanMessage(content=enhanced_prompt)]
+    else:
+        llm_messages = [system_message, *messages]
 
     # 调用LLM获取响应
-    response = llm.invoke(messages)
+    response = llm.invoke(llm_messages)
 
-    # 恢复原始用户消息以保持对话连贯性
-    if isinstance(last_message, HumanMessage):
-        # 使用列表切片替换最后一个元素，避免直接赋值可能导致的问题
-        messages = messages[:-1] + [last_message]
-
-    return {"messages": messages + [response], "next": "human_review"}
+    return {"messages": [response], "next": "human_review"}
 
 
 @adapter.require_approval(ret_key="approval_data", execute_on_reject=True)
@@ -150,36 +160,32 @@ def human_review(state: AgentState, approval_data=None) -> AgentState:
     # 添加审核结果到消息
     if approval_data and approval_data.get("status") == HumanLoopStatus.APPROVED:
         review_message = HumanMessage(content=f"[已审核] {last_message}")
-        return {"messages": messages + [review_message], "next": "process_transaction"}
+        return {"messages": [review_message], "next": "process_transaction"}
     else:
         review_message = HumanMessage(content=f"[审核拒绝] 请重新生成回复")
-        return {"messages": messages + [review_message], "next": "agent"}
+        return {"messages": [review_message], "next": "agent"}
 
 
 def process_transaction(state: AgentState) -> AgentState:
     """处理交易节点"""
-    messages = state["messages"]
-
     # 模拟交易处理
     transaction_result = execute_financial_transaction(
         amount=100.0, account_id="user_12345"
     )
 
     result_message = HumanMessage(content=f"交易结果: {transaction_result['message']}")
-    return {"messages": messages + [result_message], "next": "collect_feedback"}
+    return {"messages": [result_message], "next": "collect_feedback"}
 
 
 @adapter.require_info(ret_key="feedback_data")
 def collect_feedback(state: AgentState, feedback_data={}) -> AgentState:
     """收集用户反馈节点"""
-    messages = state["messages"]
-
     logger.info(f"获取的反馈信息: {feedback_data}")
 
     feedback_message = HumanMessage(
         content=f"收到用户反馈: {feedback_data.get('response', '无反馈')}"
     )
-    return {"messages": messages + [feedback_message], "next": END}
+    return {"messages": [feedback_message], "next": END}
 
 
 def router(state: AgentState) -> str:
@@ -226,6 +232,8 @@ def main():
                 logger.info(f"最新消息: {messages[-1].content}")
 
         logger.info("工作流执行完成!")
+        if llm_cache is not None:
+            logger.info(f"LLM 缓存统计: {llm_cache.stats()}")
     except Exception as e:
         logger.exception(f"工作流执行错误: {str(e)}")
 
@@ -6,17 +6,19 @@
 # "langchain-openai>=0.3.12"]
 # ///
 
+import os
 import uuid
 import time
 from typing import Optional
 from typing_extensions import TypedDict
 
-from langgraph.checkpoint.memory import MemorySaver
 from langgraph.constants import START
 from langgraph.graph import StateGraph
 
 from gohumanloop.adapters.langgraph_adapter import interrupt, create_resume_command
 
+from compact_checkpointer import CompactSqliteSaver
+
 
 class State(TypedDict):
     """The graph state."""
@@ -41,12 +43,13 @@ builder.add_node("node", node)
 builder.add_edge(START, "node")
 
 # A checkpointer must be enabled for interrupts to work!
-checkpointer = MemorySaver()
+# 检查点持久化到 SQLite，等待人工处理的线程不占用内存，进程重启后也能恢复
+checkpointer = CompactSqliteSaver(os.environ.get("LANGGRAPH_CHECKPOINT_DB"))
 graph = builder.compile(checkpointer=checkpointer)
 
 config = {
     "configurable": {
-        "thread_id": uuid.uuid4(),
+        "thread_id": str(uuid.uuid4()),
     }
 }
 
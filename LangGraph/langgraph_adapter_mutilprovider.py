@@ -8,7 +8,7 @@
 # ///
 
 
-from typing import Dict, Any, List, Annotated, TypedDict
+from typing import Dict, Any, Annotated, TypedDict
 import operator
 import os
 from dotenv import load_dotenv
@@ -18,13 +18,17 @@ from langgraph.graph import StateGraph, END
 from langgraph.prebuilt import ToolNode
 
 from gohumanloop.adapters.langgraph_adapter import HumanloopAdapter
-from gohumanloop  import DefaultHumanLoopManager
 from gohumanloop.providers.terminal_provider import TerminalProvider
-from gohumanloop.providers.email_provider import EmailProvider
 from gohumanloop.core.interface import HumanLoopStatus
 import logging
 from typing_extensions import TypedDict
 
+from approval_policy import create_policy
+from ghl_email import IdleEmailProvider
+from ghl_routing import AUTO_PROVIDER, RoutingHumanLoopManager
+from llm_cache import create_llm_cache
+from message_log import MessageLog, append_messages
+
 # 设置日志配置
 logging.basicConfig(
     level=logging.INFO, format="%(asctime)s - %(name)s - %(levelname)s - %(message)s"
@@ -37,7 +41,8 @@ load_dotenv()
 
 # 定义状态类型
 class AgentState(TypedDict):
-    messages: List[Any]
+    # 只追加的消息历史，节点只返回新增的消息
+    messages: Annotated[MessageLog, append_messages]
     next: str
 
 
@@ -50,33 +55,55 @@ smtp_port = int(os.environ.get("SMTP_PORT", "587"))
 imap_server = os.environ.get("IMAP_SERVER", "imap.example.com")
 imap_port = int(os.environ.get("IMAP_PORT", "993"))
 recipient_email = os.environ.get("TEST_RECIPIENT_EMAIL", "your_email@example.com")
+email_security = os.environ.get("EMAIL_SECURITY", "ssl")
+email_digest_window = float(os.environ.get("EMAIL_DIGEST_WINDOW", "0"))
 
 
 # 创建 LLM
-llm = ChatOpenAI(model="deepseek-chat", base_url=api_base)
+# 相同的模型参数和消息直接复用缓存的响应（LLM_CACHE=off 关闭）
+llm_cache = create_llm_cache()
+llm = ChatOpenAI(model="deepseek-chat", base_url=api_base, cache=llm_cache)
+
+# 使用 IMAP IDLE 等待答复，邮件到达即继续执行；
+# 同一邮箱的所有待处理请求共用一个 IMAP 连接扫描答复；
+# 设置 EMAIL_DIGEST_WINDOW（秒）后，同一收件人在窗口内的审批请求合并为一封汇总邮件
+email_provider = IdleEmailProvider(
+    name="EmailProvider",
+    smtp_server=smtp_server,
+    smtp_port=smtp_port,
+    imap_server=imap_server,
+    imap_port=imap_port,
+    check_interval=30,  # 服务器不支持 IDLE 时每30秒检查一次邮件
+    language="en",  # 支持中文模板切换
+    security=email_security,
+    digest_window=email_digest_window,
+)
 
 # 创建 HumanLoopManager 实例
-manager = DefaultHumanLoopManager(
-    initial_providers=[
-        TerminalProvider(name="TerminalProvider"),
-        EmailProvider(
-            name="EmailProvider",
-            smtp_server=smtp_server,
-            smtp_port=smtp_port,
-            imap_server=imap_server,
-            imap_port=imap_port,
-            check_interval=30,  # 每30秒检查一次邮件
-            language="en",  # 支持中文模板切换
-        ),
-    ]
+# 请求发给预计最快答复的健康渠道；设置 HUMANLOOP_HEDGE_AFTER（秒）后，
+# 超过该时间没有答复的审批会同时发给下一个渠道，采用最先得到的答复
+hedge_after = float(os.environ.get("HUMANLOOP_HEDGE_AFTER", "0"))
+manager = RoutingHumanLoopManager(
+    initial_providers=[TerminalProvider(name="TerminalProvider"), email_provider],
+    # 初始的预期响应延迟（秒），之后按实际观测到的延迟更新
+    expected_latency={"TerminalProvider": 60, "EmailProvider": 600},
+    hedge_after=hedge_after or None,
 )
 
 # 创建 LangGraphAdapter 实例
 adapter = HumanloopAdapter(manager, default_timeout=600)
 
 
+# 审批前的策略预筛：白名单账户工作时间内的小额转账自动批准，金额非法或超限自动拒绝，
+# 其余交给人工（规则见 transaction_policy.json，APPROVAL_POLICY=off 关闭）
+policy = create_policy(
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), "transaction_policy.json")
+)
+
+
 # 使用审批装饰器的敏感操作
-@adapter.require_approval(execute_on_reject=True, provider_id="TerminalProvider")
+@policy.prescreen(execute_on_reject=True)
+@adapter.require_approval(execute_on_reject=True, provider_id=AUTO_PROVIDER)
 def execute_financial_transaction(
     amount: float, account_id: str, approval_result=None
 ) -> Dict[str, Any]:
@@ -112,10 +139,9 @@ def agent(state: AgentState) -> AgentState:
     """AI 代理处理节点"""
     messages = state["messages"]
 
-    # 添加系统提示，定义LLM的角色和任务
-    if not any(msg.type == "system" for msg in messages):
-        system_message = SystemMessage(
-            content="""
+    # 添加系统提示，定义LLM的角色和任务（只用于本次调用，不写入对话历史）
+    system_message = SystemMessage(
+        content="""
 你是一位专业的金融顾问助手，负责帮助用户处理金融交易请求。
 你的职责包括：
 1. 理解用户的金融交易需求
@@ -125,8 +151,7 @@ def agent(state: AgentState) -> AgentState:
 
 请根据用户的请求，提供清晰的交易建议和操作方案。你的回复将由人工审核后再执行。
 """
-        )
-        messages = [system_message] + messages
+    )
 
     # 为用户消息添加更明确的指令
     last_message = messages[-1]
@@ -146,24 +171,21 @@ def agent(state: AgentState) -> AgentState:
 
 请以专业金融顾问的身份回复，你的建议将被用于决定是否执行此交易。
 """
-        # 替换最后一条消息
-        messages = messages[:-1] + [HumanMessage(content=enhanced_prompt)]
+        # 只在发给LLM的消息中替换最后一条，对话历史保留原始用户消息
+        llm_messages = [system_message, *messages[:-1], HumanMessage(content=enhanced_prompt)]
+    else:
+        llm_messages = [system_message, *messages]
 
     # 调用LLM获取响应
-    response = llm.invoke(messages)
+    response = llm.invoke(llm_messages)
 
-    # 恢复原始用户消息以保持对话连贯性
-    if isinstance(last_message, HumanMessage):
-        # 使用列表切片替换最后一个元素，避免直接赋值可能导致的问题
-        messages = messages[:-1] + [last_message]
-
-    return {"messages": messages + [response], "next": "human_review"}
+    return {"messages": [response], "next": "human_review"}
 
 
 @adapter.require_approval(
     ret_key="approval_data",
     execute_on_reject=True,
-    provider_id="EmailProvider",
+    provider_id=AUTO_PROVIDER,
     metadata={"recipient_email": recipient_email},
 )
 def human_review(state: AgentState, approval_data=None) -> AgentState:
@@ -176,36 +198,32 @@ def human_review(state: AgentState, approval_data=None) -> AgentState:
     # 添加审核结果到消息
     if approval_data and approval_data.get("status") == HumanLoopStatus.APPROVED:
         review_message = HumanMessage(content=f"[已审核] {last_message}")
-        return {"messages": messages + [review_message], "next": "process_transaction"}
+        return {"messages": [review_message], "next": "process_transaction"}
     else:
         review_message = HumanMessage(content=f"[审核拒绝] 请重新生成回复")
-        return {"messages": messages + [review_message], "next": "agent"}
+        return {"messages": [review_message], "next": "agent"}
 
 
 def process_transaction(state: AgentState) -> AgentState:
     """处理交易节点"""
-    messages = state["messages"]
-
     # 模拟交易处理
     transaction_result = execute_financial_transaction(
         amount=100.0, account_id="user_12345"
     )
 
     result_message = HumanMessage(content=f"交易结果: {transaction_result['message']}")
-    return {"messages": messages + [result_message], "next": "collect_feedback"}
+    return {"messages": [result_message], "next": "collect_feedback"}
 
 
-@adapter.require_info(ret_key="feedback_data", provider_id="TerminalProvider")
+@adapter.require_info(ret_key="feedback_data", provider_id=AUTO_PROVIDER)
 def collect_feedback(state: AgentState, feedback_data={}) -> AgentState:
     """收集用户反馈节点"""
-    messages = state["messages"]
-
     logger.info(f"获取的反馈信息: {feedback_data}")
 
     feedback_message = HumanMessage(
         content=f"收到用户反馈: {feedback_data.get('response', '无反馈')}"
     )
-    return {"messages": messages + [feedback_message], "next": END}
+    return {"messages": [feedback_message], "next": END}
 
 
 def router(state: AgentState) -> str:
@@ -252,6 +270,10 @@ def main():
                 logger.info(f"最新消息: {messages[-1].content}")
 
         logger.info("工作流执行完成!")
+        if llm_cache is not None:
+            logger.info(f"LLM 缓存统计: {llm_cache.stats()}")
+        logger.info(f"人工处理渠道统计: {manager.stats()}")
+        logger.info(f"邮件扫描统计: {email_provider.stats()}")
     except Exception as e:
         logger.exception(f"工作流执行错误: {str(e)}")
 
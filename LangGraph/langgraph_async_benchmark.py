@@ -0,0 +1,236 @@
+# /// script
+# requires-python = ">=3.10"
+# dependencies = [
+# "gohumanloop>=0.0.10",
+# "langgraph>=0.4.7"]
+# ///
+"""
+同一个事件循环中并发运行 100 个工作流的对比
+
+每个工作流：generate（LLM 调用，默认 1 秒）→ review（require_approval，默认 2 秒后自动批准）。
+LLM 和审批人都是本地模拟，不需要 API Key。三种写法：
+- sync:    同步节点 + llm.invoke() + 装饰同步函数的 require_approval，使用 StateGraph
+           （LangGraph 把同步节点交给事件循环的默认线程池）
+- offload: 同样的同步节点，使用 AsyncStateGraph，放进独立的有界线程池
+- async:   async 节点 + llm.ainvoke() + 装饰 async 函数的 require_approval
+
+输出总耗时、单个工作流耗时的 p50/p95、事件循环的最大延迟和峰值线程数。
+
+示例：
+    uv run langgraph_async_benchmark.py --workflows 100
+    uv run langgraph_async_benchmark.py --mode async --workflows 1000
+"""
+
+import argparse
+import asyncio
+import itertools
+import json
+import threading
+import time
+from typing import Any, Dict, List, Optional
+
+from langchain_core.language_models.fake_chat_models import GenericFakeChatModel
+from langchain_core.messages import AIMessage, HumanMessage
+from langgraph.graph import END, StateGraph
+from typing_extensions import TypedDict
+
+from gohumanloop.adapters.langgraph_adapter import HumanloopAdapter
+from gohumanloop.core.interface import HumanLoopResult, HumanLoopStatus, HumanLoopType
+from gohumanloop.core.manager import DefaultHumanLoopManager
+from gohumanloop.providers.base import BaseProvider
+
+from async_nodes import AsyncStateGraph
+from resume_driver import percentile
+
+
+class SlowFakeChatModel(GenericFakeChatModel):
+    """Fake chat model that takes `latency` seconds per call."""
+
+    latency: float = 1.0
+
+    def _generate(self, *args: Any, **kwargs: Any) -> Any:
+        time.sleep(self.latency)
+        return super()._generate(*args, **kwargs)
+
+    async def _agenerate(self, *args: Any, **kwargs: Any) -> Any:
+        await asyncio.sleep(self.latency)
+        return super()._generate(*args, **kwargs)
+
+
+class AutoApproveProvider(BaseProvider):
+    """Provider whose simulated reviewer approves every request after `delay` seconds."""
+
+    def __init__(self, name: str, delay: float = 2.0):
+        super().__init__(name)
+        self.delay = delay
+
+    async def async_request_humanloop(
+        self,
+        task_id: str,
+        conversation_id: str,
+        loop_type: HumanLoopType,
+        context: Dict[str, Any],
+        metadata: Optional[Dict[str, Any]] = None,
+        timeout: Optional[int] = None,
+    ) -> HumanLoopResult:
+        request_id = self._generate_request_id()
+        self._store_request(
+            conversation_id=conversation_id,
+            request_id=request_id,
+            task_id=task_id,
+            loop_type=loop_type,
+            context=context,
+            metadata=metadata or {},
+            timeout=timeout,
+        )
+        # 按时间判断是否已批准，与请求在哪个事件循环中等待无关
+        self._requests[(conversation_id, request_id)]["decide_at"] = (
+            time.monotonic() + self.delay
+        )
+        return HumanLoopResult(
+            conversation_id=conversation_id,
+            request_id=request_id,
+            loop_type=loop_type,
+            status=HumanLoopStatus.PENDING,
+        )
+
+    async def async_check_request_status(
+        self, conversation_id: str, request_id: str
+    ) -> HumanLoopResult:
+        request_info = self._get_request(conversation_id, request_id) or {}
+        approved = time.monotonic() >= request_info.get("decide_at", float("inf"))
+        return HumanLoopResult(
+            conversation_id=conversation_id,
+            request_id=request_id,
+            loop_type=request_info.get("loop_type", HumanLoopType.APPROVAL),
+            status=HumanLoopStatus.APPROVED if approved else HumanLoopStatus.PENDING,
+            response="approved" if approved else {},
+        )
+
+    async def async_continue_humanloop(
+        self,
+        conversation_id: str,
+        context: Dict[str, Any],
+        metadata: Optional[Dict[str, Any]] = None,
+        timeout: Optional[int] = None,
+    ) -> HumanLoopResult:
+        conversation = self._get_conversation(conversation_id) or {}
+        return await self.async_request_humanloop(
+            conversation.get("task_id", "benchmark"),
+            conversation_id,
+            HumanLoopType.CONVERSATION,
+            context,
+            metadata,
+            timeout,
+        )
+
+
+class State(TypedDict):
+    question: str
+    draft: str
+    approved: bool
+
+
+def build_graph(mode: str, llm: Any, adapter: HumanloopAdapter, workers: int) -> Any:
+    if mode == "async":
+
+        async def generate(state: State) -> Dict[str, Any]:
+            response = await llm.ainvoke([HumanMessage(content=state["question"])])
+            return {"draft": response.content}
+
+        @adapter.require_approval(ret_key="approval", execute_on_reject=True)
+        async def review(state: State, approval: Any = None) -> Dict[str, Any]:
+            return {"approved": approval["status"] == HumanLoopStatus.APPROVED}
+
+    else:
+
+        def generate(state: State) -> Dict[str, Any]:  # type: ignore[misc]
+            response = llm.invoke([HumanMessage(content=state["question"])])
+            return {"draft": response.content}
+
+        @adapter.require_approval(ret_key="approval", execute_on_reject=True)
+        def review(state: State, approval: Any = None) -> Dict[str, Any]:  # type: ignore[misc]
+            return {"approved": approval["status"] == HumanLoopStatus.APPROVED}
+
+    if mode == "offload":
+        workflow = AsyncStateGraph(State, blocking_workers=workers)
+    else:
+        workflow = StateGraph(State)
+    workflow.add_node("generate", generate)
+    workflow.add_node("review", review)
+    workflow.set_entry_point("generate")
+    workflow.add_edge("generate", "review")
+    workflow.add_edge("review", END)
+    return workflow.compile()
+
+
+async def monitor(stats: Dict[str, float], stop: asyncio.Event, interval: float = 0.01) -> None:
+    """Record the worst event loop delay and the peak thread count."""
+    loop = asyncio.get_running_loop()
+    while not stop.is_set():
+        expected = loop.time() + interval
+        await asyncio.sleep(interval)
+        stats["max_loop_lag_ms"] = max(
+            stats["max_loop_lag_ms"], (loop.time() - expected) * 1000
+        )
+        stats["peak_threads"] = max(stats["peak_threads"], threading.active_count())
+
+
+async def run(mode: str, args: argparse.Namespace) -> Dict[str, Any]:
+    llm = SlowFakeChatModel(
+        messages=itertools.cycle([AIMessage(content="draft")]), latency=args.llm_latency
+    )
+    manager = DefaultHumanLoopManager(
+        AutoApproveProvider(name="auto", delay=args.human_delay)
+    )
+    adapter = HumanloopAdapter(manager, default_timeout=600)
+    graph = build_graph(mode, llm, adapter, args.blocking_workers)
+
+    stats: Dict[str, float] = {"max_loop_lag_ms": 0.0, "peak_threads": 0}
+    stop = asyncio.Event()
+    watcher = asyncio.create_task(monitor(stats, stop))
+    latencies: List[float] = []
+
+    async def one(index: int) -> None:
+        start = time.perf_counter()
+        result = await graph.ainvoke(
+            {"question": f"question {index}", "draft": "", "approved": False}
+        )
+        assert result["approved"]
+        latencies.append(time.perf_counter() - start)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(one(i) for i in range(args.workflows)))
+    elapsed = time.perf_counter() - start
+    stop.set()
+    await watcher
+
+    return {
+        "mode": mode,
+        "workflows": args.workflows,
+        "duration_s": round(elapsed, 2),
+        "p50_s": round(percentile(latencies, 50), 2),
+        "p95_s": round(percentile(latencies, 95), 2),
+        "max_loop_lag_ms": round(stats["max_loop_lag_ms"], 1),
+        "peak_threads": int(stats["peak_threads"]),
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Concurrent workflow benchmark")
+    parser.add_argument("--workflows", type=int, default=100)
+    parser.add_argument("--mode", choices=["sync", "offload", "async", "all"], default="all")
+    parser.add_argument("--llm-latency", type=float, default=1.0)
+    parser.add_argument("--human-delay", type=float, default=2.0)
+    parser.add_argument(
+        "--blocking-workers", type=int, default=16, help="Thread pool size in offload mode"
+    )
+    args = parser.parse_args()
+
+    modes = ["sync", "offload", "async"] if args.mode == "all" else [args.mode]
+    for mode in modes:
+        print(json.dumps(asyncio.run(run(mode, args))))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,160 @@
+# /// script
+# requires-python = ">=3.10"
+# dependencies = [
+# "gohumanloop>=0.0.10",
+# "langgraph>=0.4.7"]
+# ///
+"""
+批量并发恢复中断线程示例
+
+1. 启动 N 个线程，每个线程都在审批节点中断，等待人工答复
+2. 审批人集中处理积压后，答复按 thread_id 进入队列
+3. ResumeDispatcher 以有限并发恢复这些线程，并输出每个线程的恢复延迟
+
+答复可以来自 JSONL 文件（每行 {"thread_id": "...", "response": ...}），
+不指定时为所有中断线程生成模拟答复。
+
+--verify 在恢复之前用 MemorySaver 暂停同样的线程，逐个比较 aget_state 返回的待处理中断，
+有不一致的线程时退出码为 1（检查 CompactSqliteSaver 缓存的检查点是否带着中断写入）。
+
+示例：
+    uv run langgraph_batch_resume.py --threads 500 --concurrency 32
+    uv run langgraph_batch_resume.py --threads 100 --concurrency 1 --verify
+    uv run langgraph_batch_resume.py --responses responses.jsonl --concurrency 16
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import sys
+import time
+import uuid
+from typing import Any, AsyncIterator, List, Optional, Tuple
+
+from langgraph.checkpoint.memory import MemorySaver
+from langgraph.constants import START
+from langgraph.graph import StateGraph
+from langgraph.types import interrupt
+from typing_extensions import TypedDict
+
+from compact_checkpointer import CompactSqliteSaver
+from resume_driver import ResumeDispatcher, summarize
+
+
+class State(TypedDict):
+    request: str
+    decision: Optional[str]
+    result: Optional[str]
+
+
+def review(state: State):
+    decision = interrupt({"request": state["request"], "question": "approve or reject?"})
+    return {"decision": decision}
+
+
+async def execute(state: State):
+    # 模拟审批通过后的后续处理（调用工具、LLM 等 I/O 操作）
+    await asyncio.sleep(0.05)
+    return {"result": f"{state['request']}: {state['decision']}"}
+
+
+builder = StateGraph(State)
+builder.add_node("review", review)
+builder.add_node("execute", execute)
+builder.add_edge(START, "review")
+builder.add_edge("review", "execute")
+
+
+async def pause_threads(
+    graph: Any, count: int, concurrency: int, thread_ids: Optional[List[str]] = None
+) -> List[str]:
+    """Start `count` threads that stop at the review interrupt.
+
+    Args:
+        thread_ids: Thread ids to use, new ones by default
+    """
+    thread_ids = thread_ids or [str(uuid.uuid4()) for _ in range(count)]
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def start(index: int, thread_id: str) -> None:
+        async with semaphore:
+            await graph.ainvoke(
+                {"request": f"request-{index}", "decision": None, "result": None},
+                {"configurable": {"thread_id": thread_id}},
+            )
+
+    await asyncio.gather(*(start(i, t) for i, t in enumerate(thread_ids)))
+    return thread_ids
+
+
+async def pending_interrupts(graph: Any, thread_id: str) -> List[Any]:
+    state = await graph.aget_state({"configurable": {"thread_id": thread_id}})
+    return [item.value for task in state.tasks for item in task.interrupts]
+
+
+async def verify_interrupts(graph: Any, thread_ids: List[str], concurrency: int) -> int:
+    """Pause the same threads on MemorySaver; count threads whose pending
+    interrupts differ from graph's."""
+    reference = builder.compile(checkpointer=MemorySaver())
+    await pause_threads(reference, len(thread_ids), concurrency, thread_ids)
+    mismatched = 0
+    for thread_id in thread_ids:
+        if await pending_interrupts(graph, thread_id) != await pending_interrupts(
+            reference, thread_id
+        ):
+            mismatched += 1
+    return mismatched
+
+
+async def read_responses(path: str) -> AsyncIterator[Tuple[str, Any]]:
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            if line.strip():
+                item = json.loads(line)
+                yield item["thread_id"], item["response"]
+
+
+async def main() -> None:
+    parser = argparse.ArgumentParser(description="Resume interrupted threads in bulk")
+    parser.add_argument("--threads", type=int, default=200, help="Threads to pause first")
+    parser.add_argument("--responses", help="JSONL file of {thread_id, response}")
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--timeout", type=float, help="Per-thread resume timeout")
+    parser.add_argument("--quiet", action="store_true", help="Only print the summary")
+    parser.add_argument(
+        "--verify",
+        action="store_true",
+        help="Compare the paused threads' interrupts with MemorySaver before resuming",
+    )
+    args = parser.parse_args()
+
+    checkpointer = CompactSqliteSaver(os.environ.get("LANGGRAPH_CHECKPOINT_DB"))
+    graph = builder.compile(checkpointer=checkpointer)
+
+    if args.responses:
+        responses: Any = read_responses(args.responses)
+    else:
+        thread_ids = await pause_threads(graph, args.threads, args.concurrency)
+        print(f"{len(thread_ids)} 个线程等待人工答复")
+        if args.verify:
+            mismatched = await verify_interrupts(graph, thread_ids, args.concurrency)
+            print(f"与 MemorySaver 的中断不一致的线程: {mismatched}")
+            if mismatched:
+                checkpointer.close()
+                sys.exit(1)
+        responses = ((thread_id, "approve") for thread_id in thread_ids)
+
+    dispatcher = ResumeDispatcher(graph, concurrency=args.concurrency, timeout=args.timeout)
+    results = []
+    start = time.perf_counter()
+    async for result in dispatcher.run(responses):
+        results.append(result)
+        if not args.quiet:
+            print(json.dumps(result, ensure_ascii=False))
+    print(json.dumps(summarize(results, time.perf_counter() - start), indent=2))
+    checkpointer.close()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -19,7 +19,7 @@ LangGraph 与 GoHumanLoop 简单集成示例，并对接飞书应用。
 
 import os
 import time
-from typing import TypedDict, List, Dict
+from typing import Annotated, Any, TypedDict, Dict
 from dotenv import load_dotenv
 
 # 导入 LangGraph 相关库
@@ -28,9 +28,13 @@ from langgraph.graph import StateGraph, END
 # 导入 GoHumanLoop 相关库
 from gohumanloop.adapters.langgraph_adapter import HumanloopAdapter
 from gohumanloop.core.interface import HumanLoopStatus
-from gohumanloop import DefaultHumanLoopManager, APIProvider
+from gohumanloop import DefaultHumanLoopManager
 from gohumanloop.utils import get_secret_from_env
 
+from ghl_http import PooledAPIProvider
+from message_log import MessageLog, append_messages
+from parallel_steps import JoinPolicy, ParallelHumanSteps, merge_steps
+
 import logging
 
 logging.basicConfig(level=logging.INFO)
@@ -41,12 +45,15 @@ os.environ["GOHUMANLOOP_API_KEY"] = "46cf87c5-9d08-4027-b72a-f0a91f27298a"
 
 # 定义简单状态类型
 class SimpleState(TypedDict):
-    messages: List[Dict[str, str]]
+    messages: Annotated[MessageLog, append_messages]
+    human_steps: Annotated[Dict[str, Any], merge_steps]
 
 
 # 创建 GoHumanLoopManager 实例
+# 发起请求和轮询状态复用进程内共享的 HTTP 连接池（keep-alive，GOHUMANLOOP_HTTP2=on 时使用 HTTP/2），
+# 不再每次调用都与飞书网关重新建立连接
 manager = DefaultHumanLoopManager(
-    APIProvider(
+    PooledAPIProvider(
         name="ApiProvider",
         api_base_url="http://127.0.0.1:9800/api", # 换成自己飞书应用的URL
         api_key=get_secret_from_env("GOHUMANLOOP_API_KEY"),
@@ -58,24 +65,24 @@ adapter = HumanloopAdapter(
     manager=manager,
     default_timeout=300,  # 默认超时时间为5分钟
 )
+# 获取信息和审批互不依赖，同时发出；审批被拒绝时取消仍在等待的信息请求
+steps = ParallelHumanSteps(manager, policy=JoinPolicy.FAIL_FAST)
 
 # 定义需要人工审批的节点
 @adapter.require_info(
     task_id="simple-information-test",
     additional="这是一个简单的获取信息的示例。",
+    callback=steps.track,
 )
-def get_information_node(state: SimpleState, info_result={}) -> SimpleState:
+def get_information_node(state: SimpleState, info_result={}) -> Dict[str, Any]:
     """获取信息的节点"""
     print("获取人工信息...")
     print(f"info_result: {info_result}")
 
-    
-    state["messages"].append({
+    return {"messages": [{
         "role": "system",
         "content": f"已获取信息: {info_result.get('response')}"
-    })
-    
-    return state
+    }]}
 
 
 # 定义需要人工审批的节点
@@ -83,39 +90,40 @@ def get_information_node(state: SimpleState, info_result={}) -> SimpleState:
     task_id="simple-approval-test",
     additional="这是一个简单的审批示例。",
     execute_on_reject=True,
+    callback=steps.track,
 )
-def human_approval_node(state: SimpleState, approval_result=None) -> SimpleState:
+def human_approval_node(state: SimpleState, approval_result=None) -> Dict[str, Any]:
     """需要人工审批的节点"""
     print("人工审批完成中...")
 
     print(f"approval_result: {approval_result}")
     # 处理审批结果
+    messages = []
     if approval_result:
         status = approval_result.get("status")
         response = approval_result.get("response", {})
 
         if status == HumanLoopStatus.APPROVED:
-            state["messages"].append(
+            messages.append(
                 {
                     "role": "human",
                     "content": f"审批已通过！理由: {response}",
                 }
             )
         elif status == HumanLoopStatus.REJECTED:
-            state["messages"].append(
+            messages.append(
                 {
                     "role": "human",
                     "content": f"审批被拒绝。理由: {response}",
                 }
             )
 
-    return state
+    return {"messages": messages}
 
 
-def final_node(state: SimpleState) -> SimpleState:
+def final_node(state: SimpleState) -> Dict[str, Any]:
     """最终节点"""
-    state["messages"].append({"role": "system", "content": "工作流程已完成！"})
-    return state
+    return {"messages": [{"role": "system", "content": "工作流程已完成！"}]}
 
 
 # 构建工作流图
@@ -124,17 +132,19 @@ def build_simple_graph():
     graph = StateGraph(SimpleState)
 
     # 添加节点
-    graph.add_node("get_info", get_information_node)
-    graph.add_node("human_approval", human_approval_node)
     graph.add_node("final", final_node)
 
-    # 设置边
-    graph.add_edge("get_info", "human_approval")
-    graph.add_edge("human_approval", "final")
+    # 两个人工步骤从 human_steps 分叉并行执行，都答复（或审批被拒绝）后汇合到 final
+    steps.add_to_graph(
+        graph,
+        "human_steps",
+        {"get_info": get_information_node, "human_approval": human_approval_node},
+        then="final",
+    )
     graph.add_edge("final", END)
 
     # 设置入口
-    graph.set_entry_point("get_info")
+    graph.set_entry_point("human_steps")
 
     return graph.compile()
 
@@ -149,6 +159,7 @@ def run_simple_workflow():
         # 初始化状态
         initial_state = SimpleState(
             messages=[{"role": "system", "content": "开始简单工作流..."}],
+            human_steps={},
         )
 
         # 运行工作流
@@ -0,0 +1,179 @@
+# /// script
+# requires-python = ">=3.10"
+# dependencies = [
+# "langgraph>=0.4.7"]
+# ///
+"""
+消息历史状态的性能对比
+
+模拟 agent → human_review 的长审核循环，对比两种消息状态写法：
+- copy:   `messages: List[Any]`，节点返回 `messages + [x]`，每一步复制整个历史
+- append: `messages: Annotated[MessageLog, append_messages]`，节点只返回新增消息
+
+默认只测量状态更新本身：每个报告点输出该段的平均单步耗时，
+以及用 tracemalloc 统计的单步内存分配。--graph 时再运行完整的 LangGraph 工作流
+（不调用 LLM 和人工），此时单步耗时主要是框架自身的调度开销。
+
+示例：
+    uv run langgraph_message_benchmark.py --turns 20000 --every 5000
+    uv run langgraph_message_benchmark.py --turns 3000 --every 1000 --graph
+"""
+
+import argparse
+import time
+import tracemalloc
+from typing import Annotated, Any, Dict, List
+
+from langchain_core.messages import AIMessage, HumanMessage
+from langgraph.graph import END, StateGraph
+from typing_extensions import TypedDict
+
+from message_log import MessageLog, append_messages
+
+
+class CopyState(TypedDict):
+    messages: List[Any]
+    turns: int
+
+
+class AppendState(TypedDict):
+    messages: Annotated[MessageLog, append_messages]
+    turns: int
+
+
+def build_copy_graph(turns: int) -> Any:
+    def agent(state: CopyState) -> Dict[str, Any]:
+        response = AIMessage(content=f"draft {state['turns']}")
+        return {"messages": state["messages"] + [response]}
+
+    def human_review(state: CopyState) -> Dict[str, Any]:
+        review = HumanMessage(content=f"[审核拒绝] {state['turns']}")
+        return {"messages": state["messages"] + [review], "turns": state["turns"] + 1}
+
+    return _compile(CopyState, agent, human_review, turns)
+
+
+def build_append_graph(turns: int) -> Any:
+    def agent(state: AppendState) -> Dict[str, Any]:
+        return {"messages": [AIMessage(content=f"draft {state['turns']}")]}
+
+    def human_review(state: AppendState) -> Dict[str, Any]:
+        review = HumanMessage(content=f"[审核拒绝] {state['turns']}")
+        return {"messages": [review], "turns": state["turns"] + 1}
+
+    return _compile(AppendState, agent, human_review, turns)
+
+
+def _compile(state_type: Any, agent: Any, human_review: Any, turns: int) -> Any:
+    workflow = StateGraph(state_type)
+    workflow.add_node("agent", agent)
+    workflow.add_node("human_review", human_review)
+    workflow.set_entry_point("agent")
+    workflow.add_edge("agent", "human_review")
+    workflow.add_conditional_edges(
+        "human_review",
+        lambda state: END if state["turns"] >= turns else "agent",
+        {"agent": "agent", END: END},
+    )
+    return workflow.compile()
+
+
+def measure_state(name: str, turns: int, every: int) -> List[Dict[str, Any]]:
+    """Apply node updates the way LangGraph's channels do, without the graph."""
+    rows = []
+    if name == "copy":
+        update = lambda messages, new: messages + [new]  # noqa: E731
+        messages: Any = [HumanMessage(content="开始")]
+    else:
+        update = lambda messages, new: append_messages(messages, [new])  # noqa: E731
+        messages = MessageLog([HumanMessage(content="开始")])
+
+    pending = [AIMessage(content=f"draft {i}") for i in range(turns * 2)]
+    start = last = time.perf_counter()
+    for step in range(1, turns * 2 + 1):
+        if step % (every * 2):
+            messages = update(messages, pending[step - 1])
+            continue
+        now = time.perf_counter()
+        # 报告点的这一步单独统计内存分配，不计入耗时，避免 tracemalloc 影响计时
+        tracemalloc.start()
+        before, _ = tracemalloc.get_traced_memory()
+        messages = update(messages, pending[step - 1])
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        rows.append(
+            {
+                "mode": name,
+                "turns": step // 2,
+                "messages": len(messages),
+                "step_us": round((now - last) * 1e6 / (every * 2 - 1), 2),
+                "alloc_kb": round((peak - before) / 1024, 2),
+            }
+        )
+        last = time.perf_counter()
+    rows.append({"mode": name, "total_s": round(time.perf_counter() - start, 3)})
+    return rows
+
+
+def measure_graph(name: str, graph: Any, turns: int, every: int) -> List[Dict[str, Any]]:
+    """Run the full review loop and time each window of steps."""
+    rows = []
+    initial = {"messages": [HumanMessage(content="开始")], "turns": 0}
+    start = last = time.perf_counter()
+    last_turn = 0
+    for state in graph.stream(
+        initial, {"recursion_limit": turns * 2 + 10}, stream_mode="values"
+    ):
+        turn = state["turns"]
+        if turn == last_turn or turn % every:
+            continue
+        now = time.perf_counter()
+        rows.append(
+            {
+                "mode": name,
+                "turns": turn,
+                "messages": len(state["messages"]),
+                # 每轮包含 agent 和 human_review 两步
+                "step_us": round((now - last) * 1e6 / ((turn - last_turn) * 2), 2),
+            }
+        )
+        last, last_turn = now, turn
+    rows.append({"mode": name, "total_s": round(time.perf_counter() - start, 3)})
+    return rows
+
+
+def print_rows(rows: List[Dict[str, Any]]) -> None:
+    for row in rows:
+        if "total_s" in row:
+            print(f"{row['mode']:>6}  total {row['total_s']}s\n")
+            continue
+        line = (
+            f"{row['mode']:>6}  turns={row['turns']:>6}  "
+            f"messages={row['messages']:>6}  step={row['step_us']:>9} us"
+        )
+        if "alloc_kb" in row:
+            line += f"  alloc/step={row['alloc_kb']:>8} KB"
+        print(line)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Compare message state strategies")
+    parser.add_argument("--turns", type=int, default=5000, help="Review rounds to run")
+    parser.add_argument("--every", type=int, default=1000, help="Report interval in rounds")
+    parser.add_argument(
+        "--graph", action="store_true", help="Also run the full LangGraph review loop"
+    )
+    args = parser.parse_args()
+
+    print("== 状态更新（reducer / 列表复制） ==")
+    for name in ("copy", "append"):
+        print_rows(measure_state(name, args.turns, args.every))
+
+    if args.graph:
+        print("== 完整工作流 ==")
+        for name, build in [("copy", build_copy_graph), ("append", build_append_graph)]:
+            print_rows(measure_graph(name, build(args.turns), args.turns, args.every))
+
+
+if __name__ == "__main__":
+    main()
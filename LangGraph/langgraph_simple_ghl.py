@@ -7,6 +7,7 @@ LangGraph 与 GoHumanLoop 简单集成示例
 配置：
 - API 地址: http://localhost:8000/api
 - API KEY: gohumanloop
+- 推送模式: GOHUMANLOOP_DELIVERY=push（可配合本地替身服务 ghl_local_api.py 离线测试）
 """
 
 import os
@@ -18,10 +19,11 @@ from dotenv import load_dotenv
 from langgraph.graph import StateGraph, END
 
 # 导入 GoHumanLoop 相关库
-from gohumanloop.manager.ghl_manager import GoHumanLoopManager
 from gohumanloop.adapters.langgraph_adapter import HumanloopAdapter
 from gohumanloop.core.interface import HumanLoopStatus
 
+from ghl_push import create_manager
+
 import logging
 
 logging.basicConfig(level=logging.INFO)
@@ -38,7 +40,8 @@ class SimpleState(TypedDict):
 
 
 # 创建 GoHumanLoopManager 实例
-manager = GoHumanLoopManager()
+# GOHUMANLOOP_DELIVERY=push 时使用 Webhook 推送模式，见 ghl_push.py
+manager = create_manager()
 
 # 创建 LangGraphAdapter 实例
 adapter = HumanloopAdapter(
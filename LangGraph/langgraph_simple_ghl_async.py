@@ -7,6 +7,7 @@ LangGraph 与 GoHumanLoop 简单集成示例
 配置：
 - API 地址: http://localhost:8000/api
 - API KEY: gohumanloop
+- 推送模式: GOHUMANLOOP_DELIVERY=push（可配合本地替身服务 ghl_local_api.py 离线测试）
 """
 
 import os
@@ -18,13 +19,14 @@ from dotenv import load_dotenv
 from langgraph.graph import StateGraph, END
 
 # 导入 GoHumanLoop 相关库
-from gohumanloop.manager.ghl_manager import GoHumanLoopManager
 from gohumanloop.adapters.langgraph_adapter import HumanloopAdapter
 from gohumanloop.core.interface import HumanLoopStatus
 
-# 设置环境变量
-os.environ["GOHUMANLOOP_API_KEY"] = "gohumanloop"
-os.environ["GOHUMANLOOP_API_BASE_URL"] = "http://localhost:8000/api"
+from ghl_push import create_manager
+
+# 设置环境变量（已设置时保留，便于在工作流服务中指向其他地址）
+os.environ.setdefault("GOHUMANLOOP_API_KEY", "gohumanloop")
+os.environ.setdefault("GOHUMANLOOP_API_BASE_URL", "http://localhost:8000/api")
 
 
 # 定义简单状态类型
@@ -34,7 +36,8 @@ class SimpleState(TypedDict):
 
 
 # 创建 GoHumanLoopManager 实例
-manager = GoHumanLoopManager(request_timeout=30, poll_interval=5, auto_start_sync=True)
+# GOHUMANLOOP_DELIVERY=push 时使用 Webhook 推送模式，见 ghl_push.py
+manager = create_manager(request_timeout=30, poll_interval=5, auto_start_sync=True)
 
 # 创建 LangGraphAdapter 实例
 adapter = HumanloopAdapter(
@@ -49,7 +52,7 @@ adapter = HumanloopAdapter(
     additional="这是一个简单的审批示例。",
     execute_on_reject=True,
 )
-def human_approval_node(state: SimpleState, approval_result=None) -> SimpleState:
+async def human_approval_node(state: SimpleState, approval_result=None) -> SimpleState:
     """需要人工审批的节点"""
     print("等待人工审批中...")
 
@@ -76,7 +79,7 @@ def human_approval_node(state: SimpleState, approval_result=None) -> SimpleState
     return state
 
 
-def final_node(state: SimpleState) -> SimpleState:
+async def final_node(state: SimpleState) -> SimpleState:
     """最终节点"""
     state["messages"].append({"role": "system", "content": "工作流程已完成！"})
     return state
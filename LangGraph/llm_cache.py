@@ -0,0 +1,259 @@
+"""
+持久化的 LLM 响应缓存
+
+审核 / 重新生成循环中，审核人给出相同的反馈或者工作流重启时，
+完全相同的提示会再次发送给模型，既增加等待时间也消耗 token。
+
+SqliteLLMCache 实现 LangChain 的 BaseCache 接口，通过 `ChatOpenAI(cache=...)` 接入：
+- 缓存键为模型参数（llm_string，包含模型名、温度等）与完整消息列表的哈希，
+  反馈会作为消息的一部分参与计算
+- 保存在本地 SQLite 文件中，进程重启后仍然有效
+- 支持过期时间（TTL），超过 max_entries 时淘汰最久未使用的条目
+- 统计命中、未命中、写入、过期和淘汰次数
+
+LangChain 的 astream() 不查询缓存。需要流式输出时使用 astream_cached()：
+命中时把缓存的回复作为一个分块返回，未命中时照常流式生成，完整结束后写回缓存
+（中途被关闭的流不写入）。
+
+示例：
+    llm = ChatOpenAI(model="deepseek-chat", base_url=api_base, cache=create_llm_cache())
+    async for text in astream_cached(llm, messages): ...
+"""
+
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from typing import Any, AsyncIterator, Dict, List, Optional, Sequence
+
+from langchain_core.caches import RETURN_VAL_TYPE, BaseCache
+from langchain_core.language_models import BaseChatModel
+from langchain_core.load import dumps
+from langchain_core.messages import (
+    BaseMessage,
+    message_chunk_to_message,
+    message_to_dict,
+    messages_from_dict,
+)
+from langchain_core.outputs import ChatGeneration, Generation
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS llm_cache (
+    key TEXT PRIMARY KEY,
+    llm_string TEXT NOT NULL,
+    generations TEXT NOT NULL,
+    created_at REAL NOT NULL,
+    accessed_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS llm_cache_accessed_at ON llm_cache (accessed_at);
+"""
+
+
+def _dump_generations(generations: Sequence[Generation]) -> str:
+    # 只保存消息和生成信息，读取时不需要反序列化任意对象
+    return json.dumps(
+        [
+            {
+                "text": generation.text,
+                "generation_info": generation.generation_info,
+                "message": (
+                    message_to_dict(generation.message)
+                    if isinstance(generation, ChatGeneration)
+                    else None
+                ),
+            }
+            for generation in generations
+        ],
+        ensure_ascii=False,
+    )
+
+
+def _load_generations(data: str) -> List[Generation]:
+    generations: List[Generation] = []
+    for item in json.loads(data):
+        if item["message"] is not None:
+            generations.append(
+                ChatGeneration(
+                    message=messages_from_dict([item["message"]])[0],
+                    generation_info=item["generation_info"],
+                )
+            )
+        else:
+            generations.append(
+                Generation(text=item["text"], generation_info=item["generation_info"])
+            )
+    return generations
+
+
+class SqliteLLMCache(BaseCache):
+    """On-disk LLM response cache with TTL and LRU eviction.
+
+    Args:
+        path: SQLite database file, ":memory:" for a throwaway cache
+        ttl: Seconds an entry stays valid, None never expires
+        max_entries: Maximum number of entries kept, least recently used ones are evicted
+    """
+
+    def __init__(
+        self,
+        path: str = "llm_cache.db",
+        ttl: Optional[float] = None,
+        max_entries: int = 10000,
+    ):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.conn = sqlite3.connect(path, check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.executescript(_SCHEMA)
+        self.lock = threading.Lock()
+        self._entries = self.conn.execute("SELECT COUNT(*) FROM llm_cache").fetchone()[0]
+
+        self.hits = 0
+        self.misses = 0
+        self.writes = 0
+        self.expirations = 0
+        self.evictions = 0
+
+    @staticmethod
+    def _key(prompt: str, llm_string: str) -> str:
+        return hashlib.sha256(f"{llm_string}\x00{prompt}".encode("utf-8")).hexdigest()
+
+    def lookup(self, prompt: str, llm_string: str) -> Optional[RETURN_VAL_TYPE]:
+        key = self._key(prompt, llm_string)
+        now = time.time()
+        with self.lock, self.conn:
+            row = self.conn.execute(
+                "SELECT generations, created_at FROM llm_cache WHERE key = ?", (key,)
+            ).fetchone()
+            if row is not None and self.ttl is not None and now - row[1] > self.ttl:
+                self.conn.execute("DELETE FROM llm_cache WHERE key = ?", (key,))
+                self._entries -= 1
+                self.expirations += 1
+                row = None
+            if row is None:
+                self.misses += 1
+                return None
+            self.conn.execute(
+                "UPDATE llm_cache SET accessed_at = ? WHERE key = ?", (now, key)
+            )
+            self.hits += 1
+        return _load_generations(row[0])
+
+    def update(self, prompt: str, llm_string: str, return_val: RETURN_VAL_TYPE) -> None:
+        key = self._key(prompt, llm_string)
+        data = _dump_generations(return_val)
+        now = time.time()
+        with self.lock, self.conn:
+            exists = self.conn.execute(
+                "SELECT 1 FROM llm_cache WHERE key = ?", (key,)
+            ).fetchone()
+            self.conn.execute(
+                "INSERT OR REPLACE INTO llm_cache VALUES (?, ?, ?, ?, ?)",
+                (key, llm_string, data, now, now),
+            )
+            self.writes += 1
+            if not exists:
+                self._entries += 1
+            self._evict()
+
+    def _evict(self) -> None:
+        if self._entries <= self.max_entries:
+            return
+        if self.ttl is not None:
+            # 先清理已过期的条目
+            expired = self.conn.execute(
+                "DELETE FROM llm_cache WHERE created_at < ?", (time.time() - self.ttl,)
+            ).rowcount
+            self._entries -= expired
+            self.expirations += expired
+        overflow = self._entries - self.max_entries
+        if overflow > 0:
+            evicted = self.conn.execute(
+                "DELETE FROM llm_cache WHERE key IN "
+                "(SELECT key FROM llm_cache ORDER BY accessed_at LIMIT ?)",
+                (overflow,),
+            ).rowcount
+            self._entries -= evicted
+            self.evictions += evicted
+
+    def clear(self, **kwargs: Any) -> None:
+        with self.lock, self.conn:
+            self.conn.execute("DELETE FROM llm_cache")
+            self._entries = 0
+
+    def close(self) -> None:
+        with self.lock:
+            self.conn.close()
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.misses
+        return {
+            "entries": self._entries,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+            "writes": self.writes,
+            "expirations": self.expirations,
+            "evictions": self.evictions,
+        }
+
+
+def create_llm_cache() -> Optional[SqliteLLMCache]:
+    """Create the cache configured by LLM_CACHE_* environment variables,
+    None when LLM_CACHE=off."""
+    if os.environ.get("LLM_CACHE", "on").lower() in ("off", "false", "0"):
+        return None
+    ttl = float(os.environ.get("LLM_CACHE_TTL", "86400"))
+    return SqliteLLMCache(
+        path=os.environ.get("LLM_CACHE_PATH", "llm_cache.db"),
+        ttl=ttl if ttl > 0 else None,
+        max_entries=int(os.environ.get("LLM_CACHE_MAX_ENTRIES", "10000")),
+    )
+
+
+async def astream_cached(
+    llm: BaseChatModel, messages: Sequence[BaseMessage]
+) -> AsyncIterator[str]:
+    """Stream the text of llm's reply to messages through llm.cache.
+
+    Uses the same cache key as llm.ainvoke(messages), so streamed and
+    non-streamed calls share entries. Without a cache it is plain astream().
+    """
+    cache = llm.cache if isinstance(llm.cache, BaseCache) else None
+    if cache is None:
+        async for chunk in llm.astream(messages):
+            yield chunk.content
+        return
+
+    # 与 BaseChatModel._agenerate_with_cache 的键相同：去掉消息 id 后序列化
+    llm_string = llm._get_llm_string()
+    prompt = dumps(
+        [
+            msg.model_copy(update={"id": None}) if msg.id is not None else msg
+            for msg in messages
+        ]
+    )
+    cached = await cache.alookup(prompt, llm_string)
+    if cached:
+        generation = cached[0]
+        yield (
+            generation.message.content
+            if isinstance(generation, ChatGeneration)
+            else generation.text
+        )
+        return
+
+    message = None
+    async for chunk in llm.astream(messages):
+        message = chunk if message is None else message + chunk
+        yield chunk.content
+    # 只有完整生成的回复才写入；审核人中断时生成器被关闭，不会执行到这里
+    if message is not None:
+        await cache.aupdate(
+            prompt,
+            llm_string,
+            [ChatGeneration(message=message_chunk_to_message(message))],
+        )
@@ -0,0 +1,139 @@
+"""
+只追加的消息历史通道
+
+示例工作流的节点过去每一步都返回 `{"messages": messages + [x]}` 或 `{**state, ...}`，
+整个历史在每一步都被复制一次。agent → human_review → agent 这样的长审核循环，
+总工作量和内存分配随轮数平方增长。
+
+MessageLog 是不可变的只追加序列，多个版本共享同一个底层列表（结构共享）：
+- 在最新版本上追加是原地扩展底层列表，均摊 O(1)，旧版本看到的内容不变
+- 在旧版本上追加（分叉）时才复制前缀
+
+在状态中声明为 `Annotated[MessageLog, append_messages]`，节点只返回新增的消息：
+
+    return {"messages": [response], "next": "human_review"}
+
+使用 checkpointer 时传入 `serde=MessageLogSerializer()`（CompactSqliteSaver 默认使用），
+MessageLog 以普通列表保存，读取时再包装回 MessageLog，不会触发 LangGraph
+对未注册类型的反序列化警告。
+"""
+
+import threading
+from typing import Any, Dict, Iterator, List, Optional, Sequence, Tuple, Union, overload
+
+from langgraph.checkpoint.serde.jsonplus import JsonPlusSerializer
+
+_lock = threading.Lock()
+
+
+class MessageLog(Sequence[Any]):
+    """Immutable append-only sequence that shares storage between versions."""
+
+    __slots__ = ("_items", "_len")
+
+    def __init__(self, items: Optional[Sequence[Any]] = None):
+        self._items: List[Any] = list(items) if items is not None else []
+        self._len = len(self._items)
+
+    @classmethod
+    def _view(cls, items: List[Any], length: int) -> "MessageLog":
+        log = cls.__new__(cls)
+        log._items = items
+        log._len = length
+        return log
+
+    def extend(self, messages: Sequence[Any]) -> "MessageLog":
+        """Return a new log with messages appended; self is unchanged."""
+        if not messages:
+            return self
+        if self._len == 0:
+            # 空日志（如通道的初始值）可能被多次运行共享，不在其上原地扩展
+            return MessageLog(messages)
+        with _lock:
+            if self._len == len(self._items):
+                # 最新版本：原地扩展共享列表
+                self._items.extend(messages)
+                return self._view(self._items, len(self._items))
+        # 旧版本（分叉）：复制前缀
+        items = self._items[: self._len]
+        items.extend(messages)
+        return self._view(items, len(items))
+
+    def __len__(self) -> int:
+        return self._len
+
+    @overload
+    def __getitem__(self, index: int) -> Any: ...
+
+    @overload
+    def __getitem__(self, index: slice) -> List[Any]: ...
+
+    def __getitem__(self, index: Union[int, slice]) -> Any:
+        if isinstance(index, slice):
+            return [self._items[i] for i in range(self._len)[index]]
+        if index < 0:
+            index += self._len
+        if not 0 <= index < self._len:
+            raise IndexError("MessageLog index out of range")
+        return self._items[index]
+
+    def __iter__(self) -> Iterator[Any]:
+        for i in range(self._len):
+            yield self._items[i]
+
+    def __eq__(self, other: object) -> bool:
+        if isinstance(other, (MessageLog, list, tuple)):
+            return len(self) == len(other) and all(a == b for a, b in zip(self, other))
+        return NotImplemented
+
+    def __repr__(self) -> str:
+        return repr(list(self))
+
+    def _asdict(self) -> Dict[str, Any]:
+        # 嵌套在其他值中的 MessageLog 由默认 serde 通过 _asdict() 序列化、
+        # MessageLog(**kwargs) 反序列化；通道值本身由 MessageLogSerializer 处理
+        return {"items": list(self)}
+
+
+class MessageLogSerializer(JsonPlusSerializer):
+    """JsonPlusSerializer that stores MessageLog channel values as plain lists
+    under their own type tag and wraps them back on load.
+
+    The tag is "messagelog:<inner type>", keeping the type the list was encoded
+    with (msgpack, or pickle with pickle_fallback=True). Accepts the same
+    arguments as JsonPlusSerializer.
+    """
+
+    TYPE = "messagelog"
+
+    def dumps_typed(self, obj: Any) -> Tuple[str, bytes]:
+        if isinstance(obj, MessageLog):
+            inner, data = super().dumps_typed(list(obj))
+            return f"{self.TYPE}:{inner}", data
+        return super().dumps_typed(obj)
+
+    def loads_typed(self, data: Tuple[str, bytes]) -> Any:
+        type_, payload = data
+        tag, _, inner = type_.partition(":")
+        if tag == self.TYPE:
+            # 不带内层类型的旧标签按 msgpack 解码
+            return MessageLog(super().loads_typed((inner or "msgpack", payload)))
+        return super().loads_typed(data)
+
+
+def append_messages(
+    left: Optional[Sequence[Any]], right: Union[Sequence[Any], Any]
+) -> MessageLog:
+    """Reducer that appends new messages to the log.
+
+    `right` may be a single message or a list of messages.
+    """
+    if left is None:
+        left = MessageLog()
+    elif not isinstance(left, MessageLog):
+        left = MessageLog(left)
+    if isinstance(right, MessageLog):
+        right = list(right)
+    elif not isinstance(right, (list, tuple)):
+        right = [right]
+    return left.extend(right)
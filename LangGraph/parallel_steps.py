@@ -0,0 +1,344 @@
+"""
+并行的人工步骤
+
+飞书 / 企业微信示例中，get_info（require_info）和 human_approval（require_approval）
+依次执行，工作流的总耗时是两次人工响应时间之和。两个步骤互不依赖时，
+可以同时发出请求，两份答复都到达后再汇合继续。
+
+ParallelHumanSteps 把一组独立的人工步骤加入图中：
+- 分叉节点开启新的一轮，各步骤节点在同一个 superstep 中并行执行，汇合节点等待全部完成
+- 汇合策略 JoinPolicy：
+  - ALL: 等待所有步骤答复
+  - FAIL_FAST: 任一步骤被拒绝、超时或出错时，立即取消其他仍在等待的请求，
+    不再等待其余审批人
+- 步骤被拒绝（未设置 execute_on_reject）或被取消时不抛出异常，结果记录在状态中，
+  由汇合节点决定后续走向（then / on_reject）
+- 步骤抛出其他异常时整个图中止，汇合节点不会执行：该步骤释放本轮的记录，
+  并取消其他步骤仍在等待的请求
+
+在状态中声明 `human_steps: Annotated[Dict[str, Any], merge_steps]`，步骤节点返回
+只包含新增内容的更新（如 `{"messages": [...]}`，messages 使用 append_messages），
+并在 require_* 装饰器中传入 `callback=steps.track`：
+
+    steps = ParallelHumanSteps(manager, policy=JoinPolicy.FAIL_FAST)
+
+    @adapter.require_approval(task_id="...", callback=steps.track)
+    def human_approval_node(state, approval_result=None): ...
+
+    steps.add_to_graph(
+        graph, "human_steps",
+        {"get_info": get_information_node, "human_approval": human_approval_node},
+        then="final",
+    )
+    graph.set_entry_point("human_steps")
+"""
+
+import asyncio
+import contextvars
+import functools
+import logging
+import threading
+import uuid
+from dataclasses import dataclass, field
+from enum import Enum
+from inspect import iscoroutinefunction
+from typing import Any, Callable, Dict, List, Optional, Set, Tuple
+
+from langgraph.graph import StateGraph
+
+from gohumanloop.core.interface import (
+    HumanLoopCallback,
+    HumanLoopManager,
+    HumanLoopProvider,
+    HumanLoopRequest,
+    HumanLoopResult,
+    HumanLoopStatus,
+)
+from gohumanloop.utils import run_async_safely
+
+logger = logging.getLogger(__name__)
+
+# 视为失败的最终状态；CANCELLED 是本模块取消的兄弟步骤，不算作失败来源
+_FAILED = {HumanLoopStatus.REJECTED, HumanLoopStatus.EXPIRED, HumanLoopStatus.ERROR}
+
+# 当前执行的步骤：(轮次 id, 步骤名)，由步骤节点设置，track 回调读取
+_current_step: contextvars.ContextVar[Optional[Tuple[str, str]]] = contextvars.ContextVar(
+    "human_step", default=None
+)
+
+
+class JoinPolicy(str, Enum):
+    ALL = "all"
+    FAIL_FAST = "fail_fast"
+
+
+def merge_steps(current: Optional[Dict[str, Any]], update: Dict[str, Any]) -> Dict[str, Any]:
+    """Reducer for the human_steps state key.
+
+    An update carrying a new round id starts over; otherwise step results are
+    merged and other fields are overwritten.
+    """
+    current = current or {}
+    if "round" in update and update["round"] != current.get("round"):
+        return dict(update)
+    merged = {**current, **update}
+    if "results" in update:
+        merged["results"] = {**current.get("results", {}), **update["results"]}
+    return merged
+
+
+@dataclass
+class _Round:
+    # 步骤名 -> (conversation_id, request_id)，请求发出后登记，用于取消
+    requests: Dict[str, Tuple[str, str]] = field(default_factory=dict)
+    # 步骤名 -> 最终状态
+    statuses: Dict[str, HumanLoopStatus] = field(default_factory=dict)
+    # 触发 FAIL_FAST 的步骤
+    failed_by: Optional[str] = None
+
+
+class _StepTracker(HumanLoopCallback):
+    """Records a step's request and outcome, and fails the round fast."""
+
+    def __init__(self, steps: "ParallelHumanSteps", round_id: str, name: str):
+        self.steps = steps
+        self.round_id = round_id
+        self.name = name
+
+    async def async_on_humanloop_request(
+        self, provider: HumanLoopProvider, request: HumanLoopRequest
+    ) -> None:
+        await self.steps._on_request(
+            self.round_id, self.name, request.conversation_id, request.request_id
+        )
+
+    async def async_on_humanloop_update(
+        self, provider: HumanLoopProvider, result: HumanLoopResult
+    ) -> None:
+        await self.steps._on_result(self.round_id, self.name, result.status)
+
+    async def async_on_humanloop_timeout(
+        self, provider: HumanLoopProvider, result: HumanLoopResult
+    ) -> None:
+        pass
+
+    async def async_on_humanloop_error(
+        self, provider: HumanLoopProvider, error: Exception
+    ) -> None:
+        await self.steps._on_result(self.round_id, self.name, HumanLoopStatus.ERROR)
+
+
+class ParallelHumanSteps:
+    """Runs independent human steps of a graph in parallel and joins them.
+
+    Args:
+        manager: Manager the steps' adapter sends requests through, used to
+            cancel the remaining requests under FAIL_FAST
+        policy: How the join waits for the steps
+        key: State key holding the round and step results
+    """
+
+    def __init__(
+        self,
+        manager: HumanLoopManager,
+        policy: JoinPolicy = JoinPolicy.FAIL_FAST,
+        key: str = "human_steps",
+    ):
+        self.manager = manager
+        self.policy = JoinPolicy(policy)
+        self.key = key
+        self._lock = threading.Lock()
+        self._rounds: Dict[str, _Round] = {}
+        # conversation_id -> 已登记的 request_id
+        self._claimed: Dict[str, Set[str]] = {}
+
+    def track(self, state: Any) -> Optional[HumanLoopCallback]:
+        """Callback factory for require_* decorators on the steps."""
+        current = _current_step.get()
+        if current is None:
+            # 步骤节点之外调用（如顺序执行的图），不跟踪
+            return None
+        return _StepTracker(self, *current)
+
+    async def _on_request(
+        self, round_id: str, name: str, conversation_id: str, request_id: Optional[str]
+    ) -> None:
+        if request_id is None:
+            # 管理器传给回调的请求对象不带 request_id，取该对话中最新的、
+            # 尚未被其他步骤登记的请求（同一装饰器的对话可能被多个工作流共用）
+            request_ids = await self.manager.async_get_conversation_requests(
+                conversation_id
+            )
+            with self._lock:
+                claimed = self._claimed.get(conversation_id, set())
+                request_id = next(
+                    (r for r in reversed(request_ids) if r not in claimed), None
+                )
+            if request_id is None:
+                return
+        with self._lock:
+            self._claimed.setdefault(conversation_id, set()).add(request_id)
+            state = self._rounds.setdefault(round_id, _Round())
+            state.requests[name] = (conversation_id, request_id)
+            failed = state.failed_by is not None
+        if failed:
+            # 请求发出前本轮已失败，直接取消
+            await self._cancel(conversation_id, request_id)
+
+    async def _on_result(self, round_id: str, name: str, status: HumanLoopStatus) -> None:
+        with self._lock:
+            state = self._rounds.get(round_id)
+            if state is None:
+                # 本轮已释放（图已中止），如被取消的兄弟步骤
+                return
+            state.statuses[name] = status
+            if (
+                self.policy != JoinPolicy.FAIL_FAST
+                or status not in _FAILED
+                or state.failed_by is not None
+            ):
+                return
+            state.failed_by = name
+            pending = [
+                ids
+                for step, ids in state.requests.items()
+                if step != name and step not in state.statuses
+            ]
+        logger.info(f"Step {name} {status.value}, cancelling {len(pending)} pending step(s)")
+        await asyncio.gather(*(self._cancel(*ids) for ids in pending))
+
+    async def _cancel(self, conversation_id: str, request_id: str) -> None:
+        try:
+            await self.manager.async_cancel_request(conversation_id, request_id)
+        except Exception as e:
+            logger.warning(f"Failed to cancel {request_id}: {e}")
+
+    def _release(self, round_id: str) -> List[Tuple[str, str]]:
+        """Forget a round; return the requests of its steps without an outcome."""
+        with self._lock:
+            state = self._rounds.pop(round_id, None)
+            if state is None:
+                return []
+            for conversation_id, request_id in state.requests.values():
+                claimed = self._claimed.get(conversation_id)
+                if claimed is not None:
+                    claimed.discard(request_id)
+                    if not claimed:
+                        del self._claimed[conversation_id]
+            return [
+                ids for step, ids in state.requests.items() if step not in state.statuses
+            ]
+
+    async def _abort(self, round_id: str) -> None:
+        pending = self._release(round_id)
+        if pending:
+            logger.info(f"Round aborted, cancelling {len(pending)} pending step(s)")
+        await asyncio.gather(*(self._cancel(*ids) for ids in pending))
+
+    def _outcome(self, round_id: str, name: str) -> Tuple[HumanLoopStatus, Optional[str]]:
+        with self._lock:
+            state = self._rounds.get(round_id, _Round())
+            status = state.statuses.get(name)
+            if state.failed_by not in (None, name) and status in (
+                None,
+                HumanLoopStatus.CANCELLED,
+            ):
+                return HumanLoopStatus.CANCELLED, state.failed_by
+            return status or HumanLoopStatus.COMPLETED, state.failed_by
+
+    def _step(self, name: str, node: Callable[..., Any]) -> Callable[..., Any]:
+        """Wrap a step node: bind it to the round, record its result and turn
+        rejections and cancellations into state instead of errors."""
+
+        def finish(round_id: str, update: Any, error: Optional[Exception]) -> Dict[str, Any]:
+            status, failed_by = self._outcome(round_id, name)
+            if error is not None and status not in _FAILED | {HumanLoopStatus.CANCELLED}:
+                raise error
+            result = dict(update) if isinstance(update, dict) else {}
+            result[self.key] = {"results": {name: status.value}}
+            if failed_by is not None:
+                result[self.key]["failed_by"] = failed_by
+            return result
+
+        if iscoroutinefunction(node):
+
+            @functools.wraps(node)
+            async def async_step(state: Any) -> Dict[str, Any]:
+                round_id = state[self.key]["round"]
+                token = _current_step.set((round_id, name))
+                try:
+                    try:
+                        update, error = await node(state), None
+                    except ValueError as e:
+                        update, error = None, e
+                    finally:
+                        _current_step.reset(token)
+                    return finish(round_id, update, error)
+                except BaseException:
+                    # 图将中止（包括本步骤因兄弟步骤出错被取消），汇合节点不会执行
+                    await self._abort(round_id)
+                    raise
+
+            return async_step
+
+        @functools.wraps(node)
+        def step(state: Any) -> Dict[str, Any]:
+            round_id = state[self.key]["round"]
+            token = _current_step.set((round_id, name))
+            try:
+                try:
+                    update, error = node(state), None
+                except ValueError as e:
+                    # require_* 在拒绝（未设置 execute_on_reject）、取消、超时时抛出 ValueError
+                    update, error = None, e
+                finally:
+                    _current_step.reset(token)
+                return finish(round_id, update, error)
+            except BaseException:
+                run_async_safely(self._abort(round_id))
+                raise
+
+        return step
+
+    def _fork(self, state: Any) -> Dict[str, Any]:
+        round_id = uuid.uuid4().hex
+        with self._lock:
+            self._rounds[round_id] = _Round()
+        return {self.key: {"round": round_id, "results": {}}}
+
+    def _join(self, state: Any) -> Dict[str, Any]:
+        steps = state[self.key]
+        self._release(steps["round"])
+        failed = any(
+            HumanLoopStatus(status) in _FAILED for status in steps["results"].values()
+        )
+        return {self.key: {"outcome": "rejected" if failed else "approved"}}
+
+    def add_to_graph(
+        self,
+        graph: StateGraph,
+        name: str,
+        nodes: Dict[str, Callable[..., Any]],
+        then: str,
+        on_reject: Optional[str] = None,
+    ) -> None:
+        """Add the steps to graph as a fan-out from node `name` and a join.
+
+        Args:
+            graph: Graph under construction
+            name: Name of the fork node; the join is `{name}_join`
+            nodes: Step node name -> node function
+            then: Node to continue with once the steps are joined
+            on_reject: Node to continue with when a step failed, defaults to then
+        """
+        join = f"{name}_join"
+        graph.add_node(name, self._fork)
+        for node_name, node in nodes.items():
+            graph.add_node(node_name, self._step(node_name, node))
+            graph.add_edge(name, node_name)
+        graph.add_node(join, self._join)
+        graph.add_edge(list(nodes), join)
+        targets = {"approved": then, "rejected": on_reject or then}
+        graph.add_conditional_edges(
+            join, lambda state: state[self.key]["outcome"], targets
+        )
@@ -0,0 +1,182 @@
+# /// script
+# requires-python = ">=3.10"
+# dependencies = [
+# "gohumanloop>=0.0.12",
+# "langgraph>=0.4.7",
+# "aiohttp>=3.9.0"]
+# ///
+"""
+并行人工步骤的工作流耗时对比
+
+与飞书 / 企业微信示例相同的工作流：get_info（require_info）、human_approval
+（require_approval）、final。人工步骤发往本地 GoHumanLoop API 替身服务
+（ghl_local_api.py），模拟审批人在 --info-time / --approval-time 秒后答复，
+--reject 时审批被拒绝。比较：
+- sequential: get_info → human_approval → final
+- parallel:   两个人工步骤同时发出，JoinPolicy.ALL 汇合
+- fail_fast:  同上，JoinPolicy.FAIL_FAST，审批被拒绝时立即取消仍在等待的信息请求
+
+同时运行 --workflows 个工作流，输出每个工作流的平均耗时和各步骤的最终状态。
+
+示例：
+    uv run parallel_steps_benchmark.py --workflows 5 --info-time 4 --approval-time 3
+    uv run parallel_steps_benchmark.py --reject --info-time 8 --approval-time 2
+"""
+
+import argparse
+import asyncio
+import json
+import logging
+import threading
+import time
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from typing import Annotated, Any, Dict
+
+from aiohttp import web
+from langgraph.graph import END, StateGraph
+from pydantic import SecretStr
+from typing_extensions import TypedDict
+
+from gohumanloop import APIProvider, DefaultHumanLoopManager
+from gohumanloop.adapters.langgraph_adapter import HumanloopAdapter
+
+from ghl_local_api import LocalHumanLoopAPI
+from message_log import MessageLog, append_messages
+from parallel_steps import JoinPolicy, ParallelHumanSteps, merge_steps
+
+
+class State(TypedDict):
+    messages: Annotated[MessageLog, append_messages]
+    human_steps: Annotated[Dict[str, Any], merge_steps]
+
+
+async def reviewer(api: LocalHumanLoopAPI, args: argparse.Namespace) -> None:
+    """Answer each request after the configured response time."""
+    seen = set()
+
+    async def answer(request_id: str, loop_type: str) -> None:
+        if loop_type == "approval":
+            await asyncio.sleep(args.approval_time)
+            status = "rejected" if args.reject else "approved"
+            await api.decide(request_id, status, {"reason": status})
+        else:
+            await asyncio.sleep(args.info_time)
+            await api.decide(request_id, "completed", "ok")
+
+    while True:
+        for request_id, record in list(api.requests.items()):
+            if request_id not in seen:
+                seen.add(request_id)
+                asyncio.create_task(answer(request_id, record["loop_type"]))
+        await asyncio.sleep(0.05)
+
+
+def start_api(args: argparse.Namespace) -> int:
+    """Run the API stand-in and the reviewer on a background loop, return the port."""
+    api = LocalHumanLoopAPI(delay=None)
+    loop = asyncio.new_event_loop()
+    threading.Thread(target=loop.run_forever, daemon=True).start()
+
+    async def start() -> int:
+        runner = web.AppRunner(api.app())
+        await runner.setup()
+        site = web.TCPSite(runner, "127.0.0.1", 0)
+        await site.start()
+        asyncio.create_task(reviewer(api, args))
+        return site._server.sockets[0].getsockname()[1]  # type: ignore[union-attr]
+
+    return asyncio.run_coroutine_threadsafe(start(), loop).result()
+
+
+def build(mode: str, port: int, poll_interval: int) -> Any:
+    manager = DefaultHumanLoopManager(
+        APIProvider(
+            name="ApiProvider",
+            api_base_url=f"http://127.0.0.1:{port}/api",
+            api_key=SecretStr("gohumanloop"),
+            default_platform="feishu",
+            poll_interval=poll_interval,
+        )
+    )
+    adapter = HumanloopAdapter(manager=manager, default_timeout=300)
+    policy = JoinPolicy.FAIL_FAST if mode == "fail_fast" else JoinPolicy.ALL
+    steps = ParallelHumanSteps(manager, policy=policy)
+
+    @adapter.require_info(task_id="benchmark-information", callback=steps.track)
+    def get_information_node(state: State, info_result={}) -> Dict[str, Any]:
+        return {"messages": [{"role": "system", "content": f"info: {info_result.get('response')}"}]}
+
+    @adapter.require_approval(
+        task_id="benchmark-approval", execute_on_reject=True, callback=steps.track
+    )
+    def human_approval_node(state: State, approval_result=None) -> Dict[str, Any]:
+        status = approval_result.get("status") if approval_result else None
+        return {"messages": [{"role": "human", "content": f"approval: {status}"}]}
+
+    def final_node(state: State) -> Dict[str, Any]:
+        return {"messages": [{"role": "system", "content": "done"}]}
+
+    graph = StateGraph(State)
+    graph.add_node("final", final_node)
+    graph.add_edge("final", END)
+    if mode == "sequential":
+        graph.add_node("get_info", get_information_node)
+        graph.add_node("human_approval", human_approval_node)
+        graph.add_edge("get_info", "human_approval")
+        graph.add_edge("human_approval", "final")
+        graph.set_entry_point("get_info")
+    else:
+        steps.add_to_graph(
+            graph,
+            "human_steps",
+            {"get_info": get_information_node, "human_approval": human_approval_node},
+            then="final",
+        )
+        graph.set_entry_point("human_steps")
+    return graph.compile()
+
+
+def run(mode: str, port: int, args: argparse.Namespace) -> Dict[str, Any]:
+    workflow = build(mode, port, args.poll_interval)
+
+    def one(index: int) -> Any:
+        started = time.perf_counter()
+        state = workflow.invoke({"messages": [], "human_steps": {}})
+        return time.perf_counter() - started, state
+
+    with ThreadPoolExecutor(max_workers=args.workflows) as pool:
+        outcomes = list(pool.map(one, range(args.workflows)))
+    steps: Counter = Counter()
+    for _, state in outcomes:
+        for step, status in state["human_steps"].get("results", {}).items():
+            steps[f"{step}:{status}"] += 1
+    return {
+        "mode": mode,
+        "workflows": args.workflows,
+        "avg_workflow_s": round(sum(t for t, _ in outcomes) / len(outcomes), 2),
+        "steps": dict(steps),
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Parallel human steps benchmark")
+    parser.add_argument("--workflows", type=int, default=5)
+    parser.add_argument("--info-time", type=float, default=4.0)
+    parser.add_argument("--approval-time", type=float, default=3.0)
+    parser.add_argument("--reject", action="store_true", help="Reviewer rejects the approval")
+    parser.add_argument("--poll-interval", type=int, default=1)
+    parser.add_argument(
+        "--mode", choices=["sequential", "parallel", "fail_fast", "all"], default="all"
+    )
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.WARNING)
+
+    port = start_api(args)
+    modes = ["sequential", "parallel", "fail_fast"] if args.mode == "all" else [args.mode]
+    for mode in modes:
+        print(json.dumps(run(mode, port, args)))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,161 @@
+"""
+中断线程的批量并发恢复
+
+审批人集中处理积压后，会有成百上千个中断线程需要恢复。逐个调用
+graph.stream(create_resume_command(), config) 是串行的，积压消化很慢。
+
+ResumeDispatcher 从队列 / 异步迭代器中读取按 thread_id 标识的人工答复，
+以有限并发（信号量）恢复对应线程：
+- 同一线程的多条答复按顺序依次恢复，不会并发修改同一个线程
+- 没有处于中断状态的线程直接跳过（status=not_interrupted）
+- 结果按完成顺序流式输出，包含每个线程的恢复延迟
+
+注意：gohumanloop 的 create_resume_command 依赖模块级的全局对话 ID 和标志位，
+只适合单线程串行恢复，这里直接用答复构造 Command(resume=...)。
+"""
+
+import asyncio
+import time
+from typing import Any, AsyncIterator, Dict, Iterable, Optional, Set, Tuple, Union
+
+from langgraph.types import Command
+
+Response = Tuple[str, Any]
+
+
+def percentile(values: Iterable[float], p: float) -> float:
+    ordered = sorted(values)
+    if not ordered:
+        return 0.0
+    index = min(len(ordered) - 1, max(0, round(p / 100 * len(ordered)) - 1))
+    return ordered[index]
+
+
+async def _aiter(
+    responses: Union[Iterable[Response], AsyncIterator[Response], "asyncio.Queue[Optional[Response]]"],
+) -> AsyncIterator[Response]:
+    if isinstance(responses, asyncio.Queue):
+        # 队列中放入 None 表示结束
+        while (item := await responses.get()) is not None:
+            yield item
+    elif hasattr(responses, "__aiter__"):
+        async for item in responses:  # type: ignore[union-attr]
+            yield item
+    else:
+        for item in responses:  # type: ignore[union-attr]
+            yield item
+
+
+class ResumeDispatcher:
+    """Resumes interrupted threads of a compiled graph concurrently.
+
+    Args:
+        graph: Compiled graph with a checkpointer
+        concurrency: Maximum number of resumes in flight
+        timeout: Per-thread resume timeout in seconds
+    """
+
+    def __init__(self, graph: Any, concurrency: int = 16, timeout: Optional[float] = None):
+        self.graph = graph
+        self.concurrency = concurrency
+        self.timeout = timeout
+        # thread_id -> (锁, 持有或等待该锁的恢复数)
+        self._thread_locks: Dict[str, Tuple[asyncio.Lock, int]] = {}
+
+    def _config(self, thread_id: str) -> Dict[str, Any]:
+        return {"configurable": {"thread_id": thread_id}}
+
+    async def resume(self, thread_id: str, response: Any) -> Dict[str, Any]:
+        """Resume one thread with the human response and report the outcome."""
+        lock, users = self._thread_locks.get(thread_id, (asyncio.Lock(), 0))
+        self._thread_locks[thread_id] = (lock, users + 1)
+        try:
+            async with lock:
+                return await self._resume(thread_id, response)
+        finally:
+            lock, users = self._thread_locks[thread_id]
+            if users == 1:
+                del self._thread_locks[thread_id]
+            else:
+                self._thread_locks[thread_id] = (lock, users - 1)
+
+    async def _resume(self, thread_id: str, response: Any) -> Dict[str, Any]:
+        result: Dict[str, Any] = {"thread_id": thread_id}
+        start = time.perf_counter()
+        try:
+            state = await self.graph.aget_state(self._config(thread_id))
+            if not any(task.interrupts for task in state.tasks):
+                result["status"] = "not_interrupted"
+            else:
+                await asyncio.wait_for(
+                    self.graph.ainvoke(
+                        Command(resume=response), self._config(thread_id)
+                    ),
+                    timeout=self.timeout,
+                )
+                state = await self.graph.aget_state(self._config(thread_id))
+                # 线程可能在后续节点再次中断，等待下一轮人工答复
+                interrupted = any(task.interrupts for task in state.tasks)
+                result["status"] = "interrupted" if interrupted else "completed"
+        except asyncio.TimeoutError:
+            result.update(status="timeout", error=f"timed out after {self.timeout}s")
+        except Exception as e:
+            result.update(status="error", error=str(e))
+        result["latency_s"] = round(time.perf_counter() - start, 4)
+        return result
+
+    async def run(
+        self,
+        responses: Union[Iterable[Response], AsyncIterator[Response], "asyncio.Queue[Optional[Response]]"],
+    ) -> AsyncIterator[Dict[str, Any]]:
+        """Resume threads as responses arrive, yielding results as they complete."""
+        results: asyncio.Queue = asyncio.Queue()
+        semaphore = asyncio.Semaphore(self.concurrency)
+        tasks: Set[asyncio.Task] = set()
+
+        async def resume_one(thread_id: str, response: Any) -> None:
+            try:
+                await results.put(await self.resume(thread_id, response))
+            finally:
+                semaphore.release()
+
+        async def produce() -> None:
+            try:
+                async for thread_id, response in _aiter(responses):
+                    await semaphore.acquire()
+                    task = asyncio.create_task(resume_one(str(thread_id), response))
+                    tasks.add(task)
+                    task.add_done_callback(tasks.discard)
+                await asyncio.gather(*tasks)
+            finally:
+                await results.put(None)
+
+        producer = asyncio.create_task(produce())
+        try:
+            while (result := await results.get()) is not None:
+                yield result
+            await producer
+        finally:
+            producer.cancel()
+            for task in list(tasks):
+                task.cancel()
+
+
+def summarize(results: Iterable[Dict[str, Any]], elapsed: float) -> Dict[str, Any]:
+    """Aggregate per-thread results into counts and latency percentiles."""
+    results = list(results)
+    latencies = [r["latency_s"] for r in results if r["status"] in ("completed", "interrupted")]
+    statuses: Dict[str, int] = {}
+    for r in results:
+        statuses[r["status"]] = statuses.get(r["status"], 0) + 1
+    return {
+        "resumed": len(latencies),
+        "statuses": statuses,
+        "duration_s": round(elapsed, 3),
+        "throughput_per_s": round(len(latencies) / elapsed, 2) if elapsed else 0.0,
+        "latency_s": {
+            "p50": round(percentile(latencies, 50), 4),
+            "p95": round(percentile(latencies, 95), 4),
+            "max": round(max(latencies, default=0.0), 4),
+        },
+    }
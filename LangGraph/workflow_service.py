@@ -0,0 +1,521 @@
+# /// script
+# requires-python = ">=3.10"
+# dependencies = [
+# "gohumanloop>=0.0.12",
+# "langgraph>=0.4.7",
+# "aiohttp>=3.9.0"]
+# ///
+"""
+多租户工作流服务
+
+示例脚本每次运行都要启动解释器、导入依赖、编译图，然后只执行一个 initial_state。
+WorkflowService 是常驻进程：
+- 每个注册的图只编译一次，通过本地 HTTP 接口接受运行请求
+- 所有运行在同一个事件循环中用 ainvoke 并发执行，共用图所在模块的 HumanloopAdapter
+  和管理器（启动时进入一次 adapter.asession()，退出时关闭）
+- 同步节点交给有界的默认线程池（--blocking-workers）；CPU 密集的节点用 process_node
+  包装后在工作进程池（WORKFLOW_PROCESS_WORKERS，默认为 CPU 数）中执行
+- 每个租户（X-Tenant-Id 请求头）有独立的并发上限和排队上限，只能查看自己的运行
+- 每个运行有独立的状态：queued、running、succeeded、failed、cancelled，
+  结束的运行保留最近 --keep-finished 个
+- 服务记录每个运行发出的人工请求；运行被取消（DELETE 或服务退出）时，
+  通过管理器取消其中仍在等待的请求，平台和 provider 不再继续等待答复
+
+同步的 require_* 节点在等待人工处理的整个期间占住一个线程，成千上万的并发运行
+应使用 async 节点（见 langgraph_simple_ghl_async.py），并配合 GOHUMANLOOP_DELIVERY=bulk
+或 push，避免每个等待中的请求单独轮询。
+
+HTTP 接口：
+- GET    /workflows                     已注册的工作流
+- POST   /workflows/{name}/runs         发起运行，请求体 {"input": {...}}，返回 202 和 run_id
+- GET    /runs?status=running           本租户的运行列表
+- GET    /runs/{run_id}                 运行状态和结果
+- DELETE /runs/{run_id}                 取消运行
+- GET    /stats                         各状态的运行数和各租户的并发数
+
+--workflow 的格式为 名称=文件或模块:属性，属性可以是 StateGraph、编译后的图，
+或返回二者之一的无参函数。
+
+示例：
+    uv run workflow_service.py --port 8700 \\
+        --workflow simple=langgraph_simple_ghl_async.py:build_simple_graph \\
+        --workflow agentops=../AgentOps/callback/main.py:app
+    curl -X POST localhost:8700/workflows/simple/runs -H 'X-Tenant-Id: acme' \\
+        -d '{"input": {"messages": [], "approval_result": {}}}'
+    curl localhost:8700/runs/<run_id> -H 'X-Tenant-Id: acme'
+"""
+
+import argparse
+import asyncio
+import contextlib
+import contextvars
+import functools
+import importlib
+import importlib.util
+import json
+import logging
+import multiprocessing
+import os
+import sys
+import time
+import uuid
+from collections import Counter, deque
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from dataclasses import dataclass, field
+from datetime import datetime
+from enum import Enum
+from typing import Any, Callable, Deque, Dict, List, Optional, Tuple
+
+from aiohttp import web
+from langgraph.graph import StateGraph
+
+from gohumanloop.adapters.langgraph_adapter import HumanloopAdapter
+from gohumanloop.core.interface import HumanLoopManager, HumanLoopStatus
+
+logger = logging.getLogger("workflow_service")
+
+_process_pool: Optional[ProcessPoolExecutor] = None
+
+
+def process_pool() -> ProcessPoolExecutor:
+    """Return the worker process pool, sized by WORKFLOW_PROCESS_WORKERS."""
+    global _process_pool
+    if _process_pool is None:
+        workers = int(os.environ.get("WORKFLOW_PROCESS_WORKERS", os.cpu_count() or 1))
+        # spawn：服务进程中已有事件循环和线程，fork 出的子进程可能继承被占用的锁
+        _process_pool = ProcessPoolExecutor(
+            max_workers=workers, mp_context=multiprocessing.get_context("spawn")
+        )
+    return _process_pool
+
+
+def process_node(func: Callable[[Any], Any]) -> Callable[[Any], Any]:
+    """Run a CPU-bound node in the worker process pool.
+
+    func must be a module-level function; the state it receives and the update
+    it returns are pickled. Human-loop nodes must stay in the service process.
+    """
+
+    @functools.wraps(func)
+    async def wrapper(state: Any) -> Any:
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(process_pool(), func, state)
+
+    return wrapper
+
+
+class RunStatus(str, Enum):
+    QUEUED = "queued"
+    RUNNING = "running"
+    SUCCEEDED = "succeeded"
+    FAILED = "failed"
+    CANCELLED = "cancelled"
+
+
+_FINISHED = {RunStatus.SUCCEEDED, RunStatus.FAILED, RunStatus.CANCELLED}
+
+
+@dataclass
+class Run:
+    id: str
+    workflow: str
+    tenant: str
+    input: Dict[str, Any]
+    status: RunStatus = RunStatus.QUEUED
+    created_at: datetime = field(default_factory=datetime.now)
+    started_at: Optional[datetime] = None
+    finished_at: Optional[datetime] = None
+    result: Any = None
+    error: Optional[str] = None
+    task: Optional[asyncio.Task] = field(default=None, repr=False)
+    # (conversation_id, request_id) -> 发出请求的管理器，运行被取消时用来取消请求
+    requests: Dict[Tuple[str, str], HumanLoopManager] = field(
+        default_factory=dict, repr=False
+    )
+
+    def to_dict(self, result: bool = True) -> Dict[str, Any]:
+        data = {
+            "run_id": self.id,
+            "workflow": self.workflow,
+            "tenant": self.tenant,
+            "status": self.status.value,
+            "created_at": self.created_at.isoformat(),
+            "started_at": self.started_at.isoformat() if self.started_at else None,
+            "finished_at": self.finished_at.isoformat() if self.finished_at else None,
+            "error": self.error,
+        }
+        if result:
+            data["result"] = self.result
+        return data
+
+
+# 当前运行，节点中可用 current_run.get() 读取 run_id 和租户（例如写入审批 metadata）
+current_run: contextvars.ContextVar[Optional[Run]] = contextvars.ContextVar(
+    "current_run", default=None
+)
+
+
+_WAITING = (HumanLoopStatus.PENDING, HumanLoopStatus.INPROGRESS)
+
+
+class QueueFullError(RuntimeError):
+    """The tenant already has the maximum number of queued runs."""
+
+
+def _recording(
+    manager: HumanLoopManager, send: Callable[..., Any]
+) -> Callable[..., Any]:
+    @functools.wraps(send)
+    async def wrapper(*args: Any, **kwargs: Any) -> Any:
+        result = await send(*args, **kwargs)
+        run = current_run.get()
+        if run is not None and result.request_id:
+            run.requests[(result.conversation_id, result.request_id)] = manager
+        return result
+
+    return wrapper
+
+
+def _json_default(value: Any) -> Any:
+    # 状态中的 MessageLog、LangChain 消息、枚举等
+    if isinstance(value, Enum):
+        return value.value
+    if isinstance(value, datetime):
+        return value.isoformat()
+    if hasattr(value, "model_dump"):
+        return value.model_dump()
+    if hasattr(value, "__iter__"):
+        return list(value)
+    return str(value)
+
+
+def _dumps(value: Any) -> str:
+    return json.dumps(value, ensure_ascii=False, default=_json_default)
+
+
+def load_workflow(spec: str) -> Tuple[Any, List[HumanloopAdapter]]:
+    """Load `file.py:attr` or `module:attr`, return the compiled graph and the
+    adapters defined in its module."""
+    target, _, attr = spec.rpartition(":")
+    if not target or not attr:
+        raise ValueError(f"Workflow must be given as file.py:attr or module:attr: {spec}")
+    if target.endswith(".py"):
+        path = os.path.abspath(target)
+        name = os.path.splitext(os.path.basename(path))[0]
+        # 模块所在目录加入 sys.path：同目录的辅助模块可以导入，工作进程也能按名称找到函数
+        sys.path.insert(0, os.path.dirname(path))
+        module_spec = importlib.util.spec_from_file_location(name, path)
+        if module_spec is None or module_spec.loader is None:
+            raise ValueError(f"Cannot load {path}")
+        module = importlib.util.module_from_spec(module_spec)
+        sys.modules[name] = module
+        module_spec.loader.exec_module(module)
+    else:
+        module = importlib.import_module(target)
+    adapters = [v for v in vars(module).values() if isinstance(v, HumanloopAdapter)]
+    return getattr(module, attr), adapters
+
+
+class WorkflowService:
+    """Runs registered LangGraph workflows concurrently for many tenants.
+
+    Args:
+        max_running: Runs executing at once across all tenants
+        tenant_max_running: Runs executing at once per tenant
+        tenant_max_queued: Runs waiting to start per tenant, beyond which
+            submissions are refused
+        keep_finished: Finished runs kept for status queries
+        blocking_workers: Threads for synchronous nodes
+    """
+
+    def __init__(
+        self,
+        max_running: int = 1000,
+        tenant_max_running: int = 100,
+        tenant_max_queued: int = 1000,
+        keep_finished: int = 10000,
+        blocking_workers: int = 64,
+    ):
+        self.max_running = max_running
+        self.tenant_max_running = tenant_max_running
+        self.tenant_max_queued = tenant_max_queued
+        self.keep_finished = keep_finished
+        self.blocking_workers = blocking_workers
+        self.workflows: Dict[str, Any] = {}
+        self.runs: Dict[str, Run] = {}
+        self._adapters: Dict[int, HumanloopAdapter] = {}
+        self._finished: Deque[str] = deque()
+        self._running = asyncio.Semaphore(max_running)
+        self._tenant_running: Dict[str, asyncio.Semaphore] = {}
+        self._queued: Counter = Counter()
+        self._sessions = contextlib.AsyncExitStack()
+
+    def register(
+        self, name: str, graph: Any, adapters: Optional[List[HumanloopAdapter]] = None
+    ) -> None:
+        """Register a workflow, compiling it once.
+
+        Args:
+            name: Workflow name used in the HTTP API
+            graph: StateGraph, compiled graph, or a function returning either
+            adapters: Adapters whose sessions are opened for the service's lifetime
+        """
+        if callable(graph) and not hasattr(graph, "ainvoke") and not isinstance(
+            graph, StateGraph
+        ):
+            graph = graph()
+        if isinstance(graph, StateGraph):
+            graph = graph.compile()
+        if not hasattr(graph, "ainvoke"):
+            raise ValueError(f"Workflow {name} is not a LangGraph graph")
+        self.workflows[name] = graph
+        for adapter in adapters or []:
+            self._adapters[id(adapter)] = adapter
+
+    async def start(self) -> None:
+        loop = asyncio.get_running_loop()
+        loop.set_default_executor(
+            ThreadPoolExecutor(
+                max_workers=self.blocking_workers, thread_name_prefix="blocking-node"
+            )
+        )
+        for adapter in self._adapters.values():
+            self._record_requests(adapter.manager)
+            await self._sessions.enter_async_context(adapter.asession())
+
+    def _record_requests(self, manager: HumanLoopManager) -> None:
+        """Make manager's providers record each request on the run sending it."""
+        for provider in getattr(manager, "providers", {}).values():
+            if getattr(provider, "_records_runs", False):
+                continue
+            # provider 返回的结果带 request_id；管理器在阻塞等待结束前不会返回它
+            for method in ("async_request_humanloop", "async_continue_humanloop"):
+                setattr(provider, method, _recording(manager, getattr(provider, method)))
+            provider._records_runs = True
+
+    async def close(self) -> None:
+        for run in list(self.runs.values()):
+            if run.task is not None and not run.task.done():
+                run.task.cancel()
+        await asyncio.gather(
+            *(run.task for run in self.runs.values() if run.task is not None),
+            return_exceptions=True,
+        )
+        await self._sessions.aclose()
+        if _process_pool is not None:
+            _process_pool.shutdown(cancel_futures=True)
+
+    def submit(self, workflow: str, state: Dict[str, Any], tenant: str = "default") -> Run:
+        """Start a run of workflow for tenant.
+
+        Raises:
+            KeyError: If the workflow is not registered
+            QueueFullError: If the tenant's queue is full
+        """
+        graph = self.workflows[workflow]
+        if self._queued[tenant] >= self.tenant_max_queued:
+            raise QueueFullError(f"Tenant {tenant} has {self._queued[tenant]} queued runs")
+        run = Run(id=uuid.uuid4().hex, workflow=workflow, tenant=tenant, input=state)
+        self.runs[run.id] = run
+        self._queued[tenant] += 1
+        run.task = asyncio.create_task(self._execute(run, graph))
+        return run
+
+    async def _execute(self, run: Run, graph: Any) -> None:
+        current_run.set(run)
+        tenant_running = self._tenant_running.setdefault(
+            run.tenant, asyncio.Semaphore(self.tenant_max_running)
+        )
+        started = False
+        try:
+            # 先占租户名额再占全局名额，排队的租户不会占住全局名额
+            async with tenant_running, self._running:
+                self._queued[run.tenant] -= 1
+                started = True
+                run.status = RunStatus.RUNNING
+                run.started_at = datetime.now()
+                state = await graph.ainvoke(
+                    run.input,
+                    config={
+                        "configurable": {"thread_id": run.id},
+                        "metadata": {"tenant": run.tenant, "workflow": run.workflow},
+                    },
+                )
+            # 结果在这里转成 JSON 兼容的结构，查询时不再重复转换
+            run.result = json.loads(_dumps(state))
+            run.status = RunStatus.SUCCEEDED
+        except asyncio.CancelledError:
+            run.status = RunStatus.CANCELLED
+            await self._cancel_requests(run)
+        except Exception as e:
+            logger.exception(f"Run {run.id} of {run.workflow} failed")
+            run.status = RunStatus.FAILED
+            run.error = f"{type(e).__name__}: {e}"
+        finally:
+            if not started:
+                self._queued[run.tenant] -= 1
+            run.finished_at = datetime.now()
+            run.input = {}
+            run.requests = {}
+            self._finish(run)
+
+    async def _cancel_requests(self, run: Run) -> None:
+        """Cancel the human requests of a cancelled run that are still waiting."""
+
+        async def cancel(
+            conversation_id: str, request_id: str, manager: HumanLoopManager
+        ) -> None:
+            try:
+                result = await manager.async_check_request_status(
+                    conversation_id, request_id
+                )
+                if result.status in _WAITING:
+                    await manager.async_cancel_request(conversation_id, request_id)
+            except Exception as e:
+                logger.warning(f"Run {run.id}: failed to cancel request {request_id}: {e}")
+
+        await asyncio.gather(
+            *(cancel(*key, manager) for key, manager in run.requests.items())
+        )
+
+    def _finish(self, run: Run) -> None:
+        self._finished.append(run.id)
+        while len(self._finished) > self.keep_finished:
+            self.runs.pop(self._finished.popleft(), None)
+
+    def get(self, run_id: str, tenant: str) -> Optional[Run]:
+        run = self.runs.get(run_id)
+        # 其他租户的运行视为不存在
+        return run if run is not None and run.tenant == tenant else None
+
+    def cancel(self, run_id: str, tenant: str) -> bool:
+        run = self.get(run_id, tenant)
+        if run is None or run.status in _FINISHED or run.task is None:
+            return False
+        run.task.cancel()
+        return True
+
+    def stats(self) -> Dict[str, Any]:
+        statuses = Counter(run.status.value for run in self.runs.values())
+        running = Counter(
+            run.tenant for run in self.runs.values() if run.status == RunStatus.RUNNING
+        )
+        return {
+            "workflows": list(self.workflows),
+            "runs": dict(statuses),
+            "queued_by_tenant": {t: n for t, n in self._queued.items() if n},
+            "running_by_tenant": dict(running),
+        }
+
+    # HTTP 接口
+
+    def app(self) -> web.Application:
+        app = web.Application()
+        app.router.add_get("/workflows", self.handle_workflows)
+        app.router.add_post("/workflows/{name}/runs", self.handle_submit)
+        app.router.add_get("/runs", self.handle_list)
+        app.router.add_get("/runs/{run_id}", self.handle_get)
+        app.router.add_delete("/runs/{run_id}", self.handle_cancel)
+        app.router.add_get("/stats", self.handle_stats)
+        app.on_startup.append(lambda app: self.start())
+        app.on_cleanup.append(lambda app: self.close())
+        return app
+
+    @staticmethod
+    def _tenant(request: web.Request) -> str:
+        return request.headers.get("X-Tenant-Id", "default")
+
+    @staticmethod
+    def _json(data: Any, status: int = 200) -> web.Response:
+        return web.json_response(data, status=status, dumps=_dumps)
+
+    async def handle_workflows(self, request: web.Request) -> web.Response:
+        return self._json({"workflows": list(self.workflows)})
+
+    async def handle_submit(self, request: web.Request) -> web.Response:
+        name = request.match_info["name"]
+        if name not in self.workflows:
+            return self._json({"error": f"Unknown workflow: {name}"}, status=404)
+        try:
+            body = await request.json() if request.can_read_body else {}
+        except ValueError:
+            return self._json({"error": "Invalid JSON body"}, status=400)
+        if not isinstance(body, dict) or not isinstance(body.get("input", {}), dict):
+            return self._json(
+                {"error": "Body must be an object with an object 'input'"}, status=400
+            )
+        try:
+            run = self.submit(name, body.get("input", {}), self._tenant(request))
+        except QueueFullError as e:
+            return self._json({"error": str(e)}, status=429)
+        return self._json(run.to_dict(result=False), status=202)
+
+    async def handle_list(self, request: web.Request) -> web.Response:
+        tenant = self._tenant(request)
+        status = request.query.get("status")
+        try:
+            limit = int(request.query.get("limit", "100"))
+        except ValueError:
+            limit = 0
+        if limit <= 0:
+            return self._json({"error": "limit must be a positive integer"}, status=400)
+        runs = [
+            run.to_dict(result=False)
+            for run in self.runs.values()
+            if run.tenant == tenant and (status is None or run.status.value == status)
+        ]
+        return self._json({"runs": runs[-limit:], "total": len(runs)})
+
+    async def handle_get(self, request: web.Request) -> web.Response:
+        run = self.get(request.match_info["run_id"], self._tenant(request))
+        if run is None:
+            return self._json({"error": "Run not found"}, status=404)
+        return self._json(run.to_dict())
+
+    async def handle_cancel(self, request: web.Request) -> web.Response:
+        cancelled = self.cancel(request.match_info["run_id"], self._tenant(request))
+        return self._json({"cancelled": cancelled}, status=200 if cancelled else 404)
+
+    async def handle_stats(self, request: web.Request) -> web.Response:
+        return self._json(self.stats())
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Multi-tenant LangGraph workflow service")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8700)
+    parser.add_argument(
+        "--workflow",
+        action="append",
+        default=[],
+        metavar="NAME=SPEC",
+        help="Workflow to serve, e.g. simple=langgraph_simple_ghl_async.py:build_simple_graph",
+    )
+    parser.add_argument("--max-running", type=int, default=1000)
+    parser.add_argument("--tenant-max-running", type=int, default=100)
+    parser.add_argument("--tenant-max-queued", type=int, default=1000)
+    parser.add_argument("--keep-finished", type=int, default=10000)
+    parser.add_argument("--blocking-workers", type=int, default=64)
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO)
+
+    service = WorkflowService(
+        max_running=args.max_running,
+        tenant_max_running=args.tenant_max_running,
+        tenant_max_queued=args.tenant_max_queued,
+        keep_finished=args.keep_finished,
+        blocking_workers=args.blocking_workers,
+    )
+    for item in args.workflow:
+        name, _, spec = item.partition("=")
+        started = time.perf_counter()
+        graph, adapters = load_workflow(spec)
+        service.register(name, graph, adapters)
+        logger.info(f"Loaded {name} from {spec} in {time.perf_counter() - started:.2f}s")
+    if not service.workflows:
+        parser.error("at least one --workflow is required")
+    web.run_app(service.app(), host=args.host, port=args.port)
+
+
+if __name__ == "__main__":
+    main()
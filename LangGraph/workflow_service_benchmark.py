@@ -0,0 +1,211 @@
+# /// script
+# requires-python = ">=3.10"
+# dependencies = [
+# "gohumanloop>=0.0.12",
+# "langgraph>=0.4.7",
+# "aiohttp>=3.9.0"]
+# ///
+"""
+工作流服务与一次性脚本的对比
+
+在本地 GoHumanLoop API 替身服务（ghl_local_api.py，--delay 秒后自动批准）上运行
+langgraph_simple_ghl_async.py 的审批工作流：
+- oneshot: 每次运行启动一个新进程（解释器启动、导入、编译图、执行一个 initial_state），
+           同时启动 --oneshot-runs 个
+- service: 启动一个 workflow_service.py，通过 HTTP 为 --tenants 个租户发起 --runs 个运行，
+           等待全部完成
+
+输出每个运行的平均 / p95 耗时（减去审批等待即为框架开销）、全部完成的用时和峰值内存。
+两种模式都使用 GOHUMANLOOP_DELIVERY=bulk，等待中的请求由一个批量轮询线程查询。
+
+示例：
+    uv run workflow_service_benchmark.py --runs 1000 --oneshot-runs 20
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import socket
+import statistics
+import subprocess
+import sys
+import time
+from datetime import datetime
+from typing import Any, Dict, List
+
+import aiohttp
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+WORKFLOW = "langgraph_simple_ghl_async.py:build_simple_graph"
+INPUT = {"messages": [{"role": "system", "content": "start"}], "approval_result": {}}
+ONESHOT = f"""
+import asyncio
+import langgraph_simple_ghl_async as example
+state = asyncio.run(example.workflow.ainvoke({INPUT!r}))
+example.adapter.manager.shutdown()
+"""
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def rss_mb(pids: List[int]) -> float:
+    total = 0
+    for pid in pids:
+        try:
+            with open(f"/proc/{pid}/status") as f:
+                for line in f:
+                    if line.startswith("VmRSS:"):
+                        total += int(line.split()[1])
+        except FileNotFoundError:
+            pass
+    return round(total / 1024, 1)
+
+
+async def wait_ready(url: str) -> None:
+    async with aiohttp.ClientSession() as session:
+        for _ in range(200):
+            try:
+                async with session.get(url) as response:
+                    if response.status < 500:
+                        return
+            except aiohttp.ClientError:
+                pass
+            await asyncio.sleep(0.1)
+    raise RuntimeError(f"{url} did not start")
+
+
+def summarize(mode: str, durations: List[float], elapsed: float, rss: float, **extra: Any) -> Dict[str, Any]:
+    durations = sorted(durations)
+    return {
+        "mode": mode,
+        "runs": len(durations),
+        "avg_run_s": round(statistics.mean(durations), 2),
+        "p95_run_s": round(durations[int(0.95 * (len(durations) - 1))], 2),
+        "elapsed_s": round(elapsed, 2),
+        "peak_rss_mb": rss,
+        **extra,
+    }
+
+
+async def oneshot(args: argparse.Namespace, env: Dict[str, str]) -> Dict[str, Any]:
+    async def one() -> float:
+        started = time.perf_counter()
+        process = await asyncio.create_subprocess_exec(
+            sys.executable, "-c", ONESHOT, cwd=HERE, env=env,
+            stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+        )
+        processes.append(process.pid)
+        await process.wait()
+        if process.returncode:
+            raise RuntimeError(f"One-shot run failed with exit code {process.returncode}")
+        return time.perf_counter() - started
+
+    processes: List[int] = []
+    peak = 0.0
+
+    async def sample() -> None:
+        nonlocal peak
+        while True:
+            peak = max(peak, rss_mb(processes))
+            await asyncio.sleep(0.2)
+
+    sampler = asyncio.create_task(sample())
+    started = time.perf_counter()
+    durations = await asyncio.gather(*(one() for _ in range(args.oneshot_runs)))
+    elapsed = time.perf_counter() - started
+    sampler.cancel()
+    return summarize("oneshot", list(durations), elapsed, peak)
+
+
+async def service(args: argparse.Namespace, env: Dict[str, str]) -> Dict[str, Any]:
+    port = free_port()
+    process = subprocess.Popen(
+        [sys.executable, "workflow_service.py", "--port", str(port),
+         "--workflow", f"simple={WORKFLOW}",
+         "--tenant-max-running", str(args.runs)],
+        cwd=HERE, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+    )
+    base = f"http://127.0.0.1:{port}"
+    try:
+        await wait_ready(f"{base}/workflows")
+        async with aiohttp.ClientSession() as session:
+            async def submit(index: int) -> str:
+                headers = {"X-Tenant-Id": f"tenant-{index % args.tenants}"}
+                async with session.post(
+                    f"{base}/workflows/simple/runs", json={"input": INPUT}, headers=headers
+                ) as response:
+                    return (await response.json())["run_id"]
+
+            started = time.perf_counter()
+            await asyncio.gather(*(submit(i) for i in range(args.runs)))
+            submitted = time.perf_counter() - started
+            peak = 0.0
+            while True:
+                peak = max(peak, rss_mb([process.pid]))
+                async with session.get(f"{base}/stats") as response:
+                    stats = await response.json()
+                if stats["runs"].get("queued", 0) + stats["runs"].get("running", 0) == 0:
+                    break
+                await asyncio.sleep(0.2)
+            elapsed = time.perf_counter() - started
+
+            durations: List[float] = []
+            for tenant in range(args.tenants):
+                async with session.get(
+                    f"{base}/runs", params={"limit": str(args.runs)},
+                    headers={"X-Tenant-Id": f"tenant-{tenant}"},
+                ) as response:
+                    for run in (await response.json())["runs"]:
+                        if run["status"] != "succeeded":
+                            raise RuntimeError(f"Run {run['run_id']} {run['status']}: {run['error']}")
+                        durations.append(
+                            (datetime.fromisoformat(run["finished_at"])
+                             - datetime.fromisoformat(run["created_at"])).total_seconds()
+                        )
+    finally:
+        process.terminate()
+        process.wait()
+    return summarize("service", durations, elapsed, peak, submit_s=round(submitted, 2))
+
+
+async def main_async(args: argparse.Namespace) -> None:
+    api_port = free_port()
+    api = subprocess.Popen(
+        [sys.executable, "ghl_local_api.py", "--port", str(api_port), "--delay", str(args.delay)],
+        cwd=HERE, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+    )
+    env = {
+        **os.environ,
+        "GOHUMANLOOP_API_KEY": "gohumanloop",
+        "GOHUMANLOOP_API_BASE_URL": f"http://127.0.0.1:{api_port}/api",
+        "GOHUMANLOOP_DELIVERY": "bulk",
+        "GOHUMANLOOP_STATUS_PAGE_SIZE": "500",
+    }
+    try:
+        await wait_ready(f"http://127.0.0.1:{api_port}/api/v1/humanloop/stats")
+        if args.mode in ("oneshot", "all"):
+            print(json.dumps(await oneshot(args, env)))
+        if args.mode in ("service", "all"):
+            print(json.dumps(await service(args, env)))
+    finally:
+        api.terminate()
+        api.wait()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Workflow service vs one-shot script benchmark")
+    parser.add_argument("--runs", type=int, default=1000)
+    parser.add_argument("--tenants", type=int, default=10)
+    parser.add_argument("--oneshot-runs", type=int, default=20)
+    parser.add_argument("--delay", type=float, default=2.0)
+    parser.add_argument("--mode", choices=["oneshot", "service", "all"], default="all")
+    asyncio.run(main_async(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,268 @@
+"""
+审批请求窗口合批
+
+在一个时间窗口内到达的审批请求（最多 max_batch 个）会合并为一次人工审批，
+审批人的决定再分发回各个等待中的工具调用。
+
+- 批准：全部条目通过
+- 拒绝：若理由中带有条目编号（如 "#2 #5 金额过大"），只拒绝对应条目，其余通过；
+  否则全部拒绝
+- 若 provider 返回 {"decisions": {"1": "approve", "2": "reject"}} 形式的响应，则按条目分别处理
+
+批次中各条目的回调只会收到请求已发出(async_on_humanloop_request)的通知。
+"""
+
+import asyncio
+import contextvars
+import re
+import uuid
+from datetime import datetime
+from dataclasses import dataclass, field, replace
+from typing import Any, Dict, List, Optional, Set, Tuple, Union
+
+from gohumanloop import (
+    DefaultHumanLoopManager,
+    HumanLoopCallback,
+    HumanLoopResult,
+    HumanLoopStatus,
+    HumanLoopType,
+)
+from gohumanloop.core.interface import HumanLoopRequest
+
+_ITEM_REF = re.compile(r"#(\d+)")
+
+
+@dataclass
+class _PendingApproval:
+    task_id: str
+    conversation_id: str
+    context: Dict[str, Any]
+    metadata: Optional[Dict[str, Any]]
+    timeout: Optional[int]
+    callback: Optional[HumanLoopCallback]
+    future: asyncio.Future = field(repr=False)
+    # 发起请求时的上下文，回调在该上下文中执行
+    run_context: contextvars.Context = field(
+        default_factory=contextvars.copy_context, repr=False
+    )
+
+
+class BatchingHumanLoopManager(DefaultHumanLoopManager):
+    """DefaultHumanLoopManager that merges concurrent blocking approvals into one request.
+
+    Args:
+        initial_providers: Same as DefaultHumanLoopManager
+        window: Seconds to collect approvals before sending a batch, 0 disables batching
+        max_batch: Send the batch as soon as it reaches this size
+    """
+
+    def __init__(
+        self,
+        initial_providers: Any = None,
+        window: float = 0.5,
+        max_batch: int = 20,
+    ):
+        super().__init__(initial_providers)
+        self.window = window
+        self.max_batch = max_batch
+        # provider_id -> 当前窗口内的待审批请求
+        self._batches: Dict[str, List[_PendingApproval]] = {}
+        self._flush_tasks: Dict[str, asyncio.Task] = {}
+        self._send_tasks: Set[asyncio.Task] = set()
+
+    async def async_request_humanloop(
+        self,
+        task_id: str,
+        conversation_id: str,
+        loop_type: HumanLoopType,
+        context: Dict[str, Any],
+        callback: Optional[HumanLoopCallback] = None,
+        metadata: Optional[Dict[str, Any]] = None,
+        provider_id: Optional[str] = None,
+        timeout: Optional[int] = None,
+        blocking: bool = False,
+    ) -> Union[str, HumanLoopResult]:
+        # 只合并阻塞式审批，其余请求保持原有行为
+        if self.window <= 0 or loop_type != HumanLoopType.APPROVAL or not blocking:
+            return await super().async_request_humanloop(
+                task_id=task_id,
+                conversation_id=conversation_id,
+                loop_type=loop_type,
+                context=context,
+                callback=callback,
+                metadata=metadata,
+                provider_id=provider_id,
+                timeout=timeout,
+                blocking=blocking,
+            )
+
+        provider_id = provider_id or self.default_provider_id
+        if not provider_id or provider_id not in self.providers:
+            raise ValueError(f"Provider '{provider_id}' not found")
+
+        item = _PendingApproval(
+            task_id=task_id,
+            conversation_id=conversation_id,
+            context=context,
+            metadata=metadata,
+            timeout=timeout,
+            callback=callback,
+            future=asyncio.get_running_loop().create_future(),
+        )
+        batch = self._batches.setdefault(provider_id, [])
+        batch.append(item)
+
+        if len(batch) >= self.max_batch:
+            task = self._flush_tasks.pop(provider_id, None)
+            if task:
+                task.cancel()
+            self._flush(provider_id)
+        elif provider_id not in self._flush_tasks:
+            self._flush_tasks[provider_id] = asyncio.create_task(
+                self._flush_later(provider_id)
+            )
+
+        result: HumanLoopResult = await item.future
+        return result
+
+    async def _flush_later(self, provider_id: str) -> None:
+        await asyncio.sleep(self.window)
+        self._flush_tasks.pop(provider_id, None)
+        self._flush(provider_id)
+
+    def _flush(self, provider_id: str) -> None:
+        batch = self._batches.pop(provider_id, [])
+        if batch:
+            task = asyncio.create_task(self._send_batch(provider_id, batch))
+            self._send_tasks.add(task)
+            task.add_done_callback(self._send_tasks.discard)
+
+    async def _send_batch(
+        self, provider_id: str, batch: List[_PendingApproval]
+    ) -> None:
+        try:
+            if len(batch) == 1:
+                item = batch[0]
+                result = await item.run_context.run(
+                    asyncio.ensure_future,
+                    super().async_request_humanloop(
+                        task_id=item.task_id,
+                        conversation_id=item.conversation_id,
+                        loop_type=HumanLoopType.APPROVAL,
+                        context=item.context,
+                        callback=item.callback,
+                        metadata=item.metadata,
+                        provider_id=provider_id,
+                        timeout=item.timeout,
+                        blocking=True,
+                    ),
+                )
+                item.future.set_result(result)
+                return
+
+            timeouts = [item.timeout for item in batch if item.timeout]
+            timeout = max(timeouts) if timeouts else None
+            conversation_id = str(uuid.uuid4())
+            request_id = await super().async_request_humanloop(
+                task_id="approval-batch",
+                conversation_id=conversation_id,
+                loop_type=HumanLoopType.APPROVAL,
+                context=self._build_batch_context(batch),
+                metadata=self._merge_metadata(batch),
+                provider_id=provider_id,
+                timeout=timeout,
+                blocking=False,
+            )
+            provider = self.providers[provider_id]
+            await self._notify_requested(provider, batch, str(request_id))
+            result = await self._async_wait_for_result(
+                conversation_id, str(request_id), provider, timeout
+            )
+            for item, item_result in zip(batch, self._split_result(result, len(batch))):
+                if not item.future.done():
+                    item.future.set_result(
+                        replace(item_result, conversation_id=item.conversation_id)
+                    )
+        except Exception as e:
+            for item in batch:
+                if not item.future.done():
+                    item.future.set_exception(e)
+
+    @staticmethod
+    async def _notify_requested(
+        provider: Any, batch: List[_PendingApproval], request_id: str
+    ) -> None:
+        """Tell each item's callback that the batch request has been sent."""
+        for item in batch:
+            if item.callback is None:
+                continue
+            request = HumanLoopRequest(
+                task_id=item.task_id,
+                conversation_id=item.conversation_id,
+                loop_type=HumanLoopType.APPROVAL,
+                context=item.context,
+                metadata=item.metadata or {},
+                request_id=request_id,
+                timeout=item.timeout,
+                created_at=datetime.now(),
+            )
+            try:
+                await item.run_context.run(
+                    asyncio.ensure_future,
+                    item.callback.async_on_humanloop_request(provider, request),
+                )
+            except Exception as e:
+                await item.callback.async_on_humanloop_error(provider, e)
+
+    @staticmethod
+    def _build_batch_context(batch: List[_PendingApproval]) -> Dict[str, Any]:
+        return {
+            "message": {
+                f"#{i}": item.context.get("message") for i, item in enumerate(batch, 1)
+            },
+            "function": {"function_name": "approval_batch", "size": len(batch)},
+            "question": (
+                f"Please approve/reject these {len(batch)} requests. "
+                "To reject only some of them, reject and list the item numbers "
+                "in the reason, e.g. '#2 #5 amount too large'."
+            ),
+            "additional": "",
+        }
+
+    @staticmethod
+    def _merge_metadata(batch: List[_PendingApproval]) -> Dict[str, Any]:
+        # 同一批次发往同一 provider，按先到先得合并元数据（如 recipient_email）
+        merged: Dict[str, Any] = {}
+        for item in batch:
+            for key, value in (item.metadata or {}).items():
+                merged.setdefault(key, value)
+        return merged
+
+    @staticmethod
+    def _split_result(result: HumanLoopResult, size: int) -> List[HumanLoopResult]:
+        """Fan one batch decision out into per-item results."""
+        if result.status not in (HumanLoopStatus.APPROVED, HumanLoopStatus.REJECTED):
+            return [result] * size
+
+        decisions: Dict[int, Tuple[HumanLoopStatus, Any]] = {}
+        response = result.response
+        if isinstance(response, dict) and isinstance(response.get("decisions"), dict):
+            for key, value in response["decisions"].items():
+                approved = str(value).strip().lower().startswith("approve")
+                decisions[int(key)] = (
+                    HumanLoopStatus.APPROVED if approved else HumanLoopStatus.REJECTED,
+                    value,
+                )
+        elif result.status == HumanLoopStatus.REJECTED:
+            refs = {int(n) for n in _ITEM_REF.findall(str(response or ""))}
+            for i in range(1, size + 1):
+                if not refs or i in refs:
+                    decisions[i] = (HumanLoopStatus.REJECTED, response)
+                else:
+                    decisions[i] = (HumanLoopStatus.APPROVED, "")
+
+        results = []
+        for i in range(1, size + 1):
+            status, item_response = decisions.get(i, (result.status, response))
+            results.append(replace(result, status=status, response=item_response))
+        return results
@@ -0,0 +1,160 @@
+"""
+MCP 审批工单（ticket）模式
+
+工具调用不再阻塞等待人工审批，而是立即返回一个 pending 工单，
+审批在后台完成。客户端通过配套的 `get_approval_ticket` 工具（支持长轮询）
+或 `ticket://{ticket_id}` 资源查询审批结果。
+"""
+
+import asyncio
+import inspect
+import time
+import uuid
+from dataclasses import dataclass, field
+from functools import wraps
+from typing import Any, Callable, Dict, Optional
+
+
+@dataclass
+class ApprovalTicket:
+    """A pending or finished approval ticket."""
+
+    ticket_id: str
+    tool: str
+    status: str = "pending"  # pending / completed / failed
+    result: Any = None
+    error: Optional[str] = None
+    created_at: float = field(default_factory=time.time)
+    finished_at: Optional[float] = None
+    done: asyncio.Event = field(default_factory=asyncio.Event, repr=False)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "ticket_id": self.ticket_id,
+            "tool": self.tool,
+            "status": self.status,
+            "result": self.result,
+            "error": self.error,
+            "created_at": self.created_at,
+            "finished_at": self.finished_at,
+        }
+
+
+class ApprovalTicketStore:
+    """Runs approval-wrapped tools in the background and tracks their tickets.
+
+    Args:
+        ttl: Seconds a finished ticket stays queryable
+        max_tickets: Upper bound of tickets kept in memory; once reached by
+            pending tickets, new submissions are refused
+    """
+
+    def __init__(self, ttl: float = 3600, max_tickets: int = 10000):
+        self.ttl = ttl
+        self.max_tickets = max_tickets
+        self._tickets: Dict[str, ApprovalTicket] = {}
+        self._tasks: Dict[str, asyncio.Task] = {}
+
+    def ticketed(self, fn: Callable) -> Callable:
+        """Wrap an async tool so that it returns a pending ticket right away."""
+
+        @wraps(fn)
+        async def wrapper(*args: Any, **kwargs: Any) -> Dict[str, Any]:
+            return self.submit(fn.__name__, fn(*args, **kwargs))
+
+        # 工具返回值变为工单，需同步修改签名，避免 FastMCP 按原返回类型校验
+        wrapper.__signature__ = inspect.signature(fn).replace(  # type: ignore[attr-defined]
+            return_annotation=dict
+        )
+        wrapper.__annotations__ = {**fn.__annotations__, "return": dict}
+        return wrapper
+
+    def submit(self, tool: str, coro: Any) -> Dict[str, Any]:
+        """Start the coroutine in the background and return its ticket.
+
+        Raises:
+            RuntimeError: If max_tickets tickets are still pending
+        """
+        self._prune()
+        if len(self._tickets) >= self.max_tickets:
+            # 剩下的全是等待中的工单，不再接受新的审批，避免工单和后台任务无限增长
+            coro.close()
+            raise RuntimeError(
+                f"Too many pending approval tickets ({self.max_tickets}), retry later"
+            )
+
+        ticket = ApprovalTicket(ticket_id=str(uuid.uuid4()), tool=tool)
+        self._tickets[ticket.ticket_id] = ticket
+        self._tasks[ticket.ticket_id] = asyncio.create_task(self._run(ticket, coro))
+        return ticket.to_dict()
+
+    async def _run(self, ticket: ApprovalTicket, coro: Any) -> None:
+        try:
+            ticket.result = await coro
+            ticket.status = "completed"
+        except Exception as e:
+            # 审批被拒绝或超时时，适配器会抛出 ValueError
+            ticket.status = "failed"
+            ticket.error = str(e)
+        finally:
+            ticket.finished_at = time.time()
+            ticket.done.set()
+            self._tasks.pop(ticket.ticket_id, None)
+
+    def get(self, ticket_id: str) -> Optional[Dict[str, Any]]:
+        ticket = self._tickets.get(ticket_id)
+        return ticket.to_dict() if ticket else None
+
+    async def wait(self, ticket_id: str, timeout: float) -> Optional[Dict[str, Any]]:
+        """Wait up to `timeout` seconds for the ticket to finish (long polling)."""
+        ticket = self._tickets.get(ticket_id)
+        if ticket is None:
+            return None
+        if timeout > 0 and ticket.status == "pending":
+            try:
+                await asyncio.wait_for(ticket.done.wait(), timeout=timeout)
+            except asyncio.TimeoutError:
+                pass
+        return ticket.to_dict()
+
+    def _prune(self) -> None:
+        """Drop expired finished tickets, then the oldest finished ones if still full."""
+        now = time.time()
+        finished = [
+            t for t in self._tickets.values() if t.finished_at is not None
+        ]
+        for t in finished:
+            if now - t.finished_at > self.ttl:
+                del self._tickets[t.ticket_id]
+
+        overflow = len(self._tickets) - self.max_tickets + 1
+        if overflow > 0:
+            finished = sorted(
+                (t for t in self._tickets.values() if t.finished_at is not None),
+                key=lambda t: t.finished_at,
+            )
+            for t in finished[:overflow]:
+                del self._tickets[t.ticket_id]
+
+    def register(self, mcp: Any) -> None:
+        """Register the companion tool and resource on a FastMCP server."""
+
+        @mcp.tool()
+        async def get_approval_ticket(ticket_id: str, wait_seconds: float = 0) -> dict:
+            """Gets the status and result of an approval ticket.
+            Args:
+                ticket_id: The ticket returned by an approval tool
+                wait_seconds: Block up to this many seconds until the ticket finishes
+            """
+            ticket = await self.wait(ticket_id, min(wait_seconds, 60))
+            if ticket is None:
+                raise ValueError(f"Ticket '{ticket_id}' not found")
+            return ticket
+
+        @mcp.resource("ticket://{ticket_id}")
+        def approval_ticket(ticket_id: str) -> dict:
+            """Approval ticket status"""
+            ticket = self.get(ticket_id)
+            if ticket is None:
+                raise ValueError(f"Ticket '{ticket_id}' not found")
+            return ticket
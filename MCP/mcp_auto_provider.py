@@ -0,0 +1,164 @@
+"""
+本地自动应答 Provider
+
+用于压测和离线测试，替代 TerminalProvider 和飞书 APIProvider：
+收到请求后按配置的延迟分布等待，然后自动批准 / 自动回复。
+
+延迟分布格式：
+- "fixed:0.1"          固定 0.1 秒
+- "uniform:0.05,0.5"   0.05~0.5 秒均匀分布
+- "exp:0.2"            均值 0.2 秒的指数分布
+"""
+
+import asyncio
+import random
+from datetime import datetime
+from typing import Any, Callable, Dict, Optional, Set
+
+from gohumanloop import BaseProvider, HumanLoopResult, HumanLoopStatus, HumanLoopType
+
+
+def parse_delay(spec: str) -> Callable[[], float]:
+    """Parse a delay distribution spec into a sampler."""
+    kind, _, params = spec.partition(":")
+    values = [float(v) for v in params.split(",") if v]
+    if kind == "fixed":
+        return lambda: values[0]
+    if kind == "uniform":
+        return lambda: random.uniform(values[0], values[1])
+    if kind == "exp":
+        return lambda: random.expovariate(1 / values[0]) if values[0] > 0 else 0.0
+    raise ValueError(f"Unknown delay distribution: {spec}")
+
+
+class AutoResponderProvider(BaseProvider):
+    """Provider that answers every request automatically after a random delay.
+
+    Args:
+        name: Provider name
+        delay: Delay distribution spec, see module docstring
+        approve_rate: Probability that an approval request is approved
+        info_response: Response used for information requests
+    """
+
+    def __init__(
+        self,
+        name: str,
+        delay: str = "fixed:0",
+        approve_rate: float = 1.0,
+        info_response: Any = None,
+        config: Optional[Dict[str, Any]] = None,
+    ):
+        super().__init__(name, config)
+        self.sample_delay = parse_delay(delay)
+        self.approve_rate = approve_rate
+        self.info_response = (
+            info_response
+            if info_response is not None
+            else datetime.now().date().isoformat()
+        )
+        self._responders: Set[asyncio.Task] = set()
+
+    async def async_request_humanloop(
+        self,
+        task_id: str,
+        conversation_id: str,
+        loop_type: HumanLoopType,
+        context: Dict[str, Any],
+        metadata: Optional[Dict[str, Any]] = None,
+        timeout: Optional[int] = None,
+    ) -> HumanLoopResult:
+        request_id = self._generate_request_id()
+        self._store_request(
+            conversation_id=conversation_id,
+            request_id=request_id,
+            task_id=task_id,
+            loop_type=loop_type,
+            context=context,
+            metadata=metadata or {},
+            timeout=timeout,
+        )
+
+        task = asyncio.create_task(self._respond(conversation_id, request_id))
+        self._responders.add(task)
+        task.add_done_callback(self._responders.discard)
+
+        return HumanLoopResult(
+            conversation_id=conversation_id,
+            request_id=request_id,
+            loop_type=loop_type,
+            status=HumanLoopStatus.PENDING,
+        )
+
+    async def async_continue_humanloop(
+        self,
+        conversation_id: str,
+        context: Dict[str, Any],
+        metadata: Optional[Dict[str, Any]] = None,
+        timeout: Optional[int] = None,
+    ) -> HumanLoopResult:
+        conversation_info = self._get_conversation(conversation_id)
+        if not conversation_info:
+            return HumanLoopResult(
+                conversation_id=conversation_id,
+                request_id="",
+                loop_type=HumanLoopType.CONVERSATION,
+                status=HumanLoopStatus.ERROR,
+                error=f"Conversation '{conversation_id}' not found",
+            )
+        return await self.async_request_humanloop(
+            task_id=conversation_info["task_id"],
+            conversation_id=conversation_id,
+            loop_type=HumanLoopType.CONVERSATION,
+            context=context,
+            metadata=metadata,
+            timeout=timeout,
+        )
+
+    async def _respond(self, conversation_id: str, request_id: str) -> None:
+        await asyncio.sleep(self.sample_delay())
+
+        request_info = self._get_request(conversation_id, request_id)
+        if not request_info or request_info.get("status") != HumanLoopStatus.PENDING:
+            return
+
+        loop_type = request_info["loop_type"]
+        if loop_type == HumanLoopType.APPROVAL:
+            approved = random.random() < self.approve_rate
+            request_info["status"] = (
+                HumanLoopStatus.APPROVED if approved else HumanLoopStatus.REJECTED
+            )
+            request_info["response"] = "" if approved else "auto rejected"
+        elif loop_type == HumanLoopType.INFORMATION:
+            request_info["status"] = HumanLoopStatus.COMPLETED
+            request_info["response"] = self.info_response
+        else:
+            request_info["status"] = HumanLoopStatus.COMPLETED
+            request_info["response"] = "ok"
+        request_info["responded_by"] = self.name
+        request_info["responded_at"] = datetime.now().isoformat()
+
+    async def async_check_request_status(
+        self, conversation_id: str, request_id: str
+    ) -> HumanLoopResult:
+        request_info = self._get_request(conversation_id, request_id)
+        if not request_info:
+            return HumanLoopResult(
+                conversation_id=conversation_id,
+                request_id=request_id,
+                loop_type=HumanLoopType.CONVERSATION,
+                status=HumanLoopStatus.ERROR,
+                error=f"Request '{request_id}' not found in conversation '{conversation_id}'",
+            )
+
+        return HumanLoopResult(
+            conversation_id=conversation_id,
+            request_id=request_id,
+            loop_type=request_info.get("loop_type", HumanLoopType.CONVERSATION),
+            status=request_info.get("status", HumanLoopStatus.PENDING),
+            response=request_info.get("response", {}),
+            feedback=request_info.get("feedback", {}),
+            responded_by=request_info.get("responded_by", None),
+            responded_at=request_info.get("responded_at", None),
+            error=request_info.get("error", None),
+        )
@@ -0,0 +1,101 @@
+"""
+问题批量并发执行器
+
+从文件或标准输入流式读取问题，在共享的 Agent 上并发执行：
+- 信号量限制同时进行中的问题数量（读取也随之背压，不会一次性载入全部问题）
+- 每个问题单独超时
+- 结果按完成顺序流式输出
+"""
+
+import asyncio
+import sys
+import time
+from typing import Any, AsyncIterator, Dict, Iterable, Optional, Set, Union
+
+
+async def read_questions(path: str) -> AsyncIterator[str]:
+    """Yield non-empty lines from a file, or from stdin when path is '-'."""
+    if path == "-":
+        while True:
+            line = await asyncio.to_thread(sys.stdin.readline)
+            if not line:
+                break
+            if line.strip():
+                yield line.strip()
+    else:
+        with open(path, encoding="utf-8") as f:
+            for line in f:
+                if line.strip():
+                    yield line.strip()
+
+
+async def _aiter(questions: Union[Iterable[str], AsyncIterator[str]]) -> AsyncIterator[str]:
+    if hasattr(questions, "__aiter__"):
+        async for question in questions:  # type: ignore[union-attr]
+            yield question
+    else:
+        for question in questions:  # type: ignore[union-attr]
+            yield question
+
+
+async def run_batch(
+    agent: Any,
+    questions: Union[Iterable[str], AsyncIterator[str]],
+    concurrency: int = 8,
+    timeout: Optional[float] = None,
+) -> AsyncIterator[Dict[str, Any]]:
+    """Run questions concurrently against the agent, yielding results as they complete.
+
+    Args:
+        agent: Agent with an async ainvoke({"messages": ...}) method
+        questions: Iterable or async iterator of questions
+        concurrency: Maximum number of questions in flight
+        timeout: Per-question timeout in seconds
+    """
+    results: asyncio.Queue = asyncio.Queue()
+    semaphore = asyncio.Semaphore(concurrency)
+    tasks: Set[asyncio.Task] = set()
+
+    async def ask(index: int, question: str) -> None:
+        start = time.perf_counter()
+        result: Dict[str, Any] = {"index": index, "question": question}
+        try:
+            response = await asyncio.wait_for(
+                agent.ainvoke({"messages": question}), timeout=timeout
+            )
+            result.update(status="ok", answer=response["messages"][-1].content)
+        except asyncio.TimeoutError:
+            result.update(status="timeout", error=f"timed out after {timeout}s")
+        except Exception as e:
+            result.update(status="error", error=str(e))
+        finally:
+            semaphore.release()
+        result["latency_s"] = round(time.perf_counter() - start, 3)
+        await results.put(result)
+
+    async def produce() -> None:
+        try:
+            index = 0
+            async for question in _aiter(questions):
+                await semaphore.acquire()
+                task = asyncio.create_task(ask(index, question))
+                tasks.add(task)
+                task.add_done_callback(tasks.discard)
+                index += 1
+            await asyncio.gather(*tasks)
+        finally:
+            # 读取问题出错时也要结束输出，异常由下面的 await producer 抛出
+            await results.put(None)
+
+    producer = asyncio.create_task(produce())
+    try:
+        while True:
+            result = await results.get()
+            if result is None:
+                break
+            yield result
+        await producer
+    finally:
+        producer.cancel()
+        for task in list(tasks):
+            task.cancel()
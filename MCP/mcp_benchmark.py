@@ -0,0 +1,304 @@
+# /// script
+# requires-python = ">=3.10"
+# dependencies = [
+# "gohumanloop>=0.0.12",
+# "fastmcp>=2.6.0"]
+# ///
+"""
+MCP Server 压测脚本
+
+以自动应答 Provider 启动 MCP Server（替代终端 / 飞书审批人），
+用 N 个并发的 streamable-http 客户端调用工具，统计：
+- p50 / p95 / p99 延迟
+- 吞吐量 (req/s)
+- 每秒新建连接数、峰值并发连接数
+
+结果可保存为基线 (--save-baseline)，后续运行用 --baseline 对比。
+
+示例：
+    uv run mcp_benchmark.py --server math --clients 50 --requests 1000 --delay exp:0.2
+    uv run mcp_benchmark.py --server weather --clients 20 --duration 30 --baseline baseline_weather.json
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import random
+import socket
+import subprocess
+import sys
+import time
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+from fastmcp import Client
+
+HERE = Path(__file__).parent
+
+SERVERS = {
+    "math": {"script": "mcp_math_server.py", "port": 3000},
+    "weather": {"script": "mcp_weather_server.py", "port": 8000},
+}
+
+LOCATIONS = ["nyc", "sf", "london", "tokyo", "beijing", "paris"]
+
+
+def tool_call(server: str) -> Tuple[str, Dict[str, Any]]:
+    """Pick a random tool call for the server."""
+    if server == "weather":
+        return "get_weather", {"location": random.choice(LOCATIONS)}
+    return random.choice(["add", "multiply"]), {
+        "a": random.randint(0, 100),
+        "b": random.randint(0, 100),
+    }
+
+
+def percentile(values: List[float], p: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, round(p / 100 * len(ordered)) - 1))
+    return ordered[index]
+
+
+async def wait_for_port(port: int, timeout: float = 30) -> None:
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            with socket.create_connection(("127.0.0.1", port), timeout=0.5):
+                return
+        except OSError:
+            await asyncio.sleep(0.2)
+    raise RuntimeError(f"Server on port {port} did not start within {timeout}s")
+
+
+def start_server(server: str, delay: str, extra_env: Dict[str, str]) -> subprocess.Popen:
+    """Start the MCP server with the auto responder provider."""
+    env = {
+        **os.environ,
+        "MCP_HUMANLOOP_PROVIDER": "auto",
+        "MCP_AUTO_DELAY": delay,
+        **extra_env,
+    }
+    return subprocess.Popen(
+        [sys.executable, str(HERE / SERVERS[server]["script"])],
+        cwd=HERE,
+        env=env,
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL,
+    )
+
+
+class LoadGenerator:
+    """Runs concurrent MCP clients and records latency and connection stats."""
+
+    def __init__(
+        self,
+        server: str,
+        url: str,
+        clients: int,
+        requests: Optional[int],
+        duration: Optional[float],
+        reuse_session: bool,
+    ):
+        self.server = server
+        self.url = url
+        self.clients = clients
+        self.requests = requests
+        self.duration = duration
+        self.reuse_session = reuse_session
+
+        self.latencies: List[float] = []
+        self.errors = 0
+        self.connections_opened = 0
+        self.open_connections = 0
+        self.peak_open_connections = 0
+        self._issued = 0
+        self._deadline = 0.0
+
+    def _next_request(self) -> bool:
+        if self.requests is not None and self._issued >= self.requests:
+            return False
+        if self.duration is not None and time.monotonic() >= self._deadline:
+            return False
+        self._issued += 1
+        return True
+
+    def _connect(self) -> Client:
+        self.connections_opened += 1
+        return Client(self.url)
+
+    async def _call(self, client: Client) -> None:
+        name, arguments = tool_call(self.server)
+        start = time.perf_counter()
+        try:
+            await client.call_tool(name, arguments)
+            self.latencies.append(time.perf_counter() - start)
+        except Exception:
+            self.errors += 1
+
+    async def _open(self, client: Client) -> Client:
+        await client.__aenter__()
+        self.open_connections += 1
+        self.peak_open_connections = max(
+            self.peak_open_connections, self.open_connections
+        )
+        return client
+
+    async def _close(self, client: Client) -> None:
+        self.open_connections -= 1
+        await client.__aexit__(None, None, None)
+
+    async def _worker(self) -> None:
+        if self.reuse_session:
+            client = await self._open(self._connect())
+            try:
+                while self._next_request():
+                    await self._call(client)
+            finally:
+                await self._close(client)
+        else:
+            while self._next_request():
+                try:
+                    client = await self._open(self._connect())
+                except Exception:
+                    self.errors += 1
+                    continue
+                try:
+                    await self._call(client)
+                finally:
+                    await self._close(client)
+
+    async def run(self) -> Dict[str, Any]:
+        start = time.perf_counter()
+        self._deadline = time.monotonic() + (self.duration or 0)
+        await asyncio.gather(*(self._worker() for _ in range(self.clients)))
+        elapsed = time.perf_counter() - start
+
+        latencies_ms = [v * 1000 for v in self.latencies]
+        return {
+            "server": self.server,
+            "clients": self.clients,
+            "reuse_session": self.reuse_session,
+            "requests": len(self.latencies) + self.errors,
+            "errors": self.errors,
+            "duration_s": round(elapsed, 3),
+            "throughput_rps": round(len(self.latencies) / elapsed, 2),
+            "latency_ms": {
+                "p50": round(percentile(latencies_ms, 50), 2),
+                "p95": round(percentile(latencies_ms, 95), 2),
+                "p99": round(percentile(latencies_ms, 99), 2),
+                "max": round(max(latencies_ms, default=0), 2),
+            },
+            "connections_opened": self.connections_opened,
+            "connections_per_s": round(self.connections_opened / elapsed, 2),
+            "peak_open_connections": self.peak_open_connections,
+        }
+
+
+# (指标, 数值越大越好)
+COMPARED_METRICS = [
+    ("throughput_rps", True),
+    ("latency_ms.p50", False),
+    ("latency_ms.p95", False),
+    ("latency_ms.p99", False),
+    ("connections_per_s", False),
+]
+
+
+def _metric(report: Dict[str, Any], path: str) -> float:
+    value: Any = report
+    for part in path.split("."):
+        value = value[part]
+    return float(value)
+
+
+def compare(report: Dict[str, Any], baseline: Dict[str, Any]) -> float:
+    """Print the comparison table and return the worst regression ratio."""
+    worst = 0.0
+    print(f"\n{'metric':<20}{'baseline':>12}{'current':>12}{'change':>10}")
+    for path, higher_is_better in COMPARED_METRICS:
+        old, new = _metric(baseline, path), _metric(report, path)
+        change = (new - old) / old if old else 0.0
+        regression = -change if higher_is_better else change
+        worst = max(worst, regression)
+        print(f"{path:<20}{old:>12.2f}{new:>12.2f}{change:>+10.1%}")
+    return worst
+
+
+async def main() -> int:
+    parser = argparse.ArgumentParser(description="Benchmark the MCP example servers")
+    parser.add_argument("--server", choices=SERVERS, default="math")
+    parser.add_argument("--clients", type=int, default=20, help="Concurrent clients")
+    parser.add_argument("--requests", type=int, help="Total requests (default 500)")
+    parser.add_argument("--duration", type=float, help="Run for N seconds instead")
+    parser.add_argument(
+        "--delay", default="fixed:0", help="Auto responder delay, e.g. exp:0.2"
+    )
+    parser.add_argument(
+        "--reuse-session",
+        action="store_true",
+        help="Keep one session per client instead of connecting per call",
+    )
+    parser.add_argument(
+        "--env",
+        action="append",
+        default=[],
+        metavar="KEY=VALUE",
+        help="Extra server env, e.g. MCP_APPROVAL_BATCH_WINDOW=0.5",
+    )
+    parser.add_argument(
+        "--no-spawn", action="store_true", help="Use an already running server"
+    )
+    parser.add_argument("--save-baseline", type=Path, help="Save the report as baseline")
+    parser.add_argument("--baseline", type=Path, help="Compare against a baseline")
+    parser.add_argument(
+        "--max-regression",
+        type=float,
+        help="Exit with code 1 if any metric regresses more than this ratio",
+    )
+    args = parser.parse_args()
+
+    if args.requests is None and args.duration is None:
+        args.requests = 500
+
+    port = SERVERS[args.server]["port"]
+    process = None
+    if not args.no_spawn:
+        extra_env = dict(item.split("=", 1) for item in args.env)
+        process = start_server(args.server, args.delay, extra_env)
+    try:
+        await wait_for_port(port)
+        generator = LoadGenerator(
+            server=args.server,
+            url=f"http://127.0.0.1:{port}/mcp/",
+            clients=args.clients,
+            requests=args.requests,
+            duration=args.duration,
+            reuse_session=args.reuse_session,
+        )
+        report = await generator.run()
+    finally:
+        if process:
+            process.terminate()
+            process.wait()
+
+    report["delay"] = args.delay
+    report["server_env"] = args.env
+    print(json.dumps(report, indent=2))
+
+    if args.save_baseline:
+        args.save_baseline.write_text(json.dumps(report, indent=2))
+        print(f"\n基线已保存到 {args.save_baseline}")
+
+    if args.baseline:
+        worst = compare(report, json.loads(args.baseline.read_text()))
+        if args.max_regression is not None and worst > args.max_regression:
+            print(f"\n性能回退 {worst:.1%} 超过阈值 {args.max_regression:.1%}")
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(asyncio.run(main()))
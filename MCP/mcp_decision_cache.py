@@ -0,0 +1,137 @@
+"""
+审批决策缓存
+
+以「工具名 + 规范化参数」为键缓存人工审批通过的决策，在策略窗口(TTL)内
+重复的相同调用直接复用审批结果，不再打扰审批人。
+缓存为 LRU 并有容量上限，命中/未命中/淘汰次数通过计数器暴露。
+同一个键已有审批在进行中时，相同的调用等待该审批的结果，不再重复发起人工请求。
+"""
+
+import asyncio
+import inspect
+import json
+import time
+from collections import OrderedDict
+from functools import wraps
+from typing import Any, Callable, Dict, Optional, Tuple
+
+from gohumanloop import HumanloopAdapter
+
+
+class DecisionCache:
+    """TTL + LRU cache of approved tool invocations.
+
+    Args:
+        ttl: Seconds an approval can be reused, 0 disables the cache
+        max_size: Maximum number of cached approvals
+    """
+
+    def __init__(self, ttl: float = 300, max_size: int = 1024):
+        self.ttl = ttl
+        self.max_size = max_size
+        self._entries: "OrderedDict[str, float]" = OrderedDict()  # key -> 过期时间
+        self._inflight: Dict[str, asyncio.Task] = {}
+        self.hits = 0
+        self.misses = 0
+        self.coalesced = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    @staticmethod
+    def make_key(fn: Callable, args: Tuple[Any, ...], kwargs: Dict[str, Any]) -> str:
+        """Build a key from the tool name and its normalized arguments."""
+        bound = inspect.signature(fn).bind(*args, **kwargs)
+        bound.apply_defaults()
+        arguments = json.dumps(
+            bound.arguments, sort_keys=True, default=str, ensure_ascii=False
+        )
+        return f"{fn.__name__}:{arguments}"
+
+    def lookup(self, key: str) -> bool:
+        expires_at = self._entries.get(key)
+        if expires_at is None:
+            self.misses += 1
+            return False
+        if expires_at < time.monotonic():
+            del self._entries[key]
+            self.expirations += 1
+            self.misses += 1
+            return False
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return True
+
+    def store(self, key: str) -> None:
+        self._entries[key] = time.monotonic() + self.ttl
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.misses
+        return {
+            "size": len(self._entries),
+            "max_size": self.max_size,
+            "ttl": self.ttl,
+            "hits": self.hits,
+            "misses": self.misses,
+            "coalesced": self.coalesced,
+            "inflight": len(self._inflight),
+            "evictions": self.evictions,
+            "expirations": self.expirations,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+        }
+
+    def require_approval(
+        self, adapter: HumanloopAdapter, **approval_kwargs: Any
+    ) -> Callable[[Callable], Callable]:
+        """Same as adapter.require_approval(), but reuses cached approvals.
+
+        Only approvals are cached, so execute_on_reject is not supported.
+        The decorated tool must be an async function.
+        """
+        if approval_kwargs.get("execute_on_reject"):
+            raise ValueError("DecisionCache does not support execute_on_reject=True")
+
+        def decorator(fn: Callable) -> Callable:
+            approved_fn = adapter.require_approval(**approval_kwargs)(fn)
+            if self.ttl <= 0:
+                return approved_fn
+
+            async def approve_and_store(key: str, *args: Any, **kwargs: Any) -> Any:
+                # 走人工审批，被拒绝时适配器抛出 ValueError，不会写入缓存
+                ret = await approved_fn(*args, **kwargs)
+                self.store(key)
+                return ret
+
+            @wraps(fn)
+            async def wrapper(*args: Any, **kwargs: Any) -> Any:
+                key = self.make_key(fn, args, kwargs)
+                task = self._inflight.get(key)
+                if task is not None:
+                    # 相同调用的审批正在进行：等待其结果，通过后各自执行，被拒绝时抛出同样的错误
+                    self.coalesced += 1
+                    await asyncio.shield(task)
+                    return await fn(*args, **kwargs)
+
+                if self.lookup(key):
+                    # 命中缓存：复用之前的审批结果，直接执行
+                    return await fn(*args, **kwargs)
+
+                task = asyncio.create_task(approve_and_store(key, *args, **kwargs))
+                self._inflight[key] = task
+                task.add_done_callback(lambda _: self._inflight.pop(key, None))
+                return await asyncio.shield(task)
+
+            return wrapper
+
+        return decorator
+
+    def register(self, mcp: Any, uri: Optional[str] = None) -> None:
+        """Expose the cache counters as a resource on a FastMCP server."""
+
+        @mcp.resource(uri or "stats://approval-cache")
+        def approval_cache_stats() -> dict:
+            """Approval decision cache counters"""
+            return self.stats()
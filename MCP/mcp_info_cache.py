@@ -0,0 +1,135 @@
+"""
+人工信息缓存
+
+按键（如地点、日期）缓存 require_info 获取到的人工信息，在有效期(TTL)内复用。
+同一个键的并发请求会合并为一次人工请求（single-flight），
+例如 50 个并发的 NYC 查询只会给审批人发送一条消息。
+"""
+
+import asyncio
+import inspect
+import time
+from collections import OrderedDict
+from functools import wraps
+from typing import Any, Callable, Dict, Hashable, Tuple
+
+from gohumanloop import HumanloopAdapter
+
+
+class InfoCache:
+    """TTL + LRU cache of human-supplied info with single-flight requests.
+
+    Args:
+        ttl: Seconds a piece of info stays valid, 0 disables the cache
+        max_size: Maximum number of cached keys
+    """
+
+    def __init__(self, ttl: float = 3600, max_size: int = 1024):
+        self.ttl = ttl
+        self.max_size = max_size
+        # key -> (过期时间, info_result)
+        self._entries: "OrderedDict[Hashable, Tuple[float, Dict[str, Any]]]" = (
+            OrderedDict()
+        )
+        self._inflight: Dict[Hashable, asyncio.Task] = {}
+        self.hits = 0
+        self.misses = 0
+        self.coalesced = 0
+        self.evictions = 0
+
+    def get(self, key: Hashable) -> Any:
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        if entry[0] < time.monotonic():
+            del self._entries[key]
+            return None
+        self._entries.move_to_end(key)
+        return entry[1]
+
+    def set(self, key: Hashable, info: Dict[str, Any]) -> None:
+        self._entries[key] = (time.monotonic() + self.ttl, info)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "size": len(self._entries),
+            "inflight": len(self._inflight),
+            "hits": self.hits,
+            "misses": self.misses,
+            "coalesced": self.coalesced,
+            "evictions": self.evictions,
+        }
+
+    def require_info(
+        self,
+        adapter: HumanloopAdapter,
+        key: Callable[[Dict[str, Any]], Hashable],
+        ret_key: str = "info_result",
+        **info_kwargs: Any,
+    ) -> Callable[[Callable], Callable]:
+        """Same as adapter.require_info(), but caches the info under key(arguments).
+
+        Args:
+            adapter: Adapter used to request the info from a human
+            key: Builds the cache key from the tool's bound arguments
+            ret_key: Parameter name used to inject the info into the tool
+            info_kwargs: Passed through to adapter.require_info()
+        """
+
+        def decorator(fn: Callable) -> Callable:
+            if self.ttl <= 0:
+                return adapter.require_info(ret_key=ret_key, **info_kwargs)(fn)
+
+            signature = inspect.signature(fn)
+
+            # 只负责获取人工信息的探针函数，沿用原函数的名称与文档，审批人看到的内容不变
+            @wraps(fn)
+            async def probe(*args: Any, info_result: Any = None, **kwargs: Any) -> Any:
+                return info_result
+
+            fetch_info = adapter.require_info(ret_key="info_result", **info_kwargs)(
+                probe
+            )
+
+            async def fetch_and_store(cache_key: Hashable, *args: Any, **kwargs: Any) -> Any:
+                info = await fetch_info(*args, **kwargs)
+                self.set(cache_key, info)
+                return info
+
+            @wraps(fn)
+            async def wrapper(*args: Any, **kwargs: Any) -> Any:
+                kwargs.pop(ret_key, None)
+                bound = signature.bind_partial(*args, **kwargs)
+                bound.apply_defaults()
+                bound.arguments.pop(ret_key, None)
+                cache_key = key(bound.arguments)
+
+                info = self.get(cache_key)
+                if info is not None:
+                    self.hits += 1
+                else:
+                    task = self._inflight.get(cache_key)
+                    if task is None:
+                        self.misses += 1
+                        task = asyncio.create_task(
+                            fetch_and_store(cache_key, *args, **kwargs)
+                        )
+                        self._inflight[cache_key] = task
+                        task.add_done_callback(
+                            lambda _: self._inflight.pop(cache_key, None)
+                        )
+                    else:
+                        # 同一个键已有人工请求在进行中，直接等待其结果
+                        self.coalesced += 1
+                    info = await asyncio.shield(task)
+
+                kwargs[ret_key] = info
+                return await fn(*args, **kwargs)
+
+            return wrapper
+
+        return decorator
@@ -7,10 +7,14 @@
 # "langchain>=0.3.26",
 # "langchain-openai>=0.3.28"]
 # ///
-from langchain_mcp_adapters.client import MultiServerMCPClient
-from langgraph.prebuilt import create_react_agent
+import argparse
+import json
 
-client = MultiServerMCPClient(
+from mcp_batch_runner import read_questions, run_batch
+from mcp_tool_registry import MCPToolRegistry
+
+# 常驻会话 + 工具缓存，多个 Agent 共享连接与工具发现结果
+registry = MCPToolRegistry(
     {
         "math": {
             "url": "http://localhost:3000/mcp/",
@@ -21,16 +25,31 @@ client = MultiServerMCPClient(
             "url": "http://localhost:8000/mcp/",
             "transport": "streamable_http",
         }
-    }
+    },
+    refresh_interval=300,  # 每5分钟重新发现一次工具
 )
 
+QUESTIONS = ["what's (3 + 5) x 12?", "what is the weather in nyc?"]
+
 async def main():
-    tools = await client.get_tools()
-    agent = create_react_agent("openai:deepseek-chat", tools)
-    math_response = await agent.ainvoke({"messages": "what's (3 + 5) x 12?"})
-    print(f"Question: what's (3 + 5) x 12? \nMath Response: {math_response['messages'][-1].content}\n")
-    weather_response = await agent.ainvoke({"messages": "what is the weather in nyc?"})
-    print(f"Question: what is the weather in nyc?\nWeather Response: {weather_response['messages'][-1].content}\n")
+    parser = argparse.ArgumentParser(description="Ask the MCP agent questions")
+    parser.add_argument("--questions", help="File with one question per line, '-' for stdin")
+    parser.add_argument("--concurrency", type=int, default=8, help="Questions in flight")
+    parser.add_argument("--timeout", type=float, help="Per-question timeout in seconds")
+    args = parser.parse_args()
+
+    questions = read_questions(args.questions) if args.questions else QUESTIONS
+
+    async with registry:
+        agent = await registry.create_agent("openai:deepseek-chat")
+        # 结果按完成顺序输出
+        async for result in run_batch(agent, questions, args.concurrency, args.timeout):
+            if args.questions:
+                print(json.dumps(result, ensure_ascii=False), flush=True)
+            elif result["status"] == "ok":
+                print(f"Question: {result['question']}\nResponse: {result['answer']}\n")
+            else:
+                print(f"Question: {result['question']}\nError: {result['error']}\n")
 
 if __name__ == "__main__":
     import asyncio
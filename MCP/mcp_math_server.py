@@ -5,13 +5,42 @@
 # "fastmcp>=2.6.0"]
 # ///
 from fastmcp import FastMCP, Client
-from gohumanloop import DefaultHumanLoopManager, HumanloopAdapter, TerminalProvider
+from gohumanloop import HumanloopAdapter, TerminalProvider
+from mcp_approval_tickets import ApprovalTicketStore
+from mcp_approval_batcher import BatchingHumanLoopManager
+from mcp_decision_cache import DecisionCache
+from mcp_auto_provider import AutoResponderProvider
+from mcp_progress import ProgressCallback, with_progress
+import os
 
 # 设置环境变量
+# 审批模式: blocking(默认，等待审批完成) / ticket(立即返回工单，后台完成审批)
+APPROVAL_MODE = os.environ.get("MCP_APPROVAL_MODE", "blocking")
+# 审批合批窗口(秒)，0 表示不合批；以及单批最大请求数
+APPROVAL_BATCH_WINDOW = float(os.environ.get("MCP_APPROVAL_BATCH_WINDOW", "0"))
+APPROVAL_BATCH_SIZE = int(os.environ.get("MCP_APPROVAL_BATCH_SIZE", "20"))
+# 审批决策缓存有效期(秒)，0 表示不缓存；以及缓存容量
+APPROVAL_CACHE_TTL = float(os.environ.get("MCP_APPROVAL_CACHE_TTL", "0"))
+APPROVAL_CACHE_SIZE = int(os.environ.get("MCP_APPROVAL_CACHE_SIZE", "1024"))
+# 等待人工处理期间发送进度通知的间隔(秒)
+PROGRESS_INTERVAL = float(os.environ.get("MCP_PROGRESS_INTERVAL", "10"))
+
+# 人工审批 Provider: terminal(默认) / auto(自动应答，用于压测)
+HUMANLOOP_PROVIDER = os.environ.get("MCP_HUMANLOOP_PROVIDER", "terminal")
+
+if HUMANLOOP_PROVIDER == "auto":
+    provider = AutoResponderProvider(
+        name="AutoResponderProvider",
+        delay=os.environ.get("MCP_AUTO_DELAY", "fixed:0"),
+    )
+else:
+    provider = TerminalProvider(name="TerminalProvider")
 
 # 创建 GoHumanLoopManager 实例
-manager = DefaultHumanLoopManager(
-    TerminalProvider(name="TerminalProvider")
+manager = BatchingHumanLoopManager(
+    provider,
+    window=APPROVAL_BATCH_WINDOW,
+    max_batch=APPROVAL_BATCH_SIZE,
 )
 # 创建 LangGraphAdapter 实例
 adapter = HumanloopAdapter(
@@ -21,21 +50,43 @@ adapter = HumanloopAdapter(
 
 mcp = FastMCP(name="CalculatorServer")
 
-@mcp.tool()
-@adapter.require_approval()
+# 审批工单存储，ticket 模式下使用
+tickets = ApprovalTicketStore(ttl=3600)
+if APPROVAL_MODE == "ticket":
+    tickets.register(mcp)
+
+# 相同参数的重复调用在有效期内复用审批结果
+decisions = DecisionCache(ttl=APPROVAL_CACHE_TTL, max_size=APPROVAL_CACHE_SIZE)
+if APPROVAL_CACHE_TTL > 0:
+    decisions.register(mcp)
+
+# 等待人工处理时向客户端发送进度通知（pending / reviewer notified / 已等待时长）
+progress_callback = ProgressCallback()
+
+
+def approval_tool(fn):
+    """Registers an approval-wrapped tool according to MCP_APPROVAL_MODE."""
+    if APPROVAL_MODE == "ticket":
+        return mcp.tool()(tickets.ticketed(fn))
+    return mcp.tool()(with_progress(PROGRESS_INTERVAL)(fn))
+
+
+@approval_tool
+@decisions.require_approval(adapter, callback=progress_callback)
 async def add(a: int, b: int,) -> int:
     """Adds two integer numbers together."""
     return a + b
 
-@mcp.tool()
-@adapter.require_approval()
+@approval_tool
+@decisions.require_approval(adapter, callback=progress_callback)
 async def multiply(a: int, b: int) -> int:
     """Multiply two numbers"""
     return a * b
 
 
 @mcp.tool(exclude_args=["huamninfo"])
-@adapter.require_info(ret_key="huamninfo")
+@with_progress(PROGRESS_INTERVAL)
+@adapter.require_info(ret_key="huamninfo", callback=progress_callback)
 async def feedback(add_result: int, huamninfo: dict={}) -> str:
     """Gets feedback from human response.
     Args:
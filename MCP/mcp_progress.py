@@ -0,0 +1,122 @@
+"""
+等待人工处理期间的 MCP 进度通知
+
+被 require_approval / require_info 包装的工具在等待人工决定时，
+定期通过 streamable-http 通道发送 MCP 进度通知（pending、reviewer notified、已等待时长），
+保持连接活跃，客户端也能知道请求仍在处理中，不必超时重试。
+"""
+
+import asyncio
+import inspect
+import time
+from contextvars import ContextVar
+from functools import wraps
+from typing import Any, Callable, Optional
+
+from fastmcp import Context
+from gohumanloop import HumanLoopCallback, HumanLoopProvider, HumanLoopResult
+from gohumanloop.core.interface import HumanLoopRequest
+
+# 当前工具调用的进度上报器，由 with_progress 设置，供 ProgressCallback 读取
+_current_reporter: ContextVar[Optional["ProgressReporter"]] = ContextVar(
+    "mcp_progress_reporter", default=None
+)
+
+
+class ProgressReporter:
+    """Sends progress notifications for one tool call."""
+
+    def __init__(self, ctx: Context):
+        self.ctx = ctx
+        self.status = "pending"
+        self.started_at = time.monotonic()
+        self.step = 0
+
+    def _has_progress_token(self) -> bool:
+        meta = getattr(self.ctx.request_context, "meta", None)
+        return getattr(meta, "progressToken", None) is not None
+
+    async def report(self, status: Optional[str] = None) -> None:
+        if status:
+            self.status = status
+        self.step += 1
+        elapsed = time.monotonic() - self.started_at
+        message = f"{self.status} ({elapsed:.0f}s elapsed)"
+        try:
+            if self._has_progress_token():
+                await self.ctx.report_progress(self.step, None, message)
+            else:
+                # 客户端未请求进度时，用日志通知保持连接活跃
+                await self.ctx.debug(message)
+        except Exception:
+            # 通知发送失败不影响工具本身的执行
+            pass
+
+
+class ProgressCallback(HumanLoopCallback):
+    """Forwards human-loop events to the progress reporter of the current tool call."""
+
+    async def async_on_humanloop_request(
+        self, provider: HumanLoopProvider, request: HumanLoopRequest
+    ) -> Any:
+        reporter = _current_reporter.get()
+        if reporter:
+            await reporter.report(f"reviewer notified via {provider.name}")
+
+    async def async_on_humanloop_update(
+        self, provider: HumanLoopProvider, result: HumanLoopResult
+    ) -> Any:
+        reporter = _current_reporter.get()
+        if reporter:
+            await reporter.report(result.status.value)
+
+    async def async_on_humanloop_timeout(
+        self, provider: HumanLoopProvider, result: HumanLoopResult
+    ) -> Any:
+        pass
+
+    async def async_on_humanloop_error(
+        self, provider: HumanLoopProvider, error: Exception
+    ) -> Any:
+        pass
+
+
+def with_progress(interval: float = 10.0) -> Callable[[Callable], Callable]:
+    """Wrap an async tool so that it reports progress every `interval` seconds.
+
+    The wrapper adds a `ctx: Context` parameter, which FastMCP injects and
+    hides from the tool schema.
+    """
+
+    def decorator(fn: Callable) -> Callable:
+        @wraps(fn)
+        async def wrapper(*args: Any, ctx: Context, **kwargs: Any) -> Any:
+            reporter = ProgressReporter(ctx)
+            token = _current_reporter.set(reporter)
+            try:
+                # 任务创建时复制当前上下文，ProgressCallback 因此能拿到本次调用的 reporter
+                task = asyncio.ensure_future(fn(*args, **kwargs))
+            finally:
+                _current_reporter.reset(token)
+
+            await reporter.report()
+            try:
+                while True:
+                    done, _ = await asyncio.wait({task}, timeout=interval)
+                    if done:
+                        return task.result()
+                    await reporter.report()
+            finally:
+                task.cancel()
+
+        signature = inspect.signature(fn)
+        ctx_param = inspect.Parameter(
+            "ctx", inspect.Parameter.KEYWORD_ONLY, annotation=Context
+        )
+        wrapper.__signature__ = signature.replace(  # type: ignore[attr-defined]
+            parameters=[*signature.parameters.values(), ctx_param]
+        )
+        wrapper.__annotations__ = {**fn.__annotations__, "ctx": Context}
+        return wrapper
+
+    return decorator
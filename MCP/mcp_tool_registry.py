@@ -0,0 +1,174 @@
+"""
+MCP 工具发现的连接池与缓存
+
+- 为每个 MCP Server 维持一个常驻会话，多次 ainvoke / 多个 Agent 复用同一连接
+- 并发地从所有 Server 发现工具
+- 按工具 schema 的哈希缓存转换后的 LangChain 工具，schema 未变化时不重新构建
+- 按 (模型, schema 哈希) 缓存 create_react_agent 生成的 Agent
+"""
+
+import asyncio
+import hashlib
+import json
+import logging
+import time
+from typing import Any, Dict, List, Optional, Tuple
+
+from langchain_core.tools import BaseTool
+from langchain_mcp_adapters.client import MultiServerMCPClient
+from langchain_mcp_adapters.tools import convert_mcp_tool_to_langchain_tool
+from langgraph.prebuilt import create_react_agent
+from mcp import ClientSession
+
+logger = logging.getLogger("mcp_tool_registry")
+
+
+class _PersistentSession:
+    """Keeps one MCP session open in its own task.
+
+    MCP 传输层基于 anyio，会话必须在同一个任务中进入和退出，
+    因此每个 Server 的会话由一个常驻任务持有，直到 close() 被调用。
+    """
+
+    def __init__(self, client: MultiServerMCPClient, server_name: str):
+        self.client = client
+        self.server_name = server_name
+        self.session: Optional[ClientSession] = None
+        self._ready: Optional[asyncio.Future] = None
+        self._closed = asyncio.Event()
+        self._task: Optional[asyncio.Task] = None
+
+    async def start(self) -> ClientSession:
+        self._ready = asyncio.get_running_loop().create_future()
+        self._task = asyncio.create_task(self._run())
+        await self._ready
+        assert self.session is not None
+        return self.session
+
+    async def _run(self) -> None:
+        assert self._ready is not None
+        try:
+            async with self.client.session(self.server_name) as session:
+                self.session = session
+                self._ready.set_result(None)
+                await self._closed.wait()
+        except Exception as e:
+            if not self._ready.done():
+                self._ready.set_exception(e)
+            else:
+                logger.warning(f"MCP 会话 {self.server_name} 异常断开: {e}")
+        finally:
+            self.session = None
+
+    async def close(self) -> None:
+        self._closed.set()
+        if self._task:
+            await self._task
+
+
+class MCPToolRegistry:
+    """Process-wide, pooled and cached MCP tool discovery.
+
+    Args:
+        connections: Same as MultiServerMCPClient connections
+        refresh_interval: Seconds before tools are re-discovered, 0 never refreshes
+    """
+
+    def __init__(self, connections: Dict[str, Any], refresh_interval: float = 300):
+        self.client = MultiServerMCPClient(connections)
+        self.refresh_interval = refresh_interval
+        self._sessions: Dict[str, _PersistentSession] = {}
+        # server_name -> (schema 哈希, 会话, LangChain 工具)
+        self._schema_cache: Dict[str, Tuple[str, ClientSession, List[BaseTool]]] = {}
+        self._agents: Dict[Tuple[str, str], Any] = {}
+        self._tools: Optional[List[BaseTool]] = None
+        self._tools_hash = ""
+        self._generation = 0  # 任一 Server 的工具重建后递增，使旧 Agent 失效
+        self._discovered_at = 0.0
+        self._lock = asyncio.Lock()
+
+    async def __aenter__(self) -> "MCPToolRegistry":
+        return self
+
+    async def __aexit__(self, *exc: Any) -> None:
+        await self.close()
+
+    async def close(self) -> None:
+        sessions, self._sessions = self._sessions, {}
+        await asyncio.gather(*(s.close() for s in sessions.values()))
+
+    async def _get_session(self, server_name: str) -> ClientSession:
+        persistent = self._sessions.get(server_name)
+        if persistent is None or persistent.session is None:
+            persistent = _PersistentSession(self.client, server_name)
+            self._sessions[server_name] = persistent
+            await persistent.start()
+        assert persistent.session is not None
+        return persistent.session
+
+    async def get_tools(self, refresh: bool = False) -> List[BaseTool]:
+        """Return tools of all servers, discovering them only when needed."""
+        async with self._lock:
+            expired = (
+                self.refresh_interval > 0
+                and time.monotonic() - self._discovered_at > self.refresh_interval
+            )
+            if self._tools is None or refresh or expired:
+                await self._discover()
+            assert self._tools is not None
+            return self._tools
+
+    async def _discover(self) -> None:
+        names = list(self.client.connections)
+        results = await asyncio.gather(*(self._discover_server(n) for n in names))
+
+        self._tools = [tool for _, tools in results for tool in tools]
+        schemas_hash = hashlib.sha256(
+            "".join(schema_hash for schema_hash, _ in results).encode()
+        ).hexdigest()
+        self._tools_hash = f"{schemas_hash}:{self._generation}"
+        self._discovered_at = time.monotonic()
+
+    async def _discover_server(self, server_name: str) -> Tuple[str, List[BaseTool]]:
+        session = await self._get_session(server_name)
+
+        mcp_tools = []
+        cursor = None
+        while True:
+            page = await session.list_tools(cursor=cursor)
+            mcp_tools.extend(page.tools)
+            cursor = page.nextCursor
+            if not cursor:
+                break
+
+        schema_hash = hashlib.sha256(
+            json.dumps(
+                [t.model_dump(mode="json") for t in mcp_tools], sort_keys=True
+            ).encode()
+        ).hexdigest()
+
+        # 工具绑定在会话上，会话重建后也需要重新转换
+        cached = self._schema_cache.get(server_name)
+        if cached and cached[0] == schema_hash and cached[1] is session:
+            logger.debug(f"{server_name} 工具 schema 未变化，复用缓存")
+            return schema_hash, cached[2]
+
+        tools = [convert_mcp_tool_to_langchain_tool(session, t) for t in mcp_tools]
+        self._schema_cache[server_name] = (schema_hash, session, tools)
+        self._generation += 1
+        logger.info(f"{server_name} 发现 {len(tools)} 个工具 (schema {schema_hash[:8]})")
+        return schema_hash, tools
+
+    async def create_agent(self, model: str) -> Any:
+        """Return a react agent for the current tools, reused while schemas are unchanged."""
+        tools = await self.get_tools()
+        key = (model, self._tools_hash)
+        agent = self._agents.get(key)
+        if agent is None:
+            # schema 变化后旧 Agent 不再使用
+            self._agents = {
+                k: v for k, v in self._agents.items() if k[1] == self._tools_hash
+            }
+            agent = create_react_agent(model, tools)
+            self._agents[key] = agent
+        return agent
@@ -5,21 +5,43 @@
 # "fastmcp>=2.6.0"]
 # ///
 from fastmcp import FastMCP
-from gohumanloop import DefaultHumanLoopManager, HumanloopAdapter, APIProvider,  get_secret_from_env
+from gohumanloop import DefaultHumanLoopManager, HumanloopAdapter, get_secret_from_env
+from mcp_info_cache import InfoCache
+from mcp_auto_provider import AutoResponderProvider
+from datetime import date
+from pathlib import Path
 import os
+import sys
+
+# 连接池化的 APIProvider 与 LangGraph 示例共用 LangGraph/ghl_http.py
+sys.path.append(str(Path(__file__).resolve().parents[1] / "LangGraph"))
+from ghl_http import PooledAPIProvider  # noqa: E402
 
 #设置环境变量
 os.environ["GOHUMANLOOP_API_KEY"] = "46cf87c5-9d08-4027-b72a-f0a91f27298a"
+# 人工信息缓存有效期(秒)，0 表示不缓存
+INFO_CACHE_TTL = float(os.environ.get("MCP_INFO_CACHE_TTL", "0"))
+# 缓存键: location(按地点) / date(按自然日，所有地点共用)
+INFO_CACHE_KEY = os.environ.get("MCP_INFO_CACHE_KEY", "location")
+# 人工信息 Provider: api(默认，飞书) / auto(自动应答，用于压测)
+HUMANLOOP_PROVIDER = os.environ.get("MCP_HUMANLOOP_PROVIDER", "api")
 
-# 创建 GoHumanLoopManager 实例
-manager = DefaultHumanLoopManager(
-    APIProvider(
+if HUMANLOOP_PROVIDER == "auto":
+    provider = AutoResponderProvider(
+        name="AutoResponderProvider",
+        delay=os.environ.get("MCP_AUTO_DELAY", "fixed:0"),
+    )
+else:
+    # API 调用复用进程内共享的 HTTP 连接池（keep-alive，GOHUMANLOOP_HTTP2=on 时使用 HTTP/2）
+    provider = PooledAPIProvider(
         name="ApiProvider",
         api_base_url="http://127.0.0.1:9800/api", # 换成自己飞书应用的URL
         api_key=get_secret_from_env("GOHUMANLOOP_API_KEY"),
         default_platform="feishu"
     )
-)
+
+# 创建 GoHumanLoopManager 实例
+manager = DefaultHumanLoopManager(provider)
 # 创建 LangGraphAdapter 实例
 adapter = HumanloopAdapter(
     manager=manager,
@@ -27,8 +49,18 @@ adapter = HumanloopAdapter(
 )
 mcp = FastMCP("Weather")
 
+infos = InfoCache(ttl=INFO_CACHE_TTL)
+
+
+def info_cache_key(arguments: dict) -> str:
+    """Cache key of the human-supplied date."""
+    if INFO_CACHE_KEY == "date":
+        return date.today().isoformat()
+    return arguments["location"].strip().lower()
+
+
 @mcp.tool()
-@adapter.require_info()
+@infos.require_info(adapter, key=info_cache_key)
 async def get_weather(location: str, info_result:dict={}) -> str:
 
     current_date = info_result["response"]